@@ -13,19 +13,41 @@ except ImportError:
     import sqlite3
 
 import streamlit as st
-import sqlite3
 import datetime
-import smtplib
 import json
+import logging
 import os
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from PyPDF2 import PdfReader
 import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 from langchain_google_genai import ChatGoogleGenerativeAI
 from streamlit_mic_recorder import speech_to_text
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from db_pool import ConnectionPool
+from db_migrations import run_migrations
+import legal_retrieval
+import hybrid_retrieval
+import law_ingest
+from response_cache import ResponseCache
+from llm_gateway import LLMGateway
+import chat_history
+import message_search
+from conversation_memory import ConversationMemory, llm_summarizer, estimate_tokens
+from intent_engine import IntentEngine, intent_vocabulary
+from canned_responses import CannedResponses
+import statute_sections
+import statute_digests
+from email_outbox import SMTPOutbox, format_brief
+from library_uploads import LibraryIngestor
+from turn_tracing import STAGES, TurnTracer, histogram, percentile, span
+from telemetry_sink import TelemetrySink
+import session_cache
+import chamber_archive
+
+log = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------------------
 # SECTION 1: CONFIGURATION
@@ -36,10 +58,40 @@ SYSTEM_CONFIG = {
     "APP_ICON": "⚖️",
     "LAYOUT": "wide",
     "DB_FILENAME": "advocate_ai_v2.db",
-    "DATA_REPOSITORY": "data",
+    "DATA_REPOSITORY": "DATA",
     "VERSION_ID": "40.0.0-ULTIMATE",
     "SMTP_SERVER": "smtp.gmail.com",
-    "SMTP_PORT": 587
+    "SMTP_PORT": 587,
+    "CHROMA_DIR": "chroma_db",
+    "VECTOR_BACKEND": os.environ.get("ALPHA_APEX_VECTORS", "chroma"),  # chroma | numpy
+    "VECTOR_DIR": "vector_store",  # numpy backend: <collection>.npy + <collection>.sqlite
+    "VECTOR_DTYPE": "float32",  # float16 halves the file but costs an upcast per search
+    "EMBEDDING_PROVIDER": os.environ.get("ALPHA_APEX_EMBEDDINGS", "google"),  # google | hf | local
+    "RETRIEVAL_TOP_K": 4,
+    "RETRIEVAL_MAX_CHARS": 6000,
+    "RETRIEVAL_MODE": os.environ.get("ALPHA_APEX_RETRIEVAL", "hybrid"),  # hybrid | vector | bm25
+    "RETRIEVAL_RRF_K": 60,
+    "RETRIEVAL_CANDIDATES": 20,
+    "RETRIEVAL_RERANK": True,  # applied only when the vector side is open; it slows and hurts BM25 alone
+    "RETRIEVAL_RETRY_SECONDS": 300,  # wait before rebuilding a statute index that failed
+    "SECTION_MAX_CHARS": 2000,
+    "DIGEST_MAX_PARTS": 2,  # part digests added to an act digest for overview questions
+    "UPLOAD_PAGES_PER_BATCH": 4,  # pages extracted + indexed per step of a background upload
+    "CACHE_MAX_ENTRIES": 5000,
+    "CACHE_TTL_SECONDS": 7 * 24 * 3600,
+    "CACHE_SEMANTIC_THRESHOLD": None,  # e.g. 0.92 to enable the embedding-similarity tier
+    "LLM_MAX_CONCURRENCY": 8,
+    "LLM_TIMEOUT_SECONDS": 60,
+    "LLM_MAX_RETRIES": 4,
+    "HISTORY_PAGE_SIZE": 30,
+    "MEMORY_RECENT_TURNS": 6,
+    "MEMORY_TOKEN_BUDGET": 2500,
+    "MEMORY_SUMMARY_TOKENS": 600,
+    "EMAIL_BATCH_SIZE": 20,
+    "EMAIL_MAX_ATTEMPTS": 6,
+    "TELEMETRY_BATCH_SIZE": 200,
+    "TELEMETRY_FLUSH_MS": 250,
+    "TELEMETRY_MAX_QUEUED": 10000  # events beyond this are dropped (and counted) while the DB lags
 }
 
 LEGAL_KEYWORDS = [
@@ -380,25 +432,31 @@ def apply_shaders():
 # SECTION 4: LEGAL CONTEXT & RESPONSE HANDLERS
 # ------------------------------------------------------------------------------
 
+@st.cache_resource
+def get_canned_responses():
+    """brain.json answers; re-read automatically when the file changes"""
+    # a query using a legal/intent word is never fuzzy-matched to small talk
+    return CannedResponses("brain.json", protected_words=intent_vocabulary(LEGAL_KEYWORDS))
+
+@st.cache_resource
+def get_intent_engine():
+    return IntentEngine(LEGAL_KEYWORDS, smalltalk=get_canned_responses().phrases())
+
+def classify_intent(text):
+    """Single token pass -> Intent(name in greeting/farewell/thanks/smalltalk/legal/non_legal, score, hits)"""
+    return get_intent_engine().classify(text)
+
 def is_greeting(text):
-    greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 
-                 'greetings', 'salaam', 'salam', 'assalam o alaikum', 'kaise hain']
-    return any(g in text.lower() for g in greetings)
+    return classify_intent(text).name == "greeting"
 
 def is_farewell(text):
-    farewells = ['bye', 'goodbye', 'see you', 'farewell', 'take care', 'allah hafiz', 
-                 'khuda hafiz', 'alvida']
-    return any(f in text.lower() for f in farewells)
+    return classify_intent(text).name == "farewell"
 
 def is_thank_you(text):
-    thanks = ['thank', 'thanks', 'appreciate', 'grateful', 'shukriya', 'meherbani']
-    return any(t in text.lower() for t in thanks)
+    return classify_intent(text).name == "thanks"
 
 def is_legal_context(text):
-    text_lower = text.lower()
-    has_keywords = any(kw in text_lower for kw in LEGAL_KEYWORDS)
-    personal_legal = any(word in text_lower for word in ['should i', 'what can i', 'my rights', 'kicked out', 'evict'])
-    return has_keywords or personal_legal or len(text) > 100
+    return classify_intent(text).name == "legal"
 
 def get_formal_greeting():
     mode = "⚖️ Judge" if st.session_state.ai_mode == "judge" else "👨‍⚖️ Advocate"
@@ -431,167 +489,284 @@ Please provide a legal query for analysis."""
 # SECTION 5: DATABASE FUNCTIONS
 # ------------------------------------------------------------------------------
 
+@st.cache_resource
+def get_db_pool():
+    """One pool per process; every session thread gets its own long-lived connection"""
+    return ConnectionPool(SYSTEM_CONFIG["DB_FILENAME"])
+
 def get_db_connection():
-    conn = sqlite3.connect(SYSTEM_CONFIG["DB_FILENAME"], check_same_thread=False)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    return conn
+    """Context manager over the pooled connection (commits on exit)"""
+    return get_db_pool().connection()
+
+@st.cache_resource
+def get_data_versions():
+    """Process-wide write counters behind the per-session chamber/profile/library caches"""
+    return session_cache.DataVersions()
+
+@st.cache_resource(on_release=lambda sink: sink.close())
+def get_telemetry_sink():
+    """system_telemetry events are queued in memory and written in batches by a background thread"""
+    return TelemetrySink(
+        get_db_pool(),
+        batch_size=SYSTEM_CONFIG["TELEMETRY_BATCH_SIZE"],
+        flush_interval=SYSTEM_CONFIG["TELEMETRY_FLUSH_MS"] / 1000,
+        max_queued=SYSTEM_CONFIG["TELEMETRY_MAX_QUEUED"]
+    )
 
+@st.cache_resource(show_spinner=False)
 def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("""CREATE TABLE IF NOT EXISTS users (
-        email TEXT PRIMARY KEY, 
-        full_name TEXT, 
-        vault_key TEXT, 
-        registration_date TEXT,
-        last_login TEXT,
-        total_queries INTEGER DEFAULT 0, 
-        provider TEXT DEFAULT 'Local'
-    )""")
-    
-    c.execute("""CREATE TABLE IF NOT EXISTS chambers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, 
-        owner_email TEXT, 
-        chamber_name TEXT, 
-        init_date TEXT,
-        FOREIGN KEY(owner_email) REFERENCES users(email)
-    )""")
-    
-    c.execute("""CREATE TABLE IF NOT EXISTS message_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, 
-        chamber_id INTEGER, 
-        sender_role TEXT, 
-        message_body TEXT, 
-        ts_created TEXT,
-        FOREIGN KEY(chamber_id) REFERENCES chambers(id)
-    )""")
-    
-    c.execute("""CREATE TABLE IF NOT EXISTS system_telemetry (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, 
-        user_email TEXT, 
-        event_type TEXT, 
-        description TEXT, 
-        event_timestamp TEXT
-    )""")
-    
-    conn.commit()
-    conn.close()
+    """Schema + migrations, once per process rather than on every rerun"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        
+        c.execute("""CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY, 
+            full_name TEXT, 
+            vault_key TEXT, 
+            registration_date TEXT,
+            last_login TEXT,
+            total_queries INTEGER DEFAULT 0, 
+            provider TEXT DEFAULT 'Local'
+        )""")
+        
+        c.execute("""CREATE TABLE IF NOT EXISTS chambers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            owner_email TEXT, 
+            chamber_name TEXT, 
+            init_date TEXT,
+            FOREIGN KEY(owner_email) REFERENCES users(email)
+        )""")
+        
+        c.execute("""CREATE TABLE IF NOT EXISTS message_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            chamber_id INTEGER, 
+            sender_role TEXT, 
+            message_body TEXT, 
+            ts_created TEXT,
+            FOREIGN KEY(chamber_id) REFERENCES chambers(id)
+        )""")
+        
+        c.execute("""CREATE TABLE IF NOT EXISTS system_telemetry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            user_email TEXT, 
+            event_type TEXT, 
+            description TEXT, 
+            event_timestamp TEXT
+        )""")
+        
+        run_migrations(conn)
 
 def db_verify_vault_access(email, password):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT full_name FROM users WHERE email=? AND vault_key=?", (email, password))
-    res = c.fetchone()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT full_name FROM users WHERE email=? AND vault_key=?", (email, password))
+        res = c.fetchone()
+        
+        if res:
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            c.execute("UPDATE users SET last_login=? WHERE email=?", (ts, email))
     
     if res:
-        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("UPDATE users SET last_login=? WHERE email=?", (ts, email))
-        c.execute("INSERT INTO system_telemetry (user_email, event_type, description, event_timestamp) VALUES (?, ?, ?, ?)",
-                 (email, "LOGIN", "User logged in", ts))
-        conn.commit()
-    
-    conn.close()
+        get_data_versions().bump(email, "profile")
+        get_telemetry_sink().record(email, "LOGIN", "User logged in", ts)
     return res[0] if res else None
 
 def db_create_user(email, name, password, provider='Local'):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT email FROM users WHERE email=?", (email,))
-    if c.fetchone():
-        conn.close()
-        return False
-    
-    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO users (email, full_name, vault_key, registration_date, last_login, provider) VALUES (?, ?, ?, ?, ?, ?)",
-             (email, name, password, ts, ts, provider))
-    
-    c.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
-             (email, "General Litigation Chamber", ts))
-    
-    c.execute("INSERT INTO system_telemetry (user_email, event_type, description, event_timestamp) VALUES (?, ?, ?, ?)",
-             (email, "REGISTRATION", f"New user registered via {provider}", ts))
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        
+        c.execute("SELECT email FROM users WHERE email=?", (email,))
+        if c.fetchone():
+            return False
+        
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        c.execute("INSERT INTO users (email, full_name, vault_key, registration_date, last_login, provider) VALUES (?, ?, ?, ?, ?, ?)",
+                 (email, name, password, ts, ts, provider))
+        
+        c.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+                 (email, "General Litigation Chamber", ts))
     
-    conn.commit()
-    conn.close()
+    get_data_versions().bump(email, "profile", "chambers")
+    get_telemetry_sink().record(email, "REGISTRATION", f"New user registered via {provider}", ts)
     return True
 
 def db_log_consultation(email, chamber_name, role, content):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
-    res = c.fetchone()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        res = c.fetchone()
+        
+        if res:
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            c.execute("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)",
+                     (res[0], role, content, ts))
+            
+            if role == "user":
+                c.execute("UPDATE users SET total_queries = total_queries + 1 WHERE email=?", (email,))
     
     if res:
-        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)",
-                 (res[0], role, content, ts))
-        
-        if role == "user":
-            c.execute("UPDATE users SET total_queries = total_queries + 1 WHERE email=?", (email,))
-        
-        conn.commit()
-    conn.close()
+        get_data_versions().bump(email, "messages", *(["profile"] if role == "user" else []))
+        if role == "assistant":
+            # fold older turns into the chamber summary off the chat thread; the next prompt
+            # uses the stored summary plus backlog notes until this finishes
+            get_memory_worker().submit(_fold_chamber_memory, email, chamber_name)
 
 def db_fetch_chamber_history(email, chamber_name):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("""SELECT m.sender_role, m.message_body 
-                 FROM message_logs m 
-                 JOIN chambers c ON m.chamber_id = c.id 
-                 WHERE c.owner_email=? AND c.chamber_name=? 
-                 ORDER BY m.id ASC""", (email, chamber_name))
-    rows = c.fetchall()
-    conn.close()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("""SELECT m.sender_role, m.message_body 
+                     FROM message_logs m 
+                     JOIN chambers c ON m.chamber_id = c.id 
+                     WHERE c.owner_email=? AND c.chamber_name=? 
+                     ORDER BY m.id ASC""", (email, chamber_name))
+        rows = c.fetchall()
     return [{"role": r[0], "content": r[1]} for r in rows]
 
+def db_fetch_chamber_names(email):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (email,))
+        return [r[0] for r in c.fetchall()]
+
+def db_search_messages(email, query, limit=10):
+    """BM25-ranked matches across the user's chambers, with highlighted snippets"""
+    with get_db_connection() as conn:
+        return message_search.search_messages(conn, email, query, limit)
+
 def db_create_chamber(email, chamber_name):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
-    if c.fetchone():
-        conn.close()
-        return False
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        
+        c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        if c.fetchone():
+            return False
+        
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        c.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+                 (email, chamber_name, ts))
     
-    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
-             (email, chamber_name, ts))
-    c.execute("INSERT INTO system_telemetry (user_email, event_type, description, event_timestamp) VALUES (?, ?, ?, ?)",
-             (email, "NEW_CHAMBER", f"Created chamber: {chamber_name}", ts))
-    conn.commit()
-    conn.close()
+    get_data_versions().bump(email, "chambers")
+    get_telemetry_sink().record(email, "NEW_CHAMBER", f"Created chamber: {chamber_name}", ts)
     return True
 
 def db_delete_chamber(email, chamber_name):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
-    res = c.fetchone()
-    
-    if res:
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        
+        c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        res = c.fetchone()
+        
+        if not res:
+            return False
+        
         chamber_id = res[0]
         c.execute("DELETE FROM message_logs WHERE chamber_id=?", (chamber_id,))
+        c.execute("DELETE FROM chamber_memory WHERE chamber_id=?", (chamber_id,))
+        c.execute("DELETE FROM chamber_documents WHERE chamber_id=?", (chamber_id,))
         c.execute("DELETE FROM chambers WHERE id=?", (chamber_id,))
+    
+    get_data_versions().bump(email, "chambers", "documents", "messages")
+    get_telemetry_sink().record(email, "DELETE_CHAMBER", f"Deleted chamber: {chamber_name}")
+    return True
+
+def db_fetch_library_documents():
+    """Filenames of the verified Law Library documents a chamber can be scoped to"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT filename FROM law_assets WHERE asset_status='Verified' ORDER BY filename")
+        return [r[0] for r in c.fetchall()]
+
+def db_get_chamber_documents(email, chamber_name):
+    """Documents attached to a chamber; [] means the chamber searches the whole library"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("""SELECT d.filename FROM chamber_documents d
+                     JOIN chambers c ON d.chamber_id = c.id
+                     WHERE c.owner_email=? AND c.chamber_name=?
+                     ORDER BY d.filename""", (email, chamber_name))
+        return [r[0] for r in c.fetchall()]
+
+def db_set_chamber_documents(email, chamber_name, filenames):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        res = c.fetchone()
+        
+        if not res:
+            return False
         
         ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("INSERT INTO system_telemetry (user_email, event_type, description, event_timestamp) VALUES (?, ?, ?, ?)",
-                 (email, "DELETE_CHAMBER", f"Deleted chamber: {chamber_name}", ts))
-        conn.commit()
-        conn.close()
-        return True
+        c.execute("DELETE FROM chamber_documents WHERE chamber_id=?", (res[0],))
+        c.executemany("INSERT INTO chamber_documents (chamber_id, filename, attached_at) VALUES (?, ?, ?)",
+                      [(res[0], filename, ts) for filename in sorted(set(filenames))])
     
-    conn.close()
-    return False
+    get_data_versions().bump(email, "documents")
+    return True
+
+def db_import_chambers(email, fileobj):
+    """Load a chamber archive for this user in one transaction; ValueError if it is not a valid archive"""
+    with get_db_connection() as conn:
+        report = chamber_archive.import_chambers(conn, email, fileobj)
+    get_data_versions().bump(email, "chambers", "documents", "messages")
+    get_telemetry_sink().record(email, "IMPORT_CHAMBERS",
+                                f"Imported {len(report['chambers'])} chamber(s), {report['messages']} messages")
+    return report
+
+def chamber_archive_download(email, chamber_names):
+    """Deferred st.download_button data: the archive is only written when the button is clicked.
+
+    The callable runs on a server thread, so it holds the pool and sink itself instead of calling st.*.
+    """
+    pool, sink = get_db_pool(), get_telemetry_sink()
+    chamber_names = list(chamber_names)
+    def build():
+        # spooled through a temp file so the export itself stays streamed; Streamlit needs the bytes anyway
+        with tempfile.TemporaryFile() as out:
+            with pool.connection() as conn:
+                chamber_archive.export_chambers(conn, email, chamber_names, out)
+            out.seek(0)
+            data = out.read()
+        sink.record(email, "EXPORT_CHAMBERS", f"Exported: {', '.join(chamber_names)}")
+        return data
+    return build
+
+def db_fetch_user_profile(email):
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT full_name, registration_date, last_login, total_queries, provider FROM users WHERE email=?",
+                  (email,))
+        row = c.fetchone()
+    if not row:
+        return None
+    return {"name": row[0], "registered": row[1], "last_login": row[2], "queries": row[3] or 0, "provider": row[4]}
+
+# Session-cached reads: served from st.session_state until a db_* write (in any
+# session of this process) bumps the matching DataVersions topic
+
+def cached_chamber_names(email):
+    return session_cache.cached(st.session_state, get_data_versions(), email, "chambers",
+                                lambda: db_fetch_chamber_names(email))
+
+def cached_user_profile(email):
+    return session_cache.cached(st.session_state, get_data_versions(), email, "profile",
+                                lambda: db_fetch_user_profile(email))
+
+def cached_chamber_documents(email, chamber_name):
+    return session_cache.cached(st.session_state, get_data_versions(), email, "documents",
+                                lambda: db_get_chamber_documents(email, chamber_name), key=chamber_name)
+
+def cached_library_documents():
+    return session_cache.cached(st.session_state, get_data_versions(), None, "library", db_fetch_library_documents)
 
 def db_get_interaction_logs(limit=100):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT user_email, event_type, description, event_timestamp FROM system_telemetry ORDER BY id DESC LIMIT ?", (limit,))
-    rows = c.fetchall()
-    conn.close()
+    try:
+        get_telemetry_sink().flush()  # the admin view includes events still waiting in the queue
+    except Exception:
+        pass
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT user_email, event_type, description, event_timestamp FROM system_telemetry ORDER BY id DESC LIMIT ?", (limit,))
+        rows = c.fetchall()
     return [{"User": r[0], "Event": r[1], "Description": r[2], "Timestamp": r[3]} for r in rows]
 
 # ------------------------------------------------------------------------------
@@ -609,20 +784,290 @@ def get_ai_engine():
     except:
         return None
 
-def get_legal_response(engine, query, persona, lang, mode):
-    """IRAC FORMAT with Judge/Advocate mode"""
+@st.cache_resource
+def get_llm_gateway():
+    """Process-wide gateway: bounded concurrency, coalescing, deadlines, retries, circuit breaker"""
+    engine = get_ai_engine()
+    if engine is None:
+        return None
+    return LLMGateway(
+        engine,
+        max_concurrency=SYSTEM_CONFIG["LLM_MAX_CONCURRENCY"],
+        timeout=SYSTEM_CONFIG["LLM_TIMEOUT_SECONDS"],
+        max_retries=SYSTEM_CONFIG["LLM_MAX_RETRIES"]
+    )
+
+@st.cache_resource(show_spinner="Indexing statute library...")
+def get_statute_index():
+    """Lazily open (and on first run, build) the statute vector index (Chroma or memory-mapped NumPy)"""
+    provider = SYSTEM_CONFIG["EMBEDDING_PROVIDER"]
+    backend = SYSTEM_CONFIG["VECTOR_BACKEND"]
+    embeddings = legal_retrieval.get_embedding_provider(provider, st.secrets.get("GOOGLE_API_KEY"))
+    store = legal_retrieval.open_vectorstore(
+        SYSTEM_CONFIG["VECTOR_DIR"] if backend == "numpy" else SYSTEM_CONFIG["CHROMA_DIR"],
+        embeddings, provider, backend=backend, dtype=SYSTEM_CONFIG["VECTOR_DTYPE"]
+    )
+    with get_db_connection() as conn:
+        library = law_ingest.sync_law_library(conn, SYSTEM_CONFIG["DATA_REPOSITORY"])
+    if library["added"] or library["updated"] or library["removed"]:
+        get_data_versions().bump(None, "library")
+    # own connection: sync_corpus commits per file, so embedding never holds the write lock
+    with get_db_connection() as conn:
+        report = legal_retrieval.sync_corpus(store, SYSTEM_CONFIG["DATA_REPOSITORY"],
+                                             page_loader=lambda filename: law_ingest.load_asset_pages(conn, filename),
+                                             conn=conn, collection=legal_retrieval.collection_name(provider))
+    if report["failed"]:
+        # the store still serves what is indexed; the retry resumes the failed files' missing chunks
+        _retrieval_failed("embedding " + ", ".join(report["failed"]), "; ".join(report["failed"].values()))
+    return store
+
+@st.cache_resource
+def get_retrieval_health():
+    """Last statute-index failure, shared by all sessions, so a broken build is retried on a timer, not per turn"""
+    return {"error": None, "down": False, "retry_at": 0.0}
+
+def _retrieval_failed(what, error, down=False):
+    health = get_retrieval_health()
+    health.update(error=f"{what}: {error}", down=down,
+                  retry_at=time.time() + SYSTEM_CONFIG["RETRIEVAL_RETRY_SECONDS"])
+    log.warning("statute retrieval degraded (%s): %s", what, error)
+
+@st.cache_resource(show_spinner="Indexing statute sections...")
+def get_hybrid_retriever():
+    """BM25 over parsed sections fused with the Chroma index; keyword-only if the vector side cannot open"""
+    get_section_index()  # parses statute_sections on first run
+    with get_db_connection() as conn:
+        bm25 = hybrid_retrieval.build_bm25_index(conn)
+    vectorstore = None
+    if SYSTEM_CONFIG["RETRIEVAL_MODE"] != "bm25":
+        try:
+            vectorstore = get_statute_index()
+        except Exception as e:
+            _retrieval_failed("vector index", e)  # keyword-only until the retry
+            vectorstore = None
+    return hybrid_retrieval.HybridRetriever(
+        bm25,
+        vectorstore,
+        rrf_k=SYSTEM_CONFIG["RETRIEVAL_RRF_K"],
+        candidates=SYSTEM_CONFIG["RETRIEVAL_CANDIDATES"],
+        rerank=SYSTEM_CONFIG["RETRIEVAL_RERANK"] and vectorstore is not None
+    )
+
+def get_statute_context(query, sources=None):
+    """Top-k statute excerpts for the prompt, or empty string if retrieval is unavailable
     
-    if is_greeting(query):
-        return get_formal_greeting()
+    sources (a chamber's attached filenames) pre-filters both indexes, so only that subset is searched.
+    """
+    health = get_retrieval_health()
+    if health["error"]:
+        if time.time() < health["retry_at"]:
+            if health["down"]:
+                return ""
+        else:
+            # rebuild once the backoff is over; sync_corpus resumes from its ledger
+            health.update(error=None, down=False)
+            get_statute_index.clear()
+            get_hybrid_retriever.clear()
+    try:
+        if SYSTEM_CONFIG["RETRIEVAL_MODE"] == "vector":
+            docs = legal_retrieval.retrieve_sections(get_statute_index(), query, k=SYSTEM_CONFIG["RETRIEVAL_TOP_K"],
+                                                     sources=sources)
+        else:
+            docs = get_hybrid_retriever().retrieve(query, k=SYSTEM_CONFIG["RETRIEVAL_TOP_K"], sources=sources)
+    except Exception as e:
+        log.exception("statute retrieval failed")
+        _retrieval_failed("retrieval", e, down=True)
+        return ""
+    return legal_retrieval.format_context(docs, SYSTEM_CONFIG["RETRIEVAL_MAX_CHARS"])
+
+@st.cache_resource
+def get_section_index():
+    """Section-level statute index: (act, section) -> exact text, no model or vector search"""
+    with get_db_connection() as conn:
+        library = law_ingest.sync_law_library(conn, SYSTEM_CONFIG["DATA_REPOSITORY"])
+        statute_sections.sync_statute_sections(conn)
+    if library["added"] or library["updated"] or library["removed"]:
+        get_data_versions().bump(None, "library")
+    return statute_sections.StatuteSections(get_db_pool())
+
+def get_cited_sections(text, limit=5):
+    """Exact text of the provisions cited in text ("s.15 SRPO", "Article 199"); [] if unavailable"""
+    try:
+        return get_section_index().cited_sections(text, limit)
+    except Exception:
+        return []
+
+@st.cache_resource
+def get_statute_digests():
+    """Per-act/part digests written offline by statute_digests.py (empty until the job has run)"""
+    get_section_index()  # law_assets/statute_sections synced first
+    return statute_digests.StatuteDigests(get_db_pool())
+
+def get_digests_for(query, sources=None):
+    """Digests that answer an overview question about a named act; [] when raw excerpts are needed"""
+    try:
+        return get_statute_digests().for_query(query, sources, max_parts=SYSTEM_CONFIG["DIGEST_MAX_PARTS"])
+    except Exception:
+        return []
+
+@st.cache_resource(show_spinner=False)
+def warm_statute_indexes():
+    """Library sync, section parse, digests and the retriever, built before the first chat turn needs them"""
+    get_section_index()
+    get_statute_digests()
+    if SYSTEM_CONFIG["RETRIEVAL_MODE"] != "vector":
+        get_hybrid_retriever()  # nested in a cached call, so no spinner is drawn from the worker thread
+    return True
+
+def _warm_statute_indexes():
+    try:
+        warm_statute_indexes()
+    except Exception:
+        log.exception("statute index warm-up failed; the first chat turn builds it instead")
+
+def _index_upload_vectors(filename, pages):
+    if SYSTEM_CONFIG["RETRIEVAL_MODE"] == "bm25":
+        return  # no vector index in use; sync_corpus embeds the file if the mode changes
+    docs, ids = legal_retrieval.chunk_pages(filename, pages)
+    if docs:
+        # a failure is recorded on the upload job (retry from the Law Library page)
+        get_statute_index().add_documents(docs, ids=ids)
+
+def _index_upload_keywords(filename, pages):
+    docs, _ids = legal_retrieval.chunk_pages(filename, pages)
+    if docs:
+        get_hybrid_retriever().bm25.add(docs, [f"{d.metadata['act']} {d.page_content}" for d in docs])
+
+def _finish_upload(filename):
+    with get_db_connection() as conn:
+        statute_sections.sync_statute_sections(conn)
+    get_data_versions().bump(None, "library")
+    get_section_index().refresh()
+    get_hybrid_retriever.clear()  # next query rebuilds BM25 with the upload's sections
+
+@st.cache_resource
+def get_library_ingestor():
+    """Background worker for Law Library uploads; resumes unfinished jobs on start"""
+    ingestor = LibraryIngestor(
+        get_db_pool(),
+        SYSTEM_CONFIG["DATA_REPOSITORY"],
+        indexers=[_index_upload_vectors, _index_upload_keywords],
+        on_complete=_finish_upload,
+        pages_per_batch=SYSTEM_CONFIG["UPLOAD_PAGES_PER_BATCH"]
+    )
+    ingestor.start()
+    return ingestor
+
+def render_upload_progress():
+    """Progress bars for uploads still being ingested; reruns the page once they are all done"""
+    active = get_library_ingestor().active()
+    for job in active:
+        total = job["pages_total"] or 0
+        done = job["pages_done"] or 0
+        label = f"{job['filename']}: {done}/{total} pages indexed" if total else f"{job['filename']}: queued"
+        st.progress(done / total if total else 0.0, text=label)
+    if st.session_state.get("uploads_active") and not active:
+        st.session_state.uploads_active = False
+        st.rerun()
+    st.session_state.uploads_active = bool(active)
+
+@st.cache_resource
+def get_response_cache():
+    embedder = None
+    if SYSTEM_CONFIG["CACHE_SEMANTIC_THRESHOLD"] is not None:
+        try:
+            embedder = legal_retrieval.get_embedding_provider(SYSTEM_CONFIG["EMBEDDING_PROVIDER"], st.secrets.get("GOOGLE_API_KEY"))
+        except Exception:
+            embedder = None
+    return ResponseCache(
+        get_db_pool(),
+        max_entries=SYSTEM_CONFIG["CACHE_MAX_ENTRIES"],
+        ttl_seconds=SYSTEM_CONFIG["CACHE_TTL_SECONDS"],
+        embedder=embedder,
+        semantic_threshold=SYSTEM_CONFIG["CACHE_SEMANTIC_THRESHOLD"] or 0.92
+    )
+
+@st.cache_resource(on_release=lambda tracer: tracer.close())
+def get_turn_tracer():
+    """Chat-turn spans: ring buffer in memory, batched into turn_spans by a flusher thread"""
+    return TurnTracer(get_db_pool())
+
+@st.cache_resource
+def get_conversation_memory():
+    gateway = get_llm_gateway()
+    summarizer = llm_summarizer(gateway, SYSTEM_CONFIG["MEMORY_SUMMARY_TOKENS"]) if gateway else None
+    return ConversationMemory(
+        get_db_pool(),
+        summarizer=summarizer,
+        recent_turns=SYSTEM_CONFIG["MEMORY_RECENT_TURNS"],
+        token_budget=SYSTEM_CONFIG["MEMORY_TOKEN_BUDGET"],
+        summary_tokens=SYSTEM_CONFIG["MEMORY_SUMMARY_TOKENS"]
+    )
+
+@st.cache_resource(on_release=lambda worker: worker.shutdown(wait=False))
+def get_memory_worker():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="chamber-memory")
+
+def _fold_chamber_memory(email, chamber_name):
+    try:
+        get_conversation_memory().catch_up(email, chamber_name)
+    except Exception:
+        log.exception("Chamber memory catch-up failed for %s", chamber_name)
+
+def prepare_legal_response(query, persona, lang, mode, email=None, chamber_name=None):
+    """Returns (ready_answer, prompt, cache_context): a canned/cached answer, or the IRAC prompt for the model
     
-    if is_farewell(query):
-        return get_formal_farewell()
+    With email/chamber_name the prompt carries the chamber's conversation memory, and retrieval is
+    limited to the chamber's attached documents if it has any. Such answers depend on the case, so
+    the answer cache keys them on the chamber's memory state and document scope (cache_context;
+    None for a general question) and serves them back until the case summary moves on.
+    """
+    
+    with span("intent"):
+        # brain.json fast path: no model, retrieval or DB work for trivial turns
+        canned = get_canned_responses().match(query)
+        if canned is not None:
+            return canned, None, None
+        
+        # a bare citation ("s.15 SRPO") is answered with the provision itself
+        try:
+            section = get_section_index().instant_lookup(query)
+        except Exception:
+            section = None
+        if section is not None:
+            return statute_sections.format_section(section), None, None
+        
+        intent = classify_intent(query)
+        
+        if intent.name == "greeting":
+            return get_formal_greeting(), None, None
+        
+        if intent.name == "farewell":
+            return get_formal_farewell(), None, None
+        
+        if intent.name == "thanks":
+            return get_formal_thanks(), None, None
+        
+        if intent.name != "legal":
+            return get_non_legal_response(), None, None
     
-    if is_thank_you(query):
-        return get_formal_thanks()
+    conversation = ""
+    scope = None
+    memory_state = None
+    if email and chamber_name:
+        with span("history"):
+            memory = get_conversation_memory()
+            conversation = memory.build_context(email, chamber_name, current_query=query)
+            memory_state = memory.state(email, chamber_name) if conversation else None
+            scope = db_get_chamber_documents(email, chamber_name) or None
     
-    if not is_legal_context(query):
-        return get_non_legal_response()
+    # bounded key: the rendered conversation changes every turn, the summary version only every few
+    cache_context = "\x1e".join([memory_state or ""] + sorted(scope or [])) if conversation or scope else None
+    with span("cache") as lookup:
+        cached = get_response_cache().get(query, mode, persona, lang, context=cache_context)
+        lookup.set(hit=bool(cached), case=cache_context is not None)
+    if cached:
+        return cached[0], None, None
     
     # Different prompts for Judge vs Advocate mode
     if mode == "judge":
@@ -632,7 +1077,37 @@ def get_legal_response(engine, query, persona, lang, mode):
         role = persona
         instruction = "Provide strategic legal counsel and advocacy."
     
-    prompt = f"""You are {role}, a distinguished legal expert.
+    with span("retrieval") as retrieval:
+        # an overview question about a named act gets its precomputed digest instead of raw excerpts
+        digests = get_digests_for(query, scope)
+        if digests:
+            statute_context = statute_digests.format_digests(digests, SYSTEM_CONFIG["RETRIEVAL_MAX_CHARS"])
+        else:
+            statute_context = get_statute_context(query, scope)
+        cited = get_cited_sections(query)
+        if cited:
+            statute_context = "\n\n".join(
+                [f"[{r['act']}, {r['label']} {r['section']}] {r['heading']}\n{r['body'][:SYSTEM_CONFIG['SECTION_MAX_CHARS']]}"
+                 for r in cited] + ([statute_context] if statute_context else []))
+        retrieval.set(digests=len(digests), cited=len(cited), scoped=scope is not None, chars=len(statute_context))
+    
+    with span("prompt"):
+        if statute_context:
+            context_block = f"""STATUTORY SOURCES (excerpts from the Sindh/Pakistan law library):
+{statute_context}
+
+Base the RULE section on these excerpts and cite them as [Act, p. N]. If they do not cover the issue, say so rather than quoting provisions from memory.
+"""
+        else:
+            context_block = ""
+    
+        if conversation:
+            context_block += f"""
+CASE FILE (this chamber's conversation so far; treat it as the facts of the matter):
+{conversation}
+"""
+    
+        prompt = f"""You are {role}, a distinguished legal expert.
 
 MODE: {mode.upper()}
 {instruction}
@@ -643,6 +1118,7 @@ CRITICAL INSTRUCTIONS:
 3. Be formal and professional
 4. Cite relevant legal provisions when applicable
 
+{context_block}
 Structure:
 
 **ISSUE:**
@@ -661,52 +1137,115 @@ User Query: {query}
 
 Provide IRAC analysis:"""
     
-    try:
-        response = engine.invoke(prompt).content
-        return response
-    except Exception as e:
-        return f"Error generating analysis: {str(e)}"
+    return None, prompt, cache_context
+
+def _chunk_text(chunk):
+    # Gemini may return content as a list of parts instead of a plain string
+    content = chunk.content
+    if isinstance(content, list):
+        return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return content or ""
+
+def stream_legal_response(engine, query, persona, lang, mode, prompt, cache_context=None):
+    """Yield answer tokens as the model produces them; cache the full text once complete"""
+    parts = []
+    usage = None
+    with span("llm") as call:
+        t0 = time.perf_counter()
+        try:
+            for chunk in engine.stream(prompt):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                text = _chunk_text(chunk)
+                if text:
+                    if not parts:
+                        call.set(ttft_ms=round((time.perf_counter() - t0) * 1000, 1))
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            call.set(error=type(e).__name__)
+            yield f"\n\nError generating analysis: {str(e)}"
+            return
+        finally:
+            # provider token counts when the stream reports them, else the 4-chars/token estimate
+            call.set(tokens_in=(usage or {}).get("input_tokens") or estimate_tokens(prompt),
+                     tokens_out=(usage or {}).get("output_tokens") or estimate_tokens("".join(parts)))
+    
+    response = "".join(parts)
+    if response:
+        get_response_cache().put(query, mode, persona, lang, response, context=cache_context)
+
+def get_legal_response(engine, query, persona, lang, mode, email=None, chamber_name=None):
+    """IRAC FORMAT with Judge/Advocate mode (blocking)"""
+    ready, prompt, cache_context = prepare_legal_response(query, persona, lang, mode, email, chamber_name)
+    if ready is not None:
+        return ready
+    return "".join(stream_legal_response(engine, query, persona, lang, mode, prompt, cache_context))
+
+def render_legal_response(query):
+    """Stream the answer into the current chat message and return the full text (None if no engine)
+    
+    The model gateway is only looked up once a prompt is actually needed, so canned and
+    cached answers work without touching the AI engine.
+    """
+    persona, lang, mode = st.session_state.sys_persona, st.session_state.sys_lang, st.session_state.ai_mode
+    with st.spinner("⚖️ Analyzing..."):
+        ready, prompt, cache_context = prepare_legal_response(
+            query, persona, lang, mode, st.session_state.user_email, st.session_state.active_ch
+        )
+    if ready is not None:
+        with span("render"):
+            st.markdown(ready)
+        return ready
+    engine = get_llm_gateway()
+    if engine is None:
+        return None
+    response = st.write_stream(stream_legal_response(engine, query, persona, lang, mode, prompt, cache_context))
+    with span("render"):
+        cited = get_cited_sections(response) if isinstance(response, str) else []
+        if cited:
+            with st.expander(f"📜 Cited provisions ({len(cited)})"):
+                for record in cited:
+                    st.markdown(statute_sections.format_section(record, max_chars=SYSTEM_CONFIG["SECTION_MAX_CHARS"]))
+    return response
 
 # ------------------------------------------------------------------------------
 # SECTION 7: EMAIL DISPATCH
 # ------------------------------------------------------------------------------
 
+@st.cache_resource(on_release=lambda outbox: outbox.close())
+def get_email_outbox():
+    """Background SMTP worker: one kept-alive session, batched sends, retries with backoff"""
+    outbox = SMTPOutbox(
+        get_db_pool(),
+        SYSTEM_CONFIG["SMTP_SERVER"],
+        SYSTEM_CONFIG["SMTP_PORT"],
+        username=st.secrets["EMAIL_USER"],
+        password=st.secrets["EMAIL_PASS"].replace(" ", ""),
+        batch_size=SYSTEM_CONFIG["EMAIL_BATCH_SIZE"],
+        max_attempts=SYSTEM_CONFIG["EMAIL_MAX_ATTEMPTS"]
+    )
+    outbox.start()  # delivers rows queued before a restart, not only after the next enqueue
+    return outbox
+
+@st.cache_resource(show_spinner=False)
+def start_background_workers():
+    """Once per process: warm the statute indexes and resume unsent briefs and unfinished uploads"""
+    # a chat turn arriving mid-build waits on st.cache_resource's per-key lock instead of building twice
+    warmer = threading.Thread(target=_warm_statute_indexes, name="statute-warmup", daemon=True)
+    add_script_run_ctx(warmer)
+    warmer.start()
+    get_library_ingestor()
+    try:
+        get_email_outbox()
+    except Exception:
+        log.warning("email outbox not started (EMAIL_USER/EMAIL_PASS secrets missing?)", exc_info=True)
+
 def send_email_brief(target_email, chamber_name, history):
+    """Queue the brief for background delivery; returns the outbox id (falsy on failure)"""
     try:
-        sender = st.secrets["EMAIL_USER"]
-        password = st.secrets["EMAIL_PASS"].replace(" ", "")
-        
-        msg = MIMEMultipart()
-        msg['From'] = f"Alpha Apex <{sender}>"
-        msg['To'] = target_email
-        msg['Subject'] = f"Legal Brief: {chamber_name} - {datetime.date.today()}"
-        
-        body = "=" * 70 + "\n"
-        body += "ALPHA APEX LEGAL INTELLIGENCE BRIEF\n"
-        body += "=" * 70 + "\n\n"
-        body += f"CHAMBER: {chamber_name}\n"
-        body += f"DATE: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        body += f"STATUS: CONFIDENTIAL\n\n"
-        body += "=" * 70 + "\n\n"
-        
-        for idx, msg_item in enumerate(history, 1):
-            role = "COUNSEL" if msg_item['role'] == 'user' else "AI ADVISOR"
-            body += f"[MESSAGE {idx} - {role}]\n"
-            body += "-" * 70 + "\n"
-            body += f"{msg_item['content']}\n\n"
-        
-        body += "=" * 70 + "\n"
-        body += f"Generated by Alpha Apex v{SYSTEM_CONFIG['VERSION_ID']}\n"
-        body += "=" * 70 + "\n"
-        
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        server = smtplib.SMTP(SYSTEM_CONFIG["SMTP_SERVER"], SYSTEM_CONFIG["SMTP_PORT"])
-        server.starttls()
-        server.login(sender, password)
-        server.send_message(msg)
-        server.quit()
-        return True
+        body = format_brief(chamber_name, history, SYSTEM_CONFIG['VERSION_ID'])
+        subject = f"Legal Brief: {chamber_name} - {datetime.date.today()}"
+        return get_email_outbox().enqueue(target_email, subject, body)
     except Exception as e:
         st.error(f"Email error: {e}")
         return False
@@ -743,6 +1282,9 @@ def render_main_interface():
     with st.sidebar:
         st.markdown("<div class='logo-text'>⚖️ ALPHA APEX</div>", unsafe_allow_html=True)
         st.markdown("<div class='sub-logo-text'>Leviathan v40.0 Ultimate</div>", unsafe_allow_html=True)
+        profile = cached_user_profile(st.session_state.user_email)
+        if profile:
+            st.caption(f"👤 {profile['name']} · {profile['queries']} queries")
         
         # AI MODE SELECTOR
         st.markdown("**AI Mode**")
@@ -770,16 +1312,14 @@ def render_main_interface():
         if nav == "Chambers":
             st.markdown("**Active Cases**")
             
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (st.session_state.user_email,))
-            chambers = [r[0] for r in c.fetchall()]
-            conn.close()
+            chambers = cached_chamber_names(st.session_state.user_email)
             
             if not chambers:
                 chambers = ["General Litigation Chamber"]
             
-            st.session_state.active_ch = st.radio("Select Case", chambers, label_visibility="collapsed")
+            # index follows active_ch so "Create" and search results can switch the case
+            active_idx = chambers.index(st.session_state.active_ch) if st.session_state.active_ch in chambers else 0
+            st.session_state.active_ch = st.radio("Select Case", chambers, index=active_idx, label_visibility="collapsed")
             
             col1, col2 = st.columns(2)
             with col1:
@@ -827,15 +1367,73 @@ def render_main_interface():
                     if st.button("No", key="del_no"):
                         st.session_state.show_delete_modal = False
                         st.rerun()
+
+            # documents this case is about: retrieval and Quick Actions search only these
+            attached = cached_chamber_documents(st.session_state.user_email, st.session_state.active_ch)
+            with st.expander(f"📎 Case Documents ({len(attached) or 'all'})"):
+                library = cached_library_documents()
+                selected = st.multiselect(
+                    "Attached acts",
+                    library,
+                    default=[f for f in attached if f in library],
+                    key=f"case_docs_{st.session_state.active_ch}",
+                    help="Leave empty to search the whole Law Library"
+                )
+                if st.button("💾 Save scope", key="save_case_docs", use_container_width=True):
+                    if db_set_chamber_documents(st.session_state.user_email, st.session_state.active_ch, selected):
+                        st.success("✓ Scope saved")
+                        st.rerun()
+                    else:
+                        st.warning("Create the case first")
+
+            with st.expander("📦 Export / Import"):
+                to_export = st.multiselect("Chambers", chambers, default=[st.session_state.active_ch]
+                                           if st.session_state.active_ch in chambers else [], key="export_chambers")
+                st.download_button(
+                    "⬇️ Download archive",
+                    data=chamber_archive_download(st.session_state.user_email, to_export),
+                    file_name=f"alpha-apex-chambers-{datetime.date.today()}.jsonl.gz",
+                    mime="application/gzip",
+                    on_click="ignore",
+                    disabled=not to_export,
+                    use_container_width=True
+                )
+                archive = st.file_uploader("Import archive", type=["gz"],
+                                           key=f"chamber_import_{st.session_state.get('import_nonce', 0)}")
+                if archive and st.button("📥 Import", key="import_chambers_btn", use_container_width=True):
+                    try:
+                        report = db_import_chambers(st.session_state.user_email, archive)
+                    except ValueError as e:
+                        st.error(f"Import failed: {e}")
+                    else:
+                        st.success(f"✓ Imported {len(report['chambers'])} case(s), {report['messages']} messages")
+                        if report["missing_documents"]:
+                            st.caption("Not in this library: " + ", ".join(sorted(set(report["missing_documents"]))))
+                        st.session_state.import_nonce = st.session_state.get("import_nonce", 0) + 1
+                        time.sleep(1)
+                        st.rerun()
+
+            st.divider()
+            
+            search_q = st.text_input("🔎 Search consultations", key="history_search", placeholder="e.g. eviction notice")
+            if search_q:
+                hits = db_search_messages(st.session_state.user_email, search_q)
+                if not hits:
+                    st.caption("No matches")
+                for hit in hits:
+                    role = "Counsel" if hit["role"] == "user" else "AI Advisor"
+                    st.markdown(f"**{hit['chamber']}** · {role} · {hit['ts']}\n\n{hit['snippet']}")
+                    if st.button("Open case", key=f"search_hit_{hit['id']}"):
+                        st.session_state.active_ch = hit["chamber"]
+                        st.rerun()
             
             st.divider()
             
             if st.button("📧 Email Brief", use_container_width=True):
                 history = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
                 if history:
-                    with st.spinner("Sending..."):
-                        if send_email_brief(st.session_state.user_email, st.session_state.active_ch, history):
-                            st.success("✓ Sent!")
+                    if send_email_brief(st.session_state.user_email, st.session_state.active_ch, history):
+                        st.success("✓ Queued - delivering in background")
                 else:
                     st.warning("No conversation")
         
@@ -848,6 +1446,7 @@ def render_main_interface():
             st.divider()
             if st.button("🚪 Logout", use_container_width=True):
                 st.session_state.logged_in = False
+                session_cache.forget(st.session_state, st.session_state.user_email)
                 st.rerun()
     
     # Main Content
@@ -875,24 +1474,39 @@ def render_main_interface():
             query = st.session_state.quick_action
             st.session_state.quick_action = None
             
-            db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", query)
-            with st.chat_message("user"):
-                st.markdown(query)
-            
-            with st.chat_message("assistant"):
-                with st.spinner("Analyzing..."):
-                    engine = get_ai_engine()
-                    if engine:
-                        response = get_legal_response(engine, query, st.session_state.sys_persona, st.session_state.sys_lang, st.session_state.ai_mode)
-                        st.markdown(response)
-                        db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "assistant", response)
+            with get_turn_tracer().turn(st.session_state.user_email, st.session_state.active_ch, "quick_action"):
+                with span("db_write"):
+                    db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", query)
+                with st.chat_message("user"):
+                    st.markdown(query)
+                
+                with st.chat_message("assistant"):
+                    response = render_legal_response(query)
+                    if response:
+                        with span("db_write"):
+                            db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "assistant", response)
             st.rerun()
         
         st.divider()
         
-        # Chat History
-        history = db_fetch_chamber_history(st.session_state.user_email, st.session_state.active_ch)
-        for msg in history:
+        # Chat History (last HISTORY_PAGE_SIZE messages, older pages on demand)
+        messages_version = get_data_versions().get(st.session_state.user_email, "messages")
+        with get_turn_tracer().turn(st.session_state.user_email, st.session_state.active_ch, "page"):
+            with span("history_fetch") as fetch:
+                window = chat_history.load_history_window(
+                    st.session_state, get_db_connection, st.session_state.user_email, st.session_state.active_ch,
+                    SYSTEM_CONFIG["HISTORY_PAGE_SIZE"], version=messages_version
+                )
+                fetch.set(messages=len(window["messages"]))
+        if window["has_more"] and st.button("⬆️ Load earlier messages", key="load_earlier"):
+            with get_turn_tracer().turn(st.session_state.user_email, st.session_state.active_ch, "page"):
+                with span("history_fetch", load_earlier=True) as fetch:
+                    window = chat_history.load_history_window(
+                        st.session_state, get_db_connection, st.session_state.user_email, st.session_state.active_ch,
+                        SYSTEM_CONFIG["HISTORY_PAGE_SIZE"], load_earlier=True, version=messages_version
+                    )
+                    fetch.set(messages=len(window["messages"]))
+        for msg in window["messages"]:
             with st.chat_message(msg["role"]):
                 st.markdown(msg["content"])
         
@@ -912,18 +1526,19 @@ def render_main_interface():
         query = text_input or voice_input
         
         if query:
-            db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", query)
-            
-            with st.chat_message("user"):
-                st.markdown(query)
-            
-            with st.chat_message("assistant"):
-                with st.spinner("⚖️ Analyzing..."):
-                    engine = get_ai_engine()
-                    if engine:
-                        response = get_legal_response(engine, query, st.session_state.sys_persona, st.session_state.sys_lang, st.session_state.ai_mode)
-                        st.markdown(response)
-                        db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "assistant", response)
+            with get_turn_tracer().turn(st.session_state.user_email, st.session_state.active_ch, "chat"):
+                with span("db_write"):
+                    db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "user", query)
+                
+                with st.chat_message("user"):
+                    st.markdown(query)
+                
+                with st.chat_message("assistant"):
+                    # tokens render as they arrive; the log write happens once the stream is done
+                    response = render_legal_response(query)
+                    if response:
+                        with span("db_write"):
+                            db_log_consultation(st.session_state.user_email, st.session_state.active_ch, "assistant", response)
             st.rerun()
     
     elif nav == "Law Library":
@@ -932,45 +1547,82 @@ def render_main_interface():
         if not os.path.exists(SYSTEM_CONFIG["DATA_REPOSITORY"]):
             os.makedirs(SYSTEM_CONFIG["DATA_REPOSITORY"])
         
-        files = [f for f in os.listdir(SYSTEM_CONFIG["DATA_REPOSITORY"]) if f.endswith('.pdf')]
-        
-        st.metric("Total PDFs", len(files))
-        
-        if files:
-            data = []
-            for file in files:
-                path = os.path.join(SYSTEM_CONFIG["DATA_REPOSITORY"], file)
-                size = os.path.getsize(path)
-                
-                try:
-                    reader = PdfReader(path)
-                    pages = len(reader.pages)
-                    status = "✓ Verified"
-                except:
-                    pages = "N/A"
-                    status = "⚠️ Error"
-                
-                data.append({
-                    "Filename": file,
-                    "Size (KB)": round(size / 1024, 2),
-                    "Pages": pages,
-                    "Status": status
-                })
+        # the startup warm-up syncs the same tables; on a cold start wait for it (st.cache_resource's
+        # per-key lock) instead of racing it into UNIQUE/locked errors
+        with st.spinner("Preparing the statute library..."):
+            _warm_statute_indexes()
+        
+        # stat-only for unchanged files; PDFs are parsed only when new or modified.
+        # Uploads are already fingerprinted ('Processing') and left to the background ingestor.
+        with get_db_connection() as conn:
+            library = law_ingest.sync_law_library(conn, SYSTEM_CONFIG["DATA_REPOSITORY"])
+            sections = statute_sections.sync_statute_sections(conn)
+            assets = law_ingest.fetch_library_rows(conn)
+        if library["added"] or library["updated"] or library["removed"]:
+            get_data_versions().bump(None, "library")
+        if sections["parsed"] or sections["removed"]:
+            get_section_index().refresh()
+            get_hybrid_retriever.clear()
+        
+        st.metric("Total PDFs", len(assets))
+        
+        if assets:
+            data = [{
+                "Filename": filename,
+                "Size (KB)": size_kb,
+                "Pages": pages if pages is not None else "N/A",
+                "Status": {"Verified": "✓ Verified", "Processing": "⏳ Processing"}.get(status, "⚠️ Error")
+            } for filename, size_kb, pages, status, _ in assets]
             
             df = pd.DataFrame(data)
             st.dataframe(df, use_container_width=True, hide_index=True)
         else:
             st.info("No PDFs found")
+        
+        st.divider()
+        st.subheader("📤 Add Documents")
+        # the key changes after each ingest so the uploader comes back empty
+        uploads = st.file_uploader(
+            "Case files, judgments or statutes (PDF)", type=["pdf"], accept_multiple_files=True,
+            key=f"library_upload_{st.session_state.get('upload_nonce', 0)}"
+        )
+        if uploads and st.button("📥 Add to Library", use_container_width=True):
+            ingestor = get_library_ingestor()
+            for upload in uploads:
+                job_id, filename = ingestor.submit(upload, upload.name, st.session_state.user_email)
+                if job_id is None:
+                    st.info(f"{upload.name} is already in the library as {filename}")
+            st.session_state.upload_nonce = st.session_state.get("upload_nonce", 0) + 1
+            st.session_state.uploads_active = True
+            st.rerun()
+        
+        # only the progress block polls, and only while something is ingesting
+        if not st.session_state.get("uploads_active") and get_library_ingestor().active():
+            st.session_state.uploads_active = True
+        st.fragment(render_upload_progress, run_every=2 if st.session_state.get("uploads_active") else None)()
+        
+        for job in get_library_ingestor().jobs():
+            if job["error"] and job["status"] in ("done", "failed"):
+                what = "could not be read" if job["status"] == "failed" else "is only partly indexed"
+                col1, col2 = st.columns([5, 1])
+                col1.warning(f"{job['filename']} {what}: {job['error']}")
+                if col2.button("🔁 Retry", key=f"retry_upload_{job['id']}"):
+                    get_library_ingestor().retry(job["id"])
+                    st.session_state.uploads_active = True
+                    st.rerun()
     
     elif nav == "System Admin":
         st.header("🛡️ System Administration")
         
-        tabs = st.tabs(["📊 Logs", "👥 Team"])
+        tabs = st.tabs(["📊 Logs", "⏱️ Latency", "⚡ Cache", "👥 Team"])
         
         with tabs[0]:
             st.subheader("Interaction Logs")
             log_limit = st.selectbox("Show:", [50, 100, 200], index=1)
             logs = db_get_interaction_logs(log_limit)
+            sink = get_telemetry_sink().stats()
+            st.caption(f"Telemetry writer: {sink['written']} written in {sink['batches']} batches · "
+                       f"{sink['queued']} queued · {sink['dropped']} dropped")
             
             if logs:
                 df = pd.DataFrame(logs)
@@ -979,6 +1631,57 @@ def render_main_interface():
                 st.info("No logs")
         
         with tabs[1]:
+            st.subheader("Chat Turn Latency")
+            tracer = get_turn_tracer()
+            turn_limit = st.selectbox("Last turns:", [100, 500, 2000], index=1, key="latency_turns")
+            samples = tracer.stage_samples(turn_limit)
+            
+            if samples:
+                stages = ["turn"] + [s for s in STAGES if s in samples]
+                summary = [{"Stage": stage, "Spans": len(samples[stage]),
+                            "p50 ms": round(percentile(samples[stage], 50), 1),
+                            "p95 ms": round(percentile(samples[stage], 95), 1),
+                            "p99 ms": round(percentile(samples[stage], 99), 1),
+                            "max ms": round(max(samples[stage]), 1)} for stage in stages if stage in samples]
+                st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+                
+                hist = pd.DataFrame({stage: dict(histogram(samples[stage])) for stage in stages
+                                     if stage in samples})
+                st.markdown("**Latency histogram (spans per bucket)**")
+                st.bar_chart(hist, sort=False)
+                
+                st.markdown("**Slowest turns**")
+                for trace in tracer.slowest_turns(10):
+                    started = datetime.datetime.fromtimestamp(trace["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+                    with st.expander(f"{trace['duration_ms']:.0f} ms · {trace['kind']} · {trace['chamber']} · "
+                                     f"{trace['email']} · {started}"):
+                        rows = [{"Stage": sp["stage"], "Start ms": round(sp["offset_ms"], 1),
+                                 "Duration ms": round(sp["duration_ms"], 1),
+                                 "Share": f"{sp['duration_ms'] / trace['duration_ms'] * 100:.0f}%" if trace["duration_ms"] else "-",
+                                 "Details": ", ".join(f"{k}={v}" for k, v in sp["attrs"].items())}
+                                for sp in trace["spans"]]
+                        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            else:
+                st.info("No traced turns yet")
+        
+        with tabs[2]:
+            st.subheader("Answer Cache")
+            cache = get_response_cache()
+            stats = cache.stats()
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Hit Rate", f"{stats['hit_rate'] * 100:.1f}%")
+            c2.metric("Exact Hits", stats["exact_memory"] + stats["exact_db"])
+            c3.metric("Semantic Hits", stats["semantic"])
+            c4.metric("Misses", stats["miss"])
+            case_rate = stats["case_hits"] / stats["case_lookups"] if stats["case_lookups"] else 0.0
+            st.caption(f"{stats['entries']} cached answers · {stats['lifetime_hits']} lifetime hits · "
+                       f"{stats['evicted']} evicted this process · chamber answers: {stats['case_hits']} of "
+                       f"{stats['case_lookups']} served from cache ({case_rate * 100:.1f}%)")
+            if st.button("🧹 Clear Cache"):
+                cache.clear()
+                st.rerun()
+        
+        with tabs[3]:
             st.subheader("🏗️ Team")
             team = [
                 {"Name": "Saim Ahmed", "Role": "Lead Architect", "Domain": "System Logic"},
@@ -1068,6 +1771,7 @@ def render_portal():
 
 if __name__ == "__main__":
     init_db()
+    start_background_workers()
     
     if not st.session_state.logged_in:
         render_portal()
@@ -11,8 +11,8 @@ sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 import streamlit as st
 import sqlite3
 import datetime
-import smtplib
 import json
+import logging
 import os
 import time
 import base64
@@ -22,9 +22,13 @@ from PyPDF2 import PdfReader
 import streamlit.components.v1 as components
 from langchain_google_genai import ChatGoogleGenerativeAI
 from streamlit_mic_recorder import speech_to_text
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
+from db_pool import ConnectionPool
+from db_migrations import run_migrations
+import chat_history
+from email_outbox import SMTPOutbox, format_brief
+
+log = logging.getLogger(__name__)
 
 # ==============================================================================
 # 1. THEME ENGINE & MOBILE SHADER ARCHITECTURE (FIXED)
@@ -91,50 +95,52 @@ def apply_leviathan_shaders(theme_mode):
 
 SQL_DB_FILE = "alpha_apex_leviathan_master_v24.db"
 
+@st.cache_resource
+def get_db_pool():
+    # one connection per session thread, shared pool per process
+    return ConnectionPool(SQL_DB_FILE)
+
 def get_db_connection():
-    # check_same_thread=False is critical for mobile server requests
-    return sqlite3.connect(SQL_DB_FILE, check_same_thread=False)
+    return get_db_pool().connection()
 
 def init_leviathan_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, full_name TEXT, vault_key TEXT, registration_date TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS law_assets (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT, filesize_kb REAL, page_count INTEGER, sync_timestamp TEXT)''')
-    conn.commit(); conn.close()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, full_name TEXT, vault_key TEXT, registration_date TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS law_assets (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT, filesize_kb REAL, page_count INTEGER, sync_timestamp TEXT)''')
+        run_migrations(conn)
 
 def db_create_vault_user(email, name, password):
     if not email or not password: return False
-    conn = get_db_connection(); c = conn.cursor()
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        c.execute("INSERT INTO users (email, full_name, vault_key, registration_date) VALUES (?,?,?,?)", (email, name, password, now))
-        c.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?,?,?)", (email, "Default High Court Chamber", now))
-        conn.commit(); conn.close(); return True
-    except: conn.close(); return False
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("INSERT INTO users (email, full_name, vault_key, registration_date) VALUES (?,?,?,?)", (email, name, password, now))
+            c.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?,?,?)", (email, "Default High Court Chamber", now))
+        return True
+    except sqlite3.Error: return False
 
 def db_verify_vault_access(email, password):
-    conn = get_db_connection(); c = conn.cursor()
-    c.execute("SELECT full_name FROM users WHERE email=? AND vault_key=?", (email, password))
-    res = c.fetchone(); conn.close(); return res[0] if res else None
+    with get_db_connection() as conn:
+        res = conn.execute("SELECT full_name FROM users WHERE email=? AND vault_key=?", (email, password)).fetchone()
+    return res[0] if res else None
 
 def db_log_consultation(email, chamber_name, role, content):
-    conn = get_db_connection(); c = conn.cursor()
-    c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
-    cid = c.fetchone()
-    if cid:
-        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?,?,?,?)", (cid[0], role, content, ts))
-        conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        cid = c.fetchone()
+        if cid:
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            c.execute("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?,?,?,?)", (cid[0], role, content, ts))
 
 def db_fetch_chamber_history(email, chamber_name):
-    conn = get_db_connection(); c = conn.cursor()
     q = 'SELECT m.sender_role, m.message_body FROM message_logs m JOIN chambers c ON m.chamber_id = c.id WHERE c.owner_email=? AND c.chamber_name=? ORDER BY m.id ASC'
-    c.execute(q, (email, chamber_name))
-    rows = [{"role": r, "content": b} for r, b in c.fetchall()]
-    conn.close(); return rows
+    with get_db_connection() as conn:
+        return [{"role": r, "content": b} for r, b in conn.execute(q, (email, chamber_name)).fetchall()]
 
 init_leviathan_db()
 
@@ -151,15 +157,25 @@ def execute_neural_synthesis(text, language_code):
     js = f"<script>window.speechSynthesis.cancel(); var m = new SpeechSynthesisUtterance('{clean}'); m.lang = '{language_code}'; window.speechSynthesis.speak(m);</script>"
     components.html(js, height=0)
 
+@st.cache_resource(on_release=lambda outbox: outbox.close())
+def get_email_outbox():
+    # background worker keeps one SMTP session open and retries with backoff
+    outbox = SMTPOutbox(get_db_pool(), 'smtp.gmail.com', 587, username=st.secrets["EMAIL_USER"], password=st.secrets["EMAIL_PASS"].replace(" ", ""))
+    outbox.start()  # delivers briefs queued before a restart, not only after the next enqueue
+    return outbox
+
 def dispatch_legal_brief_smtp(target, chamber, history):
     try:
-        user, pwd = st.secrets["EMAIL_USER"], st.secrets["EMAIL_PASS"].replace(" ", "")
-        content = f"LEGAL BRIEF: {chamber}\n\n"
-        for e in history: content += f"[{e['role'].upper()}]: {e['content']}\n\n"
-        msg = MIMEMultipart(); msg['From'] = user; msg['To'] = target; msg['Subject'] = f"Brief: {chamber}"
-        msg.attach(MIMEText(content, 'plain', 'utf-8'))
-        s = smtplib.SMTP('smtp.gmail.com', 587); s.starttls(); s.login(user, pwd); s.send_message(msg); s.quit(); return True
-    except: return False
+        return get_email_outbox().enqueue(target, f"Brief: {chamber}", format_brief(chamber, history, "24.0"))
+    except (KeyError, OSError, sqlite3.Error):
+        # missing EMAIL_USER/EMAIL_PASS secrets or a database error; SMTP failures are retried by the outbox
+        log.exception("Could not queue the brief for %s", chamber)
+        return False
+
+try:
+    get_email_outbox()
+except (KeyError, OSError):
+    log.warning("email outbox not started (EMAIL_USER/EMAIL_PASS secrets missing?)", exc_info=True)
 
 # ==============================================================================
 # 4. UI: CHAMBERS
@@ -173,19 +189,21 @@ def render_chamber_workstation():
         apply_leviathan_shaders(mode)
         lang = st.selectbox("Language", list(lex.keys()))
         u_mail = st.session_state.user_email
-        conn = get_db_connection(); c = conn.cursor()
-        ch_list = [r[0] for r in c.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (u_mail,)).fetchall()]
-        conn.close()
+        with get_db_connection() as conn:
+            ch_list = [r[0] for r in conn.execute("SELECT chamber_name FROM chambers WHERE owner_email=?", (u_mail,)).fetchall()]
         st.session_state.current_chamber = st.selectbox("Chamber", ch_list if ch_list else ["Default"])
         st.markdown('<div class="sidebar-briefing"><b>🤖 PERSONA:</b> Senior Advocate<br><b>METHOD:</b> IRAC</div>', unsafe_allow_html=True)
         if st.button("📧 Send Email"):
             if dispatch_legal_brief_smtp(u_mail, st.session_state.current_chamber, db_fetch_chamber_history(u_mail, st.session_state.current_chamber)):
-                st.sidebar.success("Sent")
+                st.sidebar.success("Queued")
         if st.button("🚪 Logout"):
             st.session_state.clear(); st.rerun()
 
     st.header(f"💼 {st.session_state.current_chamber}")
-    for e in db_fetch_chamber_history(st.session_state.user_email, st.session_state.current_chamber):
+    window = chat_history.load_history_window(st.session_state, get_db_connection, st.session_state.user_email, st.session_state.current_chamber)
+    if window["has_more"] and st.button("⬆️ Load earlier", key="load_earlier"):
+        window = chat_history.load_history_window(st.session_state, get_db_connection, st.session_state.user_email, st.session_state.current_chamber, load_earlier=True)
+    for e in window["messages"]:
         with st.chat_message(e["role"]): st.write(e["content"])
 
     t_in = st.chat_input("Enter Query...")
@@ -0,0 +1,129 @@
+# ==============================================================================
+# BENCHMARK: chamber export/import, streamed archive vs the in-memory brief
+# ==============================================================================
+# Builds a throwaway database with one chamber of N messages (alternating
+# short counsel questions and long IRAC answers), then:
+#   - brief:  db_fetch_chamber_history + format_brief, the only export so far
+#   - export: chamber_archive.export_chambers into a gzip JSONL file
+#   - import: chamber_archive.import_chambers of that file for another user
+# Each is run once for wall time and once under tracemalloc for peak Python
+# memory, across sizes, so flat export/import memory shows up as a constant
+# column while the brief grows with N.
+#
+#     python benchmarks/bench_chamber_archive.py --sizes 5000 50000
+# ==============================================================================
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chamber_archive  # noqa: E402
+from db_migrations import run_migrations  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+from email_outbox import format_brief  # noqa: E402
+
+QUESTION = "Can my landlord evict me without notice under the Sindh Rented Premises Ordinance? "
+ANSWER = ("ISSUE: whether the tenant may be ejected. RULE: SRPO 1979 s.15 requires an application to the Rent "
+          "Controller on the stated grounds. APPLICATION: no default in rent, no personal bona fide need shown. "
+          "CONCLUSION: ejectment without an order is unlawful. ") * 4
+
+
+def build_database(path, n_messages):
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE users (email TEXT PRIMARY KEY, full_name TEXT, vault_key TEXT, registration_date TEXT, "
+                     "last_login TEXT, total_queries INTEGER DEFAULT 0, provider TEXT DEFAULT 'Local')")
+        conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, "
+                     "init_date TEXT)")
+        conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, "
+                     "sender_role TEXT, message_body TEXT, ts_created TEXT)")
+        run_migrations(conn)
+        for email in ("source@example.pk", "target@example.pk"):
+            conn.execute("INSERT INTO users (email, full_name) VALUES (?, ?)", (email, email.split("@")[0]))
+        chamber_id = conn.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) "
+                                  "VALUES ('source@example.pk', 'Tenancy Matter', '2025-01-01')").lastrowid
+        conn.execute("INSERT INTO law_assets (filename, asset_status) VALUES ('Sindh Rented Premises Ordinance,1979.pdf', "
+                     "'Verified')")
+        conn.execute("INSERT INTO chamber_documents VALUES (?, 'Sindh Rented Premises Ordinance,1979.pdf', '2025-01-01')",
+                     (chamber_id,))
+        rng = random.Random(7)
+        conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)",
+                         ((chamber_id, "user" if i % 2 == 0 else "assistant",
+                           (QUESTION if i % 2 == 0 else ANSWER) + str(rng.random()), "2025-01-01 00:00:00")
+                          for i in range(n_messages)))
+    return pool
+
+
+def brief(pool):
+    with pool.connection() as conn:
+        rows = conn.execute("""SELECT m.sender_role, m.message_body FROM message_logs m
+                               JOIN chambers c ON m.chamber_id = c.id
+                               WHERE c.owner_email='source@example.pk' AND c.chamber_name='Tenancy Matter'
+                               ORDER BY m.id ASC""").fetchall()
+    return len(format_brief("Tenancy Matter", [{"role": r, "content": b} for r, b in rows], "bench"))
+
+
+def export(pool, path):
+    with pool.connection() as conn, open(path, "wb") as out:
+        chamber_archive.export_chambers(conn, "source@example.pk", ["Tenancy Matter"], out)
+    return os.path.getsize(path)
+
+
+def import_(pool, path):
+    with pool.connection() as conn, open(path, "rb") as src:
+        report = chamber_archive.import_chambers(conn, "target@example.pk", src)
+    return report["messages"]
+
+
+def clear_target(pool, *_args):
+    """Remove imported chambers so the next import run starts from the same state"""
+    with pool.connection() as conn:
+        ids = [r[0] for r in conn.execute("SELECT id FROM chambers WHERE owner_email='target@example.pk'")]
+        for chamber_id in ids:
+            conn.execute("DELETE FROM message_logs WHERE chamber_id=?", (chamber_id,))
+            conn.execute("DELETE FROM chamber_documents WHERE chamber_id=?", (chamber_id,))
+            conn.execute("DELETE FROM chambers WHERE id=?", (chamber_id,))
+
+
+def measure(fn, args, reset=None):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    wall = time.perf_counter() - t0
+    if reset:
+        reset(*args)
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if reset:
+        reset(*args)
+    return wall, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamed chamber archive vs in-memory brief")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} | {'step':<7} | {'wall':>8} | {'peak mem':>9} | {'output':>12}")
+    print("-" * 58)
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = build_database(os.path.join(tmp, "bench.db"), n)
+            archive = os.path.join(tmp, "chambers.jsonl.gz")
+            for step, fn, fn_args, reset, unit in (("brief", brief, (pool,), None, "chars"),
+                                                   ("export", export, (pool, archive), None, "bytes"),
+                                                   ("import", import_, (pool, archive), clear_target, "messages")):
+                wall, peak, result = measure(fn, fn_args, reset)
+                print(f"{n:>9,} | {step:<7} | {wall:>7.2f}s | {peak / 2**20:>7.1f}MB | {result:>12,} {unit}")
+            pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# ==============================================================================
+# BENCHMARK: answer-cache hit rate for chamber turns, by cache key
+# ==============================================================================
+# Simulates counsel working in chambers: each turn asks a question drawn from a
+# small per-chamber pool (people re-ask, rerun and regenerate), logs the
+# question and answer, then runs the background memory catch-up. Every lookup
+# is tried against two caches keyed on
+#   conversation - the whole rendered conversation block (the old key)
+#   memory state - chamber id + summary version (what Finalcode uses now)
+# and the hit rate of each is reported, plus the semantic-tier lookup time
+# for a partition of --semantic-entries general answers.
+#
+#     python benchmarks/bench_chamber_cache.py --chambers 20 --turns 30
+# ==============================================================================
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_memory import ConversationMemory  # noqa: E402
+from db_migrations import run_migrations  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+from legal_retrieval import HashingEmbeddings  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+QUESTIONS = [
+    "Can my landlord evict me for two months of unpaid rent?",
+    "What notice must the landlord give before filing for ejectment?",
+    "Can the rent be increased during the tenancy?",
+    "Is a verbal tenancy agreement enforceable?",
+    "Which forum hears a rent case in Karachi?",
+    "Can I deposit the rent in court if the landlord refuses it?",
+]
+
+
+def build_pool(path, chambers):
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT)")
+        conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, "
+                     "sender_role TEXT, message_body TEXT, ts_created TEXT)")
+        run_migrations(conn)
+        conn.executemany("INSERT INTO chambers (owner_email, chamber_name) VALUES ('c@x.pk', ?)",
+                         [(f"Case {i}",) for i in range(chambers)])
+    return pool
+
+
+def log(pool, chamber, role, body):
+    with pool.connection() as conn:
+        conn.execute("""INSERT INTO message_logs (chamber_id, sender_role, message_body)
+                        SELECT id, ?, ? FROM chambers WHERE owner_email='c@x.pk' AND chamber_name=?""",
+                     (role, body, chamber))
+
+
+def simulate(pool, chambers, turns, repeat_rate, seed):
+    memory = ConversationMemory(pool)
+    caches = {"conversation": ResponseCache(pool), "memory state": ResponseCache(pool)}
+    rng = random.Random(seed)
+    for _turn in range(turns):
+        for i in range(chambers):
+            chamber = f"Case {i}"
+            pool_size = max(1, int(len(QUESTIONS) * (1 - repeat_rate)))
+            query = rng.choice(QUESTIONS[:pool_size])
+            log(pool, chamber, "user", query)
+            conversation = memory.build_context("c@x.pk", chamber, current_query=query)
+            keys = {"conversation": conversation or None,
+                    "memory state": memory.state("c@x.pk", chamber) if conversation else None}
+            answer = f"Answer to {query}"
+            for name, cache in caches.items():
+                if cache.get(query, "advocate", "counsel", "English", context=keys[name]) is None:
+                    cache.put(query, "advocate", "counsel", "English", answer, context=keys[name])
+            log(pool, chamber, "assistant", answer)
+            memory.catch_up("c@x.pk", chamber)
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def time_semantic(pool, entries, repeats):
+    cache = ResponseCache(pool, embedder=HashingEmbeddings(), semantic_threshold=0.99, evict_every=10 ** 9)
+    for i in range(entries):
+        cache.put(f"general question number {i} about tenancy", "advocate", "counsel", "Urdu", f"answer {i}")
+    cache.get("warm the partition", "advocate", "counsel", "Urdu")
+    latencies = []
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        cache.get(f"an unseen question {i} on bail", "advocate", "counsel", "Urdu")
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chamber answer-cache hit rate by cache key")
+    parser.add_argument("--chambers", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--repeat-rate", type=float, default=0.5,
+                        help="share of the question pool withheld, so higher means more re-asked questions")
+    parser.add_argument("--semantic-entries", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = build_pool(os.path.join(tmp, "bench.db"), args.chambers)
+        stats = simulate(pool, args.chambers, args.turns, args.repeat_rate, args.seed)
+        semantic_ms = time_semantic(pool, args.semantic_entries, 50)
+        pool.close_all()
+
+    print(f"{args.chambers} chambers x {args.turns} turns\n")
+    print(f"{'cache key':<14} | {'case lookups':>12} | {'hits':>6} | {'hit rate':>8}")
+    print("-" * 50)
+    for name, s in stats.items():
+        rate = s["case_hits"] / s["case_lookups"] if s["case_lookups"] else 0.0
+        print(f"{name:<14} | {s['case_lookups']:>12} | {s['case_hits']:>6} | {rate * 100:>7.1f}%")
+    print(f"\nsemantic miss over {args.semantic_entries} entries: {semantic_ms:.2f}ms p50")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# ==============================================================================
+# BENCHMARK: chamber document scope, whole library vs a chamber's attached acts
+# ==============================================================================
+# Ingests DATA/ like bench_hybrid_retrieval, builds BM25 + a vector store
+# (numpy or Chroma, offline hashing embeddings by default), then runs the
+# labelled tenancy questions unscoped and scoped to a tenancy chamber's acts
+# (SRPO + KRRA + the rent report). Reports retrieval latency and the size of
+# the statute context block that goes into the prompt, plus how many of the
+# returned excerpts come from outside the chamber's acts (prompt noise).
+#
+#     python benchmarks/bench_chamber_scope.py --backend numpy -k 4
+# ==============================================================================
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import hybrid_retrieval  # noqa: E402
+import law_ingest  # noqa: E402
+import legal_retrieval  # noqa: E402
+from bench_hybrid_retrieval import LABELLED, build_corpus  # noqa: E402
+
+TENANCY_SCOPE = [
+    "Sindh Rented Premises Ordinance,1979.pdf",
+    "THE KARACHI RENT RESTRICTION ACT, 1953.pdf",
+    "RENT RESTRICTION LAWS.pdf",
+]
+
+
+def run(name, retrieve, k, max_chars, scope, repeats):
+    latencies, sizes, outside = [], [], 0
+    for _ in range(repeats):
+        for question, _labels in LABELLED:
+            t0 = time.perf_counter()
+            docs = retrieve(question, k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            sizes.append(len(legal_retrieval.format_context(docs, max_chars)))
+            outside += sum(d.metadata.get("source") not in scope for d in docs)
+    latencies.sort()
+    n = len(latencies)
+    print(f"{name:<24} | {statistics.median(latencies):>7.2f}ms | {latencies[int(0.95 * (n - 1))]:>7.2f}ms | "
+          f"{statistics.mean(sizes):>8.0f} | {outside / n:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unscoped vs chamber-scoped statute retrieval")
+    parser.add_argument("--data", default=os.path.join(ROOT, "DATA"))
+    parser.add_argument("--provider", default="local", help="embedding provider: local | hf | google")
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "chroma"])
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--max-chars", type=int, default=6000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool, bm25, _build, _spans = build_corpus(os.path.join(tmp, "bench.db"), args.data)
+        embeddings = legal_retrieval.get_embedding_provider(args.provider, os.environ.get("GOOGLE_API_KEY"))
+        store = legal_retrieval.open_vectorstore(os.path.join(tmp, "vectors"), embeddings, args.provider,
+                                                 backend=args.backend)
+        with pool.connection() as conn:
+            legal_retrieval.sync_corpus(store, args.data,
+                                        page_loader=lambda filename: law_ingest.load_asset_pages(conn, filename))
+        retriever = hybrid_retrieval.HybridRetriever(bm25, store, rerank=True)
+        scope = set(TENANCY_SCOPE)
+
+        print(f"{len(LABELLED)} questions x {args.repeats}, k={args.k}, backend={args.backend}, "
+              f"scope={len(TENANCY_SCOPE)} of {len({d.metadata['source'] for d in bm25.docs})} documents\n")
+        print(f"{'retriever':<24} | {'p50':>9} | {'p95':>9} | {'ctx chars':>8} | {'off-scope/q':>10}")
+        print("-" * 74)
+        for label, sources in (("all", None), ("scoped", TENANCY_SCOPE)):
+            run(f"bm25 {label}", lambda q, k: retriever.keyword(q, k, sources), args.k, args.max_chars, scope, args.repeats)
+            run(f"vector {label}", lambda q, k: legal_retrieval.retrieve_sections(store, q, k, sources),
+                args.k, args.max_chars, scope, args.repeats)
+            run(f"hybrid {label}", lambda q, k: retriever.retrieve(q, k, sources), args.k, args.max_chars, scope,
+                args.repeats)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
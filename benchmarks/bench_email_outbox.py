@@ -0,0 +1,154 @@
+# ==============================================================================
+# BENCHMARK: email brief dispatch, inline SMTP vs the SQLite outbox (offline)
+# ==============================================================================
+# Runs a local aiosmtpd server (pip install aiosmtpd) that can refuse a share
+# of messages with a transient 451, then sends N briefs two ways:
+#   inline  - the old path: connect/EHLO/send/QUIT on the caller's thread
+#   outbox  - enqueue() on the caller's thread, one kept-alive session in the
+#             worker, retries with backoff
+# Reports the time the caller is blocked per click and end-to-end drain time.
+#
+#     python benchmarks/bench_email_outbox.py --messages 200 --history 40 --fail-rate 0.1
+# ==============================================================================
+
+import argparse
+import os
+import random
+import smtplib
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_migrations import run_migrations  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+from email_outbox import SMTPOutbox, format_brief  # noqa: E402
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("aiosmtpd is required for this benchmark: pip install aiosmtpd")
+
+
+class FlakyHandler:
+    def __init__(self, fail_rate, seed):
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.delivered = 0
+        self.refused = 0
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.rng.random() < self.fail_rate:
+            self.refused += 1
+            return "451 4.3.0 Try again later (simulated)"
+        self.delivered += 1
+        return "250 OK"
+
+
+def make_history(turns):
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Turn {i}: tenancy dispute under the Sindh Rented Premises Ordinance. " * 8}
+            for i in range(turns)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_inline(port, n, history):
+    blocked = []
+    failures = 0
+    for i in range(n):
+        start = time.perf_counter()
+        try:
+            body = format_brief(f"Chamber {i}", history, "bench")
+            outbox = SMTPOutbox(None, "127.0.0.1", port, sender="bench@localhost", use_tls=False)
+            server = smtplib.SMTP("127.0.0.1", port)
+            server.send_message(outbox._build_message(f"user{i}@localhost", f"Legal Brief: Chamber {i}", body))
+            server.quit()
+        except smtplib.SMTPException:
+            failures += 1
+        blocked.append(time.perf_counter() - start)
+    return blocked, failures
+
+
+def run_outbox(port, n, history, db_path):
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        run_migrations(conn)
+    outbox = SMTPOutbox(pool, "127.0.0.1", port, sender="bench@localhost", use_tls=False,
+                        base_delay=0.05, max_delay=0.5, poll_interval=0.05, max_attempts=10)
+    blocked = []
+    started = time.perf_counter()
+    for i in range(n):
+        start = time.perf_counter()
+        outbox.enqueue(f"user{i}@localhost", f"Legal Brief: Chamber {i}", format_brief(f"Chamber {i}", history, "bench"))
+        blocked.append(time.perf_counter() - start)
+    deadline = time.monotonic() + 120
+    while outbox.stats()["backlog"] and time.monotonic() < deadline:
+        outbox.flush(timeout=1)
+        time.sleep(0.05)
+    drained = time.perf_counter() - started
+    stats = outbox.stats()
+    outbox.close()
+    pool.close_all()
+    return blocked, drained, stats
+
+
+def report(label, blocked):
+    print(f"{label:<8} blocked per click: p50 {statistics.median(blocked) * 1000:7.2f} ms   "
+          f"p95 {percentile(blocked, 95) * 1000:7.2f} ms   max {max(blocked) * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline SMTP vs outbox dispatch against a local aiosmtpd server")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--history", type=int, default=40, help="messages per chamber brief")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="share of DATA commands refused with 451")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    history = make_history(args.history)
+    handler = FlakyHandler(args.fail_rate, args.seed)
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        t0 = time.perf_counter()
+        inline_blocked, inline_failures = run_inline(port, args.messages, history)
+        inline_total = time.perf_counter() - t0
+        inline_sessions = handler.sessions
+
+        handler.sessions = 0
+        with tempfile.TemporaryDirectory() as tmp:
+            outbox_blocked, drained, stats = run_outbox(port, args.messages, history, os.path.join(tmp, "outbox.db"))
+    finally:
+        controller.stop()
+
+    print(f"{args.messages} briefs x {args.history} messages, {args.fail_rate:.0%} transient 451s\n")
+    report("inline", inline_blocked)
+    print(f"         total {inline_total:.2f}s, {inline_sessions} SMTP sessions, "
+          f"{inline_failures} briefs lost (no retry)")
+    report("outbox", outbox_blocked)
+    print(f"         drained in {drained:.2f}s, {stats['connects']} SMTP session(s), "
+          f"sent {stats['by_status'].get('sent', 0)}, retried {stats['retried']}, failed {stats['by_status'].get('failed', 0)}")
+
+
+if __name__ == "__main__":
+    main()
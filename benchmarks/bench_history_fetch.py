@@ -0,0 +1,101 @@
+# ==============================================================================
+# BENCHMARK: chamber history fetch latency, before vs after schema migrations
+# ==============================================================================
+# Builds a throwaway database shaped like advocate_ai_v2.db, fills it with N
+# messages spread over many chambers, and times the db_fetch_chamber_history /
+# db_log_consultation queries with the pre-migration schema (rowid only) and
+# again after run_migrations() has added the composite indexes.
+#
+#     python benchmarks/bench_history_fetch.py --sizes 10000 100000 1000000
+# ==============================================================================
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_migrations import run_migrations  # noqa: E402
+
+HISTORY_SQL = """SELECT m.sender_role, m.message_body
+                 FROM message_logs m
+                 JOIN chambers c ON m.chamber_id = c.id
+                 WHERE c.owner_email=? AND c.chamber_name=?
+                 ORDER BY m.id ASC"""
+LOOKUP_SQL = "SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?"
+
+
+def build_database(path, n_messages, n_users, chambers_per_user):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE users (email TEXT PRIMARY KEY, full_name TEXT)")
+    conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT)")
+    conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT)")
+    conn.execute("CREATE TABLE system_telemetry (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT, event_type TEXT, description TEXT, event_timestamp TEXT)")
+
+    chambers = []
+    for u in range(n_users):
+        email = f"counsel{u}@example.pk"
+        conn.execute("INSERT INTO users VALUES (?, ?)", (email, f"Counsel {u}"))
+        for k in range(chambers_per_user):
+            cur = conn.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, '2025-01-01')",
+                               (email, f"Case {k}"))
+            chambers.append((cur.lastrowid, email, f"Case {k}"))
+
+    rng = random.Random(7)
+    body = "ISSUE: tenancy. RULE: SRPO 1979 s.15. APPLICATION: ... CONCLUSION: ..." * 3
+    batch = []
+    for i in range(n_messages):
+        batch.append((rng.choice(chambers)[0], "user" if i % 2 == 0 else "assistant", body, "2025-01-01 00:00:00"))
+        if len(batch) >= 50000:
+            conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    return conn, chambers
+
+
+def time_queries(conn, chambers, repeats):
+    rng = random.Random(11)
+    fetch, lookup = [], []
+    for _ in range(repeats):
+        _, email, name = rng.choice(chambers)
+        t0 = time.perf_counter()
+        conn.execute(HISTORY_SQL, (email, name)).fetchall()
+        fetch.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        conn.execute(LOOKUP_SQL, (email, name)).fetchone()
+        lookup.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(fetch), statistics.median(lookup)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chamber history fetch latency before/after migrations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chambers-per-user", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} | {'fetch before':>12} | {'fetch after':>11} | {'lookup before':>13} | {'lookup after':>12}")
+    print("-" * 70)
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn, chambers = build_database(os.path.join(tmp, "bench.db"), n, args.users, args.chambers_per_user)
+            before = time_queries(conn, chambers, args.repeats)
+            run_migrations(conn)
+            conn.execute("ANALYZE")
+            after = time_queries(conn, chambers, args.repeats)
+            conn.close()
+        print(f"{n:>10} | {before[0]:>10.2f}ms | {after[0]:>9.2f}ms | {before[1]:>11.3f}ms | {after[1]:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# ==============================================================================
+# BENCHMARK: statute retrieval quality/latency, BM25 vs vectors vs hybrid RRF
+# ==============================================================================
+# Ingests DATA/ into a throwaway database (law_ingest + statute_sections),
+# builds the BM25 section index and a Chroma collection with the chosen
+# embedding provider, then runs a hand-labelled set of Sindh tenancy questions
+# through each retriever and reports hit@k, recall@k, MRR and latency.
+#
+# A retrieved section counts if it is one of the labelled provisions; a
+# retrieved page chunk counts if its page lies inside a labelled provision's
+# page span.
+#
+#     python benchmarks/bench_hybrid_retrieval.py --provider local -k 5
+#     python benchmarks/bench_hybrid_retrieval.py --provider google   # needs GOOGLE_API_KEY
+# ==============================================================================
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hybrid_retrieval  # noqa: E402
+import law_ingest  # noqa: E402
+import legal_retrieval  # noqa: E402
+import statute_sections  # noqa: E402
+from db_migrations import run_migrations  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+
+SRPO = "sindh rented premises ordinance"
+KRRA = "karachi rent restriction act"
+CHAA = "cantonments house accommodation act"
+CONST = "constitution of islamic republic of pakistan"
+
+# (question, {act_key: {section, ...}})
+LABELLED = [
+    ("my landlord kicked me out without any court order", {SRPO: {"13", "15"}, KRRA: {"10"}}),
+    ("on what grounds can the Rent Controller order eviction of a tenant", {SRPO: {"15"}, KRRA: {"10"}}),
+    ("landlord wants the shop back for his son's personal use", {SRPO: {"15", "2"}}),
+    ("tenant has not paid rent for three months, can I evict him", {SRPO: {"15", "16"}, KRRA: {"10"}}),
+    ("landlord refuses to accept my rent, where do I deposit it", {SRPO: {"10"}}),
+    ("landlord cut off my electricity and water supply", {SRPO: {"11"}}),
+    ("who pays for repairs of rented premises", {SRPO: {"12"}, KRRA: {"6"}, CHAA: {"16", "17"}}),
+    ("how is fair rent determined", {SRPO: {"8"}, KRRA: {"4"}}),
+    ("how much can the landlord increase the rent every year", {SRPO: {"9"}, KRRA: {"7"}}),
+    ("does the tenancy agreement have to be in writing and attested", {SRPO: {"5"}}),
+    ("can the landlord charge rent higher than agreed", {SRPO: {"7"}, KRRA: {"7"}}),
+    ("compensation if the landlord evicted me in bad faith", {SRPO: {"17"}}),
+    ("time limit to appeal against the Controller's eviction order", {SRPO: {"21"}, KRRA: {"15"}}),
+    ("the property was sold, do I have to pay rent to the new owner", {SRPO: {"18"}}),
+    ("is the Rent Controller bound by the Civil Procedure Code", {SRPO: {"19", "20"}}),
+    ("which premises are covered by the rent law in urban areas", {SRPO: {"3", "2"}}),
+    ("who can be appointed as Rent Controller", {SRPO: {"4"}}),
+    ("definition of landlord and tenant", {SRPO: {"2"}, KRRA: {"2"}, CHAA: {"2"}}),
+    ("military authorities taking over a house in a cantonment", {CHAA: {"5", "6", "7"}}),
+    ("owner of a cantonment house disputes the rent fixed", {CHAA: {"15", "19"}}),
+    ("Article 199 writ petition in the High Court against the rent tribunal", {CONST: {"199"}}),
+    ("constitutional protection of property rights against deprivation", {CONST: {"23", "24"}}),
+    ("right to a fair trial in the rent case", {CONST: {"10A"}}),
+    ("landlord used force to throw out the tenant's belongings", {KRRA: {"20"}, SRPO: {"13"}}),
+    ("penalty for a landlord who disturbs easements", {KRRA: {"11", "13"}}),
+]
+
+
+def build_corpus(db_path, data_dir):
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        run_migrations(conn)
+        law_ingest.sync_law_library(conn, data_dir)
+        statute_sections.sync_statute_sections(conn)
+        t0 = time.perf_counter()
+        bm25 = hybrid_retrieval.build_bm25_index(conn)
+        build = time.perf_counter() - t0
+        spans = section_spans(conn)
+    return pool, bm25, build, spans
+
+
+def section_spans(conn):
+    """{(act, section): (first_page, last_page)} from the start page of the next section"""
+    rows = conn.execute("SELECT asset_id, act, act_key, section, page_no FROM statute_sections ORDER BY asset_id, ord").fetchall()
+    spans = {}
+    for i, (asset_id, act, key, section, page) in enumerate(rows):
+        nxt = rows[i + 1][4] if i + 1 < len(rows) and rows[i + 1][0] == asset_id else page
+        spans[(key, section)] = (act, page, max(page, nxt))
+    return spans
+
+
+def relevant(doc, labels, spans):
+    key = statute_sections.act_key(doc.metadata.get("act"))
+    wanted = labels.get(key, ())
+    if doc.metadata.get("section"):
+        return doc.metadata["section"].split()[-1] in wanted
+    page = doc.metadata.get("page")
+    return any(spans.get((key, s), (None, -1, -2))[1] <= page <= spans.get((key, s), (None, -1, -2))[2] for s in wanted)
+
+
+def matched_labels(docs, labels, spans):
+    found = set()
+    for doc in docs:
+        key = statute_sections.act_key(doc.metadata.get("act"))
+        for section in labels.get(key, ()):
+            if doc.metadata.get("section"):
+                if doc.metadata["section"].split()[-1] == section:
+                    found.add((key, section))
+            elif (key, section) in spans and spans[(key, section)][1] <= doc.metadata.get("page") <= spans[(key, section)][2]:
+                found.add((key, section))
+    return found
+
+
+def evaluate(name, retrieve, k, spans):
+    hits, recalls, rr, latencies = 0, [], [], []
+    for question, labels in LABELLED:
+        t0 = time.perf_counter()
+        docs = retrieve(question, k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        flags = [relevant(d, labels, spans) for d in docs]
+        hits += any(flags)
+        total = sum(len(v) for v in labels.values())
+        recalls.append(len(matched_labels(docs, labels, spans)) / total)
+        rr.append(next((1 / (i + 1) for i, f in enumerate(flags) if f), 0.0))
+    n = len(LABELLED)
+    latencies.sort()
+    print(f"{name:<16} | {hits / n:>6.2f} | {statistics.mean(recalls):>9.2f} | {statistics.mean(rr):>5.2f} | "
+          f"{statistics.median(latencies):>7.2f}ms | {latencies[int(0.95 * (n - 1))]:>7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 vs vector vs hybrid statute retrieval on labelled tenancy questions")
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DATA"))
+    parser.add_argument("--provider", default="local", help="embedding provider: local | hf | google")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--candidates", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool, bm25, bm25_build, spans = build_corpus(os.path.join(tmp, "bench.db"), args.data)
+        embeddings = legal_retrieval.get_embedding_provider(args.provider, os.environ.get("GOOGLE_API_KEY"))
+        store = legal_retrieval.open_vectorstore(os.path.join(tmp, "chroma"), embeddings, args.provider)
+        t0 = time.perf_counter()
+        with pool.connection() as conn:
+            chunks = legal_retrieval.sync_corpus(store, args.data,
+                                                 page_loader=lambda filename: law_ingest.load_asset_pages(conn, filename)
+                                                 )["added"]
+        vector_build = time.perf_counter() - t0
+
+        plain = hybrid_retrieval.HybridRetriever(bm25, store, rrf_k=args.rrf_k, candidates=args.candidates)
+        reranked = hybrid_retrieval.HybridRetriever(bm25, store, rrf_k=args.rrf_k, candidates=args.candidates, rerank=True)
+        # keyword fallback: what the app serves in bm25 mode or when the vector side fails to open;
+        # bm25 + rerank: the same with rerank left on, as shipped before the fallback dropped it
+        keyword_only = hybrid_retrieval.HybridRetriever(bm25, None, rrf_k=args.rrf_k, candidates=args.candidates)
+        keyword_rerank = hybrid_retrieval.HybridRetriever(bm25, None, rrf_k=args.rrf_k, candidates=args.candidates,
+                                                          rerank=True)
+
+        print(f"{len(LABELLED)} labelled questions, k={args.k}, provider={args.provider}")
+        print(f"BM25: {len(bm25)} documents built in {bm25_build * 1000:.0f}ms; "
+              f"vectors: {chunks} chunks embedded in {vector_build:.1f}s\n")
+        print(f"{'retriever':<16} | {'hit@k':>6} | {'recall@k':>9} | {'MRR':>5} | {'p50':>9} | {'p95':>9}")
+        print("-" * 70)
+        evaluate("bm25", plain.keyword, args.k, spans)
+        evaluate("vector", plain.semantic, args.k, spans)
+        evaluate("hybrid rrf", plain.retrieve, args.k, spans)
+        evaluate("hybrid + rerank", reranked.retrieve, args.k, spans)
+        evaluate("keyword fallback", keyword_only.retrieve, args.k, spans)
+        evaluate("bm25 + rerank", keyword_rerank.retrieve, args.k, spans)
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
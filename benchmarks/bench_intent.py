@@ -0,0 +1,119 @@
+# ==============================================================================
+# BENCHMARK: intent classification latency and accuracy, legacy vs IntentEngine
+# ==============================================================================
+# The legacy classifier reproduces the original is_greeting / is_farewell /
+# is_thank_you / is_legal_context substring scans from Finalcode.py v40.
+#
+#     python benchmarks/bench_intent.py --repeats 2000
+# ==============================================================================
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from intent_engine import IntentEngine, load_brain_phrases  # noqa: E402
+
+LEGAL_KEYWORDS = [
+    'law', 'legal', 'court', 'case', 'judge', 'lawyer', 'attorney', 'contract',
+    'crime', 'criminal', 'civil', 'litigation', 'jurisdiction', 'statute', 'ordinance',
+    'penal', 'constitution', 'amendment', 'act', 'section', 'article', 'plaintiff',
+    'defendant', 'prosecution', 'defense', 'evidence', 'testimony', 'verdict',
+    'appeal', 'petition', 'writ', 'injunction', 'bail', 'custody', 'property',
+    'inheritance', 'divorce', 'marriage', 'rights', 'violation', 'tort',
+    'negligence', 'liability', 'damages', 'compensation', 'settlement', 'agreement',
+    'clause', 'breach', 'enforcement', 'precedent', 'ruling', 'kicked out', 'house',
+    'eviction', 'tenant', 'landlord', 'mother', 'father', 'family', 'dispute'
+]
+
+# (query, expected intent); smalltalk is folded into non_legal for the legacy comparison
+CORPUS = [
+    ("hi", "greeting"), ("Hello", "greeting"), ("good morning", "greeting"), ("Assalam o alaikum", "greeting"),
+    ("salaam, kaise hain", "greeting"), ("hey there", "greeting"),
+    ("bye", "farewell"), ("Allah hafiz", "farewell"), ("see you tomorrow", "farewell"), ("goodbye counsel", "farewell"),
+    ("thanks", "thanks"), ("thank you so much", "thanks"), ("shukriya", "thanks"), ("I appreciate it", "thanks"),
+    ("What is the prohibition on subletting under the SRPO?", "legal"),
+    ("Which section of the Sindh Rented Premises Ordinance covers eviction?", "legal"),
+    ("My landlord kicked me out without notice, what can I do?", "legal"),
+    ("Can a tenant be evicted for personal bona fide need?", "legal"),
+    ("Explain Article 199 writ jurisdiction of the High Court", "legal"),
+    ("What are my rights if the rent agreement expired?", "legal"),
+    ("Is defacement of property a criminal offence in Sindh?", "legal"),
+    ("How do I file an appeal against the Rent Controller order?", "legal"),
+    ("hi, my landlord evicted me yesterday", "legal"),
+    ("Summarize this case in IRAC format.", "legal"),
+    ("Provide a legal inference based on the conversation.", "legal"),
+    ("Draft a legal document for this case.", "legal"),
+    ("Provide detailed legal analysis.", "legal"),
+    ("What is the property tax rate under the 1999 amendment?", "legal"),
+    ("Can my father sell the family house without my consent?", "legal"),
+    ("Is the cantonment board allowed to demolish my shop?", "legal"),
+    ("What is the weather in Karachi today?", "non_legal"),
+    ("Please contact me on my phone", "non_legal"),
+    ("Recommend a good biryani place", "non_legal"),
+    ("Which is the best phone this year?", "non_legal"),
+    ("Tell me a joke about cricket", "non_legal"),
+    ("I need a chicken recipe for tonight", "non_legal"),
+    ("What is the history of the Indus river?", "non_legal"),
+    ("Who won the match yesterday in this series?", "non_legal"),
+    ("Teach me about machine learning", "non_legal"),
+    ("The action movie was actually thrilling", "non_legal"),
+    ("This chilli is too hot", "non_legal"),
+    ("Which shipping company is fastest?", "non_legal"),
+    ("help", "non_legal"), ("what is your name", "non_legal"), ("ok", "non_legal"),
+]
+
+
+def legacy_classify(text):
+    t = text.lower()
+    if any(g in t for g in ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening',
+                            'greetings', 'salaam', 'salam', 'assalam o alaikum', 'kaise hain']):
+        return "greeting"
+    if any(f in text.lower() for f in ['bye', 'goodbye', 'see you', 'farewell', 'take care', 'allah hafiz',
+                                       'khuda hafiz', 'alvida']):
+        return "farewell"
+    if any(x in text.lower() for x in ['thank', 'thanks', 'appreciate', 'grateful', 'shukriya', 'meherbani']):
+        return "thanks"
+    tl = text.lower()
+    legal = any(kw in tl for kw in LEGAL_KEYWORDS) or any(
+        w in tl for w in ['should i', 'what can i', 'my rights', 'kicked out', 'evict']) or len(text) > 100
+    return "legal" if legal else "non_legal"
+
+
+def evaluate(name, classify, repeats):
+    wrong, false_legal, false_social = [], 0, 0
+    for query, expected in CORPUS:
+        got = classify(query)
+        got = "non_legal" if got == "smalltalk" else got
+        if got != expected:
+            wrong.append((query, expected, got))
+            if got == "legal":
+                false_legal += 1
+            elif got in ("greeting", "farewell", "thanks"):
+                false_social += 1
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for query, _ in CORPUS:
+            classify(query)
+    per_query_us = (time.perf_counter() - t0) / (repeats * len(CORPUS)) * 1e6
+    n = len(CORPUS)
+    print(f"{name:<8} accuracy={(n - len(wrong)) / n:6.1%}  false-legal={false_legal:<3} "
+          f"false-social={false_social:<3} latency={per_query_us:6.2f}us/query")
+    for query, expected, got in wrong:
+        print(f"           x {query!r}: expected {expected}, got {got}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent classifier benchmark")
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+    engine = IntentEngine(LEGAL_KEYWORDS, smalltalk=load_brain_phrases(os.path.join(ROOT, "brain.json")))
+    evaluate("legacy", legacy_classify, args.repeats)
+    evaluate("engine", lambda q: engine.classify(q).name, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
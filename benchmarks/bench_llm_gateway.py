@@ -0,0 +1,102 @@
+# ==============================================================================
+# BENCHMARK: LLM gateway throughput and tail latency against FakeLLM (offline)
+# ==============================================================================
+# Fires N requests from simulated sessions, a share of which repeat the same
+# Quick Action prompt, and compares the raw client with the gateway.
+#
+#     python benchmarks/bench_llm_gateway.py --requests 400 --dup-share 0.4 --error-rate 0.05
+# ==============================================================================
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_gateway import FakeLLM, LLMGateway  # noqa: E402
+
+QUICK_ACTIONS = [
+    "Summarize this case in IRAC format.",
+    "Provide a legal inference based on the conversation.",
+    "Provide detailed legal analysis.",
+    "Draft a legal document for this case.",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def make_prompts(n, dup_share, seed):
+    rng = random.Random(seed)
+    return [rng.choice(QUICK_ACTIONS) if rng.random() < dup_share else f"Unique tenancy question #{i}"
+            for i in range(n)]
+
+
+async def run(call, prompts, arrival_rate, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+
+    async def one(prompt):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            await call(prompt)
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+
+    tasks = []
+    t_start = time.perf_counter()
+    for prompt in prompts:
+        tasks.append(asyncio.create_task(one(prompt)))
+        await asyncio.sleep(rng.expovariate(arrival_rate))
+    await asyncio.gather(*tasks)
+    return latencies, errors, time.perf_counter() - t_start
+
+
+def report(name, latencies, errors, elapsed, upstream):
+    ok = len(latencies)
+    print(f"{name:<10} ok={ok:<5} err={errors:<4} upstream={upstream:<5} "
+          f"thrpt={ok / elapsed:7.1f}/s  p50={percentile(latencies, 50) * 1000:7.0f}ms  "
+          f"p95={percentile(latencies, 95) * 1000:7.0f}ms  p99={percentile(latencies, 99) * 1000:7.0f}ms")
+
+
+async def main_async(args):
+    prompts = make_prompts(args.requests, args.dup_share, args.seed)
+
+    # Raw client: no retries, no coalescing, unbounded concurrency
+    raw = FakeLLM(args.latency, error_rate=args.error_rate, seed=args.seed)
+    lat, err, elapsed = await run(raw.ainvoke, prompts, args.arrival_rate, args.seed)
+    report("raw", lat, err, elapsed, raw.calls)
+
+    fake = FakeLLM(args.latency, error_rate=args.error_rate, seed=args.seed)
+    gw = LLMGateway(fake, max_concurrency=args.concurrency, timeout=args.timeout, base_delay=0.2, max_delay=2.0,
+                    breaker_threshold=max(5, args.concurrency))
+    lat, err, elapsed = await run(gw.ainvoke, prompts, args.arrival_rate, args.seed)
+    report("gateway", lat, err, elapsed, fake.calls)
+    print(f"gateway stats: {gw.stats}")
+    if lat:
+        print(f"mean gateway latency {statistics.mean(lat) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM gateway benchmark against an offline fake model")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--dup-share", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.8, help="median fake model latency (s)")
+    parser.add_argument("--arrival-rate", type=float, default=50.0, help="requests per second")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
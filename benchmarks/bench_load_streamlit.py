@@ -0,0 +1,351 @@
+# ==============================================================================
+# BENCHMARK: multi-user load on Finalcode.py (AppTest, fake Gemini)
+# ==============================================================================
+# Drives the real app headlessly with streamlit.testing.v1.AppTest: N simulated
+# counsel, each on its own thread with its own session, register, log in,
+# open a new case, then alternate between chambers sending tenancy questions
+# and Quick Actions. All sessions share one process, so st.cache_resource
+# objects (connection pool, indexes, LLM gateway) are shared exactly as on a
+# single Streamlit server.
+#
+#   LLM     - ChatGoogleGenerativeAI is replaced by llm_gateway.FakeLLM
+#             (deterministic lognormal latency, streamed tokens); embeddings
+#             use the offline hashing provider
+#   rerun   - wall time of every AppTest run (one widget interaction = one
+#             script rerun, including the LLM stream), p50/p95/p99 per action
+#   locks   - every connection the pool opens is timed: the first write of
+#             each transaction is where SQLite waits for the write lock, so its
+#             latency (and any "database is locked" error) is the lock wait
+#   RSS     - process RSS after warm-up and after the run; per user = growth / N
+#
+# Each user count runs in a fresh child process against a throwaway database
+# in a temp directory (DATA/ and brain.json are symlinked in).
+#
+#     python benchmarks/bench_load_streamlit.py --users 1 4 8 16 --turns 6 --llm-latency 0.8
+# ==============================================================================
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+APP = os.path.join(ROOT, "Finalcode.py")
+QUESTIONS = [
+    "What are the grounds of eviction under the Sindh Rented Premises Ordinance?",
+    "My landlord cut off my electricity and water supply, what can I do?",
+    "How is fair rent determined for a shop in Karachi?",
+    "The landlord refuses to accept my rent, where do I deposit it?",
+    "What is the time limit to appeal against the Controller's eviction order?",
+    "Can the landlord increase the rent every year?",
+    "Who pays for repairs of rented premises?",
+    "The property was sold, do I have to pay rent to the new owner?",
+]
+QUICK_ACTIONS = ["🔍 Infer", "📝 Summarize", "⚖️ Analyze", "📋 Draft"]
+LOCK_SLOW_MS = 5.0
+_WRITE_RE = re.compile(r"^\s*(?:INSERT|UPDATE|DELETE|REPLACE|BEGIN\s+IMMEDIATE|CREATE|DROP)", re.I)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def memory_kb():
+    out = {}
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":")
+                out[key] = int(value.split()[0])
+    return out
+
+
+# ------------------------------------------------------------------------------
+# INSTRUMENTATION (child process only)
+# ------------------------------------------------------------------------------
+
+class LockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waits = []
+        self.locked_errors = 0
+
+    def record(self, seconds):
+        with self.lock:
+            self.waits.append(seconds * 1000)
+
+    def error(self):
+        with self.lock:
+            self.locked_errors += 1
+
+
+LOCKS = LockStats()
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Times the statement that opens a write transaction (where the write lock is taken)"""
+
+    def _timed(self, method, sql, *args):
+        first_write = not self.connection.in_transaction and _WRITE_RE.match(sql)
+        t0 = time.perf_counter()
+        try:
+            return method(sql, *args)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                LOCKS.error()
+            raise
+        finally:
+            if first_write:
+                LOCKS.record(time.perf_counter() - t0)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def instrument(llm_latency, llm_sigma):
+    import langchain_google_genai
+
+    import db_pool
+    from llm_gateway import FakeLLM
+
+    def _open(pool):
+        conn = sqlite3.connect(pool.db_path, timeout=pool.busy_timeout, check_same_thread=False,
+                               factory=TimedConnection)
+        for name, value in pool.pragmas:
+            conn.execute(f"PRAGMA {name}={value};")
+        return conn
+
+    class FakeGemini(FakeLLM):
+        def __init__(self, **_kwargs):
+            super().__init__(median_latency=llm_latency, sigma=llm_sigma, seed=42)
+
+    db_pool.ConnectionPool._open = _open
+    langchain_google_genai.ChatGoogleGenerativeAI = FakeGemini
+    share_app_test_runtime()
+
+
+def share_app_test_runtime():
+    """Make concurrent AppTest sessions behave like sessions of one server.
+
+    AppTest.run() installs a fresh mock Runtime, st.secrets and a config patch
+    per run and resets them afterwards, which breaks any other session running
+    at that moment. Here one runtime, one secrets object and one config patch
+    are installed for the whole process, and AppTest's per-run assignments go
+    to a throwaway Runtime subclass instead. The script is compiled once into a
+    shared ScriptCache, as on a server (AppTest recompiles on every run, and
+    concurrent ast.parse calls are not safe on CPython 3.11).
+    """
+    from unittest.mock import MagicMock, patch
+
+    import streamlit as st
+    from streamlit import config
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    components = BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = components
+    Runtime._instance = runtime
+    app_test.Runtime = type("PerRunRuntime", (Runtime,), {})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+    secrets = Secrets()
+    secrets._secrets = {"GOOGLE_API_KEY": "fake"}
+    st.secrets = secrets
+    patch.object(config, "get_option", new=build_mock_config_get_option({"global.appTest": True})).start()
+
+
+# ------------------------------------------------------------------------------
+# SIMULATED COUNSEL
+# ------------------------------------------------------------------------------
+
+class Counsel:
+    def __init__(self, n, turns, timeout, seed):
+        self.n = n
+        self.turns = turns
+        self.timeout = timeout
+        self.rng = random.Random(seed * 1000 + n)
+        self.timings = defaultdict(list)  # action -> [seconds, ...]
+        self.exceptions = []
+        self.at = None
+
+    def _run(self, action, element=None):
+        t0 = time.perf_counter()
+        (element or self.at).run(timeout=self.timeout)
+        self.timings[action].append(time.perf_counter() - t0)
+        if self.at.exception:
+            self.exceptions.extend(e.message for e in self.at.exception)
+
+    def _button(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        raise LookupError(f"no '{label}' button; page shows {[b.label for b in self.at.button]}")
+
+    def session(self):
+        from streamlit.testing.v1 import AppTest
+
+        email, password = f"counsel{self.n}@loadtest.pk", "pw"
+        self.at = AppTest.from_file(APP, default_timeout=self.timeout)  # secrets: see share_app_test_runtime
+        self._run("open")
+
+        self.at.text_input(key="reg_email").input(email)
+        self.at.text_input(key="reg_name").input(f"Counsel {self.n}")
+        self.at.text_input(key="reg_pass").input(password)
+        self._run("register", self._button("Create Account").click())
+        self.at.text_input(key="login_email").input(email)
+        self.at.text_input(key="login_pass").input(password)
+        self._run("login", self._button("Authorize Access").click())
+        if not self.at.session_state.logged_in:
+            raise RuntimeError(f"counsel {self.n} could not log in")
+
+        self._run("new_case", self._button("➕ New").click())
+        self.at.text_input(key="new_case_input").input(f"Tenancy Matter {self.n}")
+        self._run("new_case", self._button("Create").click())
+
+        chambers = ["General Litigation Chamber", f"Tenancy Matter {self.n}"]
+        for turn in range(self.turns):
+            self._run("switch_chamber", next(r for r in self.at.radio if r.label == "Select Case")
+                      .set_value(chambers[turn % 2]))
+            if turn % 3 == 2:
+                self._run("quick_action", self._button(self.rng.choice(QUICK_ACTIONS)).click())
+            else:
+                self._run("chat", self.at.chat_input[0].set_value(self.rng.choice(QUESTIONS)))
+
+
+def child(users, turns, timeout, llm_latency, llm_sigma, seed):
+    """Runs in a fresh interpreter inside a temp directory; prints one JSON line"""
+    instrument(llm_latency, llm_sigma)
+
+    warm = Counsel(-1, 2, timeout, seed)
+    warm.session()  # builds the indexes and caches once, outside the measurement
+    LOCKS.waits.clear()
+    base = memory_kb()
+
+    counsel = [Counsel(n, turns, timeout, seed) for n in range(users)]
+    failures = []
+
+    def drive(c):
+        try:
+            c.session()
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(c,), name=f"counsel-{c.n}") for c in counsel]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    after = memory_kb()
+
+    by_action = defaultdict(list)
+    for c in counsel:
+        for action, values in c.timings.items():
+            by_action[action].extend(values)
+    print(json.dumps({
+        "wall": wall,
+        "by_action": by_action,
+        "lock_waits": LOCKS.waits,
+        "locked_errors": LOCKS.locked_errors,
+        "exceptions": sorted({m for c in counsel for m in c.exceptions})[:5],
+        "failures": failures[:5],
+        "rss_base": base["VmRSS"],
+        "rss_after": after["VmRSS"],
+        "rss_peak": after["VmHWM"],
+    }))
+
+
+def measure(users, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("DATA", "brain.json"):
+            os.symlink(os.path.join(ROOT, name), os.path.join(tmp, name))
+        env = dict(os.environ, ALPHA_APEX_EMBEDDINGS="local", ALPHA_APEX_VECTORS=args.vectors)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(users),
+                              "--turns", str(args.turns), "--timeout", str(args.timeout),
+                              "--llm-latency", str(args.llm_latency), "--llm-sigma", str(args.llm_sigma),
+                              "--seed", str(args.seed)],
+                             capture_output=True, text=True, cwd=tmp, env=env)
+    if out.returncode:
+        raise RuntimeError(out.stderr[-2000:])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent counsel against Finalcode.py via AppTest")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--turns", type=int, default=6, help="chat/Quick Action turns per user")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="fake model median seconds per answer")
+    parser.add_argument("--llm-sigma", type=float, default=0.5)
+    parser.add_argument("--vectors", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--timeout", type=float, default=300.0, help="AppTest per-run timeout")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--by-action", action="store_true", help="per-action percentiles for each user count")
+    parser.add_argument("--child", type=int, metavar="USERS")
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.turns, args.timeout, args.llm_latency, args.llm_sigma, args.seed)
+        return
+
+    print(f"{args.turns} turns/user, fake LLM median {args.llm_latency}s, vectors={args.vectors}\n")
+    print(f"{'users':>5} | {'reruns':>6} | {'p50':>7} | {'p95':>7} | {'p99':>7} | {'chat p95':>8} | "
+          f"{'lock waits':>10} | {'>5ms':>5} | {'max':>8} | {'locked':>6} | {'RSS/user':>8} | {'peak':>7}")
+    print("-" * 118)
+    for users in args.users:
+        r = measure(users, args)
+        reruns = [s for values in r["by_action"].values() for s in values]
+        waits = r["lock_waits"]
+        print(f"{users:>5} | {len(reruns):>6} | {percentile(reruns, 50):>6.2f}s | {percentile(reruns, 95):>6.2f}s | "
+              f"{percentile(reruns, 99):>6.2f}s | {percentile(r['by_action'].get('chat', []), 95):>7.2f}s | "
+              f"{len(waits):>10} | {sum(w > LOCK_SLOW_MS for w in waits):>5} | {max(waits, default=0):>6.1f}ms | "
+              f"{r['locked_errors']:>6} | {(r['rss_after'] - r['rss_base']) / 1024 / users:>6.1f}MB | "
+              f"{r['rss_peak'] / 1024:>5.0f}MB")
+        if args.by_action:
+            for action, values in sorted(r["by_action"].items()):
+                print(f"{'':>5}   {action:<15} n={len(values):<4} p50 {statistics.median(values):.3f}s  "
+                      f"p95 {percentile(values, 95):.3f}s  p99 {percentile(values, 99):.3f}s")
+        for problem in r["failures"] + r["exceptions"]:
+            print(f"{'':>5}   ! {problem}")
+
+
+if __name__ == "__main__":
+    main()
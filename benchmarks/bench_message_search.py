@@ -0,0 +1,136 @@
+# ==============================================================================
+# BENCHMARK: consultation search latency, FTS5/BM25 vs scoped LIKE scan
+# ==============================================================================
+# Builds a throwaway database shaped like advocate_ai_v2.db with N messages of
+# varied legal text over many users/chambers, runs run_migrations() (which
+# builds the message_search index), then times message_search.search_messages
+# for one user against the LIKE fallback over the same chambers. Also reports
+# the index build time and the per-insert cost the sync triggers add.
+#
+#     python benchmarks/bench_message_search.py --sizes 100000 1000000
+# ==============================================================================
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import message_search  # noqa: E402
+from db_migrations import run_migrations  # noqa: E402
+
+VOCAB = ("tenant landlord rent premises eviction notice vacate section ordinance controller tribunal appeal "
+         "default arrears deposit lease sublet repair demolition cantonment possession bona fide personal need "
+         "ejectment application hearing judgment decree execution stay injunction writ petition high court "
+         "sindh karachi hyderabad agreement witness evidence affidavit counsel fair rent increase utility "
+         "building authority municipal limitation cost compensation damages mesne profits").split()
+FILLER = "the of and to a in for is on that by with as under may be or this".split()
+
+QUERIES = ["eviction", "mesne profits", "bona fide personal need", "arrears", "ejectm", "the", "cantonment demolition"]
+
+
+# Zipf-distributed 6k-word lexicon with the legal terms spread through it, so
+# term frequencies range from "in most chambers" to "a handful of messages"
+LEXICON = [f"w{i}" for i in range(6000)]
+for _rank, _term in enumerate(VOCAB):
+    LEXICON[5 + _rank * 40] = _term
+WEIGHTS = [1 / (rank + 1) for rank in range(len(LEXICON))]
+
+
+def make_body(rng):
+    words = [rng.choice(FILLER) if rng.random() < 0.45 else rng.choices(LEXICON, WEIGHTS)[0]
+             for _ in range(rng.randint(20, 120))]
+    return " ".join(words).capitalize() + "."
+
+
+def build_database(path, n_messages, n_users, chambers_per_user):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT)")
+    conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT)")
+    chambers = []
+    for u in range(n_users):
+        for k in range(chambers_per_user):
+            cur = conn.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, '2025-01-01')",
+                               (f"counsel{u}@example.pk", f"Case {k}"))
+            chambers.append(cur.lastrowid)
+    rng = random.Random(7)
+    bodies = [make_body(rng) for _ in range(20000)]
+    batch = []
+    for i in range(n_messages):
+        batch.append((rng.choice(chambers), "user" if i % 2 == 0 else "assistant", rng.choice(bodies), "2025-01-01 00:00:00"))
+        if len(batch) >= 50000:
+            conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    return conn
+
+
+def time_search(conn, email, fn, repeats):
+    out = {}
+    for q in QUERIES:
+        samples = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn(conn, email, q)
+            samples.append((time.perf_counter() - t0) * 1000)
+        out[q] = statistics.median(samples)
+    return out
+
+
+def like_search(conn, email, q):
+    chambers = message_search._owned_chambers(conn, email)
+    return message_search._search_like(conn, chambers, q, 10)
+
+
+def fts_search(conn, email, q):
+    return message_search.search_messages(conn, email, q, 10)
+
+
+def insert_cost(conn, n=2000):
+    t0 = time.perf_counter()
+    conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (1, 'user', ?, '')",
+                     [(f"fresh eviction notice number {i} for the tenant",) for i in range(n)])
+    conn.commit()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 consultation search vs LIKE scan")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chambers-per-user", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = build_database(os.path.join(tmp, "bench.db"), n, args.users, args.chambers_per_user)
+            before_insert = insert_cost(conn)
+            email = "counsel0@example.pk"
+            like = time_search(conn, email, like_search, args.repeats)
+            t0 = time.perf_counter()
+            run_migrations(conn)
+            build = time.perf_counter() - t0
+            fts = time_search(conn, email, fts_search, args.repeats)
+            after_insert = insert_cost(conn)
+            conn.close()
+
+        print(f"\n{n:,} messages ({args.users} users x {args.chambers_per_user} chambers); "
+              f"migrations incl. FTS build {build:.1f}s; insert {before_insert:.1f}us -> {after_insert:.1f}us per row")
+        print(f"{'query':<26} | {'LIKE scan':>10} | {'FTS5 bm25':>10}")
+        print("-" * 54)
+        for q in QUERIES:
+            print(f"{q:<26} | {like[q]:>8.2f}ms | {fts[q]:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# ==============================================================================
+# BENCHMARK: vector backend, Chroma vs memory-mapped NumPy (npy_vectorstore)
+# ==============================================================================
+# Builds both stores with the same N random unit vectors (dim 768, like Gemini
+# text-embedding-004), then measures each in a fresh child process, the way a
+# Streamlit worker would meet it:
+#   load   - import + open + first query
+#   RSS    - VmRSS after the queries, and RssAnon (private memory; the mmap'd
+#            matrix is file-backed page cache shared between processes)
+#   query  - p50/p95 of similarity_search_by_vector top-k
+#
+#     python benchmarks/bench_vector_backends.py --sizes 1000 20000 100000
+# ==============================================================================
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+CHROMA_BATCH = 5000
+
+
+def memory_kb():
+    out = {}
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(("VmRSS:", "RssAnon:")):
+                key, value = line.split(":")
+                out[key] = int(value.split()[0])
+    return out
+
+
+def make_vectors(n, dim, seed):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, dim), dtype=np.float32)
+
+
+def build(backend, path, n, dim, dtype):
+    import legal_retrieval
+    vectors = make_vectors(n, dim, 7)
+    texts = [f"chunk {i}" for i in range(n)]
+    metas = [{"source": f"act{i % 10}.pdf", "act": f"Act {i % 10}", "page": i // 10} for i in range(n)]
+    ids = [f"c{i}" for i in range(n)]
+    store = legal_retrieval.open_vectorstore(path, legal_retrieval.HashingEmbeddings(dim), "bench",
+                                             backend=backend, dtype=dtype)
+    t0 = time.perf_counter()
+    for lo in range(0, n, CHROMA_BATCH):
+        hi = min(n, lo + CHROMA_BATCH)
+        if backend == "numpy":
+            store.add_embeddings(texts[lo:hi], vectors[lo:hi], metas[lo:hi], ids[lo:hi])
+        else:
+            store._collection.add(ids=ids[lo:hi], embeddings=vectors[lo:hi].tolist(),
+                                  documents=texts[lo:hi], metadatas=metas[lo:hi])
+    return time.perf_counter() - t0
+
+
+def child(backend, path, dim, dtype, queries, k):
+    """Runs in a fresh interpreter; prints one JSON line"""
+    t0 = time.perf_counter()
+    import legal_retrieval
+    store = legal_retrieval.open_vectorstore(path, legal_retrieval.HashingEmbeddings(dim), "bench",
+                                             backend=backend, dtype=dtype)
+    qs = make_vectors(queries, dim, 11)
+    store.similarity_search_by_vector(qs[0].tolist(), k=k)
+    load = time.perf_counter() - t0
+    latencies = []
+    for q in qs:
+        t1 = time.perf_counter()
+        store.similarity_search_by_vector(q.tolist(), k=k)
+        latencies.append((time.perf_counter() - t1) * 1000)
+    latencies.sort()
+    print(json.dumps({"load": load, "p50": statistics.median(latencies),
+                      "p95": latencies[int(0.95 * (len(latencies) - 1))], **memory_kb()}))
+
+
+def measure(backend, path, dim, dtype, queries, k):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", backend, path,
+                          "--dim", str(dim), "--dtype", dtype, "--queries", str(queries), "-k", str(k)],
+                         capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vs memory-mapped NumPy vector store")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--dtype", default="float32", choices=["float16", "float32"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.dim, args.dtype, args.queries, args.k)
+        return
+
+    print(f"dim {args.dim}, numpy dtype {args.dtype}, top-{args.k}, {args.queries} queries per run\n")
+    print(f"{'vectors':>8} | {'backend':<7} | {'build':>7} | {'load':>7} | {'VmRSS':>8} | {'RssAnon':>8} | "
+          f"{'p50':>8} | {'p95':>8}")
+    print("-" * 82)
+    for n in args.sizes:
+        for backend in ("chroma", "numpy"):
+            with tempfile.TemporaryDirectory() as tmp:
+                built = build(backend, tmp, n, args.dim, args.dtype)
+                r = measure(backend, tmp, args.dim, args.dtype, args.queries, args.k)
+            print(f"{n:>8,} | {backend:<7} | {built:>6.1f}s | {r['load']:>6.2f}s | {r['VmRSS'] / 1024:>6.0f}MB | "
+                  f"{r['RssAnon'] / 1024:>6.0f}MB | {r['p50']:>6.2f}ms | {r['p95']:>6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
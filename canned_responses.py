@@ -0,0 +1,195 @@
+# ==============================================================================
+# ALPHA APEX - CANNED RESPONSE FAST PATH
+# ==============================================================================
+# Serves brain.json ("hi", "help", "what is your name", ...) before any model
+# or retrieval resource is touched, so trivial turns cost no network and no
+# tokens. The file is loaded once and re-read only when its mtime/size change.
+#
+# Matching works on a normalised form of the input (case, punctuation, Urdu
+# script variants, diacritics, Roman-Urdu spellings and doubled letters folded
+# away) with spaces removed, so "Assalam-u-Alaikum!!" == "assalamualaikum".
+#   exact: one dict lookup
+#   fuzzy: one edit (insert/delete/substitute/swap) via a precomputed
+#          deletion-neighbourhood table -- O(len(query)) dict lookups,
+#          independent of how many phrases brain.json holds. Only phrases of
+#          5+ characters get a neighbourhood ("sue" is one edit from "sure",
+#          "held" from "help"), and a query containing a protected word (the
+#          legal vocabulary / intent phrases) is never fuzzy-matched.
+# ==============================================================================
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# Arabic-script code points that Urdu keyboards/IMEs mix freely
+_URDU_FOLD = str.maketrans({
+    "ي": "ی",  # Arabic yeh -> Farsi/Urdu yeh
+    "ى": "ی",  # alef maksura -> Urdu yeh
+    "ے": "ی",  # yeh barree -> Urdu yeh
+    "ك": "ک",  # Arabic kaf -> keheh
+    "ه": "ہ",  # heh -> heh goal
+    "ۃ": "ہ",  # teh marbuta goal -> heh goal
+    "ة": "ہ",  # teh marbuta -> heh goal
+    "أ": "ا",  # alef with hamza above -> alef
+    "إ": "ا",  # alef with hamza below -> alef
+    "آ": "ا",  # alef with madda -> alef
+    "ـ": None,  # tatweel
+})
+_DIACRITICS_RE = re.compile("[\u064B-\u065F\u0670\u06D6-\u06ED]")
+_PUNCT_RE = re.compile(r"[^\w\s]+|_", re.UNICODE)
+_REPEAT_RE = re.compile(r"([a-z])\1+")
+# "as-salaam-u-alaikum", "asalamoalaikum", "salam alaykum" ... (after doubled letters collapse)
+_SALAM_RE = re.compile(r"\b(?:as?\s*)?salam\s*[ouw]?\s*al[ae]?[iy]?k[ou]m\b")
+
+# Roman-Urdu spellings -> one canonical token (applied after doubled letters collapse)
+ROMAN_URDU_ALIASES = {
+    "slm": "salam", "salams": "salam",
+    "shukria": "shukriya", "shukriyah": "shukriya", "shukrya": "shukriya", "shukran": "shukriya",
+    "hafez": "hafiz", "khudahafiz": "khuda hafiz", "allahhafiz": "allah hafiz",
+    "jzk": "jazakalah", "aoa": "asalam o alaikum",
+    "u": "you", "r": "are", "ur": "your", "thx": "thanks", "thnx": "thanks", "ty": "thank you",
+}
+
+
+def normalize_text(text):
+    """Case/punctuation/script-folded form used for matching (tokens joined by single spaces)"""
+    text = (text or "").lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+        text = _DIACRITICS_RE.sub("", text.translate(_URDU_FOLD))
+    text = _REPEAT_RE.sub(r"\1", _PUNCT_RE.sub(" ", text))
+    text = _SALAM_RE.sub("asalam o alaikum", text)
+    return " ".join(ROMAN_URDU_ALIASES.get(token, token) for token in text.split())
+
+
+def _key(text):
+    return normalize_text(text).replace(" ", "")
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class CannedResponses:
+    """brain.json lookup table with mtime hot reload"""
+
+    _AMBIGUOUS = object()
+
+    def __init__(self, path="brain.json", fuzzy=True, min_fuzzy_len=5, check_interval=1.0, protected_words=()):
+        self.path = path
+        self.fuzzy = fuzzy
+        self.min_fuzzy_len = min_fuzzy_len
+        self.protected_words = frozenset(normalize_text(w) for w in protected_words)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._tables = ({}, {}, {}, 0)  # (key -> response, key -> phrase, neighbour -> key, input cap)
+        self.counters = {"exact": 0, "fuzzy": 0, "miss": 0, "reloads": 0}
+        self._refresh(force=True)
+
+    # -- loading ---------------------------------------------------------------
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            try:
+                with open(self.path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except FileNotFoundError:
+                data = {}
+            except (OSError, ValueError):
+                # half-written or invalid file: keep serving the previous table, retry next check
+                return
+            self._build(data)
+            self._signature = signature
+            self.counters["reloads"] += 1
+
+    def _build(self, data):
+        responses, exact, neighbours = {}, {}, {}
+        for phrase, response in data.items():
+            if not isinstance(response, str):
+                continue
+            key = _key(phrase)
+            if not key:
+                continue
+            responses[key] = response
+            exact[key] = phrase
+        if self.fuzzy:
+            for key in exact:
+                if len(key) < self.min_fuzzy_len:
+                    continue
+                for d in _deletes(key) | {key}:
+                    owner = neighbours.get(d)
+                    neighbours[d] = key if owner in (None, key) else self._AMBIGUOUS
+        # inputs much longer than the longest phrase are real questions; skip normalising them
+        cap = 2 * max(map(len, exact), default=0) + 16
+        # one assignment so readers never see a half-built index
+        self._tables = (responses, exact, neighbours, cap)
+
+    def reload(self):
+        self._signature = None
+        self._refresh(force=True)
+
+    # -- lookup ----------------------------------------------------------------
+
+    def phrases(self):
+        self._refresh()
+        return list(self._tables[1].values())
+
+    def _fuzzy_key(self, key, neighbours, tokens):
+        if len(key) + 1 < self.min_fuzzy_len:
+            return None
+        if not self.protected_words.isdisjoint(tokens):
+            return None  # a real word ("sue", "held"), not a typo of a canned phrase
+        # deletion typo ("helo") or exact-length variants land directly in the table
+        candidates = [neighbours.get(key)]
+        # insertion / substitution / adjacent swap: compare the query's own deletions
+        candidates += [neighbours.get(d) for d in _deletes(key)]
+        found = {c for c in candidates if c is not None}
+        if len(found) != 1:
+            return None
+        match = found.pop()
+        return None if match is self._AMBIGUOUS else match
+
+    def lookup(self, text):
+        """(response, phrase, 'exact'|'fuzzy') or None"""
+        self._refresh()
+        responses, exact, neighbours, cap = self._tables
+        norm = normalize_text(text) if text and len(text) <= cap else ""
+        key = norm.replace(" ", "")
+        if not key:
+            self.counters["miss"] += 1
+            return None
+        if key in responses:
+            self.counters["exact"] += 1
+            return responses[key], exact[key], "exact"
+        if self.fuzzy:
+            match = self._fuzzy_key(key, neighbours, norm.split())
+            if match is not None:
+                self.counters["fuzzy"] += 1
+                return responses[match], exact[match], "fuzzy"
+        self.counters["miss"] += 1
+        return None
+
+    def match(self, text):
+        hit = self.lookup(text)
+        return hit[0] if hit else None
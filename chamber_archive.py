@@ -0,0 +1,218 @@
+# ==============================================================================
+# ALPHA APEX - CHAMBER EXPORT / IMPORT (STREAMED GZIP JSONL)
+# ==============================================================================
+# A backup or transfer of whole matters: one or more chambers with their
+# messages, running summary (chamber_memory) and attached Law Library
+# documents (chamber_documents). The archive is gzip-compressed JSON Lines:
+#
+#   {"type": "archive", "format": "alpha-apex-chambers", "version": 1, ...}
+#   {"type": "chamber", "name": ..., "init_date": ..., "messages": n,
+#    "documents": [filename, ...], "summary": ..., "summarized_through": k}
+#   {"type": "message", "role": ..., "content": ..., "ts": ...}   x n
+#   ... next chamber ...
+#   {"type": "end", "chambers": c, "messages": m}
+#
+# Messages belong to the chamber record before them. summarized_through is a
+# message count rather than an id, since ids are reassigned on import.
+#
+# export_chambers() pages through message_logs by id (keyset, batch_size rows
+# at a time) and writes each page straight into the gzip stream, so memory
+# stays flat however long the chamber is. import_chambers() reads the archive
+# line by line into executemany batches inside one transaction; a truncated
+# or malformed archive raises ValueError and nothing is committed (the caller
+# owns the transaction, as with law_ingest).
+#
+#     python chamber_archive.py export advocate_ai_v2.db counsel@firm.pk cases.jsonl.gz
+#     python chamber_archive.py import advocate_ai_v2.db counsel@firm.pk cases.jsonl.gz
+# ==============================================================================
+
+import argparse
+import datetime
+import gzip
+import json
+import sqlite3
+import zlib
+
+ARCHIVE_FORMAT = "alpha-apex-chambers"
+ARCHIVE_VERSION = 1
+BATCH_SIZE = 2000
+
+
+def _line(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def export_chambers(conn, email, chamber_names, out, batch_size=BATCH_SIZE, compresslevel=6):
+    """Stream chambers (None = all of email's) into the binary file `out`.
+
+    Returns {"chambers": [...], "messages": n, "missing": [...]}; names with no
+    such chamber are listed under "missing" and skipped.
+    """
+    if chamber_names is None:
+        chamber_names = [r[0] for r in conn.execute(
+            "SELECT chamber_name FROM chambers WHERE owner_email=? ORDER BY id", (email,))]
+    report = {"chambers": [], "messages": 0, "missing": []}
+
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=compresslevel) as gz:
+        gz.write(_line({"type": "archive", "format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION, "owner": email,
+                        "exported_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}))
+        for name in chamber_names:
+            row = conn.execute("SELECT id, init_date FROM chambers WHERE owner_email=? AND chamber_name=?",
+                               (email, name)).fetchone()
+            if not row:
+                report["missing"].append(name)
+                continue
+            chamber_id, init_date = row
+            count = conn.execute("SELECT COUNT(*) FROM message_logs WHERE chamber_id=?", (chamber_id,)).fetchone()[0]
+            documents = [r[0] for r in conn.execute(
+                "SELECT filename FROM chamber_documents WHERE chamber_id=? ORDER BY filename", (chamber_id,))]
+            memory = conn.execute("SELECT summary, summarized_through_id FROM chamber_memory WHERE chamber_id=?",
+                                  (chamber_id,)).fetchone()
+            summary, through = None, 0
+            if memory and memory[0]:
+                summary = memory[0]
+                through = conn.execute("SELECT COUNT(*) FROM message_logs WHERE chamber_id=? AND id<=?",
+                                       (chamber_id, memory[1] or 0)).fetchone()[0]
+            gz.write(_line({"type": "chamber", "name": name, "init_date": init_date, "messages": count,
+                            "documents": documents, "summary": summary, "summarized_through": through}))
+
+            last_id = 0
+            while True:
+                rows = conn.execute("""SELECT id, sender_role, message_body, ts_created FROM message_logs
+                                       WHERE chamber_id=? AND id>? ORDER BY id LIMIT ?""",
+                                    (chamber_id, last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                gz.write(b"".join(_line({"type": "message", "role": role, "content": body, "ts": ts})
+                                  for _id, role, body, ts in rows))
+                last_id = rows[-1][0]
+                report["messages"] += len(rows)
+            report["chambers"].append(name)
+        gz.write(_line({"type": "end", "chambers": len(report["chambers"]), "messages": report["messages"]}))
+    return report
+
+
+def _free_name(cur, email, name):
+    candidate, n = name, 1
+    while cur.execute("SELECT 1 FROM chambers WHERE owner_email=? AND chamber_name=?", (email, candidate)).fetchone():
+        candidate = f"{name} (imported)" if n == 1 else f"{name} (imported {n})"
+        n += 1
+    return candidate
+
+
+def _finish_chamber(cur, chamber):
+    """Restore the running summary once all of a chamber's messages are in"""
+    if chamber and chamber["summary"] and chamber["summarized_through"]:
+        row = cur.execute("SELECT id FROM message_logs WHERE chamber_id=? ORDER BY id LIMIT 1 OFFSET ?",
+                          (chamber["id"], chamber["summarized_through"] - 1)).fetchone()
+        if row:
+            cur.execute("""INSERT OR REPLACE INTO chamber_memory (chamber_id, summary, summarized_through_id, updated_at)
+                           VALUES (?, ?, ?, ?)""",
+                        (chamber["id"], chamber["summary"], row[0],
+                         datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def import_chambers(conn, email, src, batch_size=BATCH_SIZE):
+    """Load an export_chambers archive (binary file) into email's chambers; the caller commits.
+
+    Chambers whose name is taken get " (imported)" appended. Attached documents
+    not in this Law Library are dropped and listed under "missing_documents".
+    Returns {"chambers": [(archived_name, new_name), ...], "messages": n,
+    "documents": n, "missing_documents": [...]}.
+    """
+    cur = conn.cursor()
+    if not conn.in_transaction:
+        cur.execute("BEGIN IMMEDIATE")
+    library = {r[0] for r in cur.execute("SELECT filename FROM law_assets")}
+    report = {"chambers": [], "messages": 0, "documents": 0, "missing_documents": []}
+    chamber, batch, header, ended = None, [], None, False
+
+    def flush():
+        cur.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)",
+                        batch)
+        report["messages"] += len(batch)
+        batch.clear()
+
+    try:
+        with gzip.GzipFile(fileobj=src, mode="rb") as gz:
+            for lineno, raw in enumerate(gz, 1):
+                record = json.loads(raw)
+                kind = record.get("type")
+                if header is None:
+                    if kind != "archive" or record.get("format") != ARCHIVE_FORMAT:
+                        raise ValueError("not a chamber archive")
+                    if record.get("version", 0) > ARCHIVE_VERSION:
+                        raise ValueError(f"archive version {record['version']} is newer than this app")
+                    header = record
+                elif kind == "chamber":
+                    flush()
+                    _finish_chamber(cur, chamber)
+                    name = _free_name(cur, email, record["name"])
+                    chamber_id = cur.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)",
+                                             (email, name, record.get("init_date"))).lastrowid
+                    archived = sorted(set(record.get("documents") or []))
+                    documents = [f for f in archived if f in library]
+                    report["missing_documents"].extend(f for f in archived if f not in library)
+                    cur.executemany("INSERT INTO chamber_documents (chamber_id, filename, attached_at) VALUES (?, ?, ?)",
+                                    [(chamber_id, f, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                                     for f in documents])
+                    report["documents"] += len(documents)
+                    report["chambers"].append((record["name"], name))
+                    chamber = {"id": chamber_id, "summary": record.get("summary"),
+                               "summarized_through": record.get("summarized_through") or 0}
+                elif kind == "message":
+                    if chamber is None:
+                        raise ValueError(f"line {lineno}: message before any chamber")
+                    batch.append((chamber["id"], record["role"], record["content"], record.get("ts")))
+                    if len(batch) >= batch_size:
+                        flush()
+                elif kind == "end":
+                    ended = True
+                    break
+        if not ended:
+            raise ValueError("chamber archive is truncated (no end record)")
+        flush()
+        _finish_chamber(cur, chamber)
+    except (OSError, EOFError, zlib.error, json.JSONDecodeError, KeyError, TypeError, AttributeError,
+            sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+        # corrupt gzip, bad JSON, wrong field types or duplicate rows: all mean a bad archive
+        raise ValueError(f"unreadable chamber archive: {e}") from e
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import chambers as a gzip JSONL archive")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("db", help="SQLite database")
+    parser.add_argument("email", help="owner of the chambers")
+    parser.add_argument("archive", help="archive path (.jsonl.gz)")
+    parser.add_argument("--chamber", action="append", help="chamber to export (repeatable; default all)")
+    args = parser.parse_args()
+
+    from db_migrations import run_migrations
+    from db_pool import ConnectionPool
+
+    pool = ConnectionPool(args.db)
+    with pool.connection() as conn:
+        run_migrations(conn)
+        if args.action == "export":
+            with open(args.archive, "wb") as out:
+                report = export_chambers(conn, args.email, args.chamber, out)
+            print(f"exported {len(report['chambers'])} chambers, {report['messages']:,} messages")
+            for name in report["missing"]:
+                print(f"  no such chamber: {name}")
+        else:
+            with open(args.archive, "rb") as src:
+                report = import_chambers(conn, args.email, src)
+            print(f"imported {len(report['chambers'])} chambers, {report['messages']:,} messages, "
+                  f"{report['documents']} document links")
+            for old, new in report["chambers"]:
+                if old != new:
+                    print(f"  {old} -> {new}")
+            for filename in report["missing_documents"]:
+                print(f"  not in this library: {filename}")
+    pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# ==============================================================================
+# ALPHA APEX - WINDOWED CHAT HISTORY
+# ==============================================================================
+# Keyset-paginated history so a rerun only touches the last N messages of a
+# chamber instead of its whole lifetime. The loaded window is cached in
+# session state and keyed by the chamber's MAX(message_logs.id): an unchanged
+# chamber costs one indexed MAX() lookup per rerun, a new message costs a fetch
+# of just the rows after the cached max, and "load earlier" fetches one older
+# page below the oldest id already on screen. The window never grows past
+# the pages the user has asked for: new messages push the oldest ones out
+# (and set has_more) once it is over page_size x pages. Callers that version their
+# message writes (session_cache.DataVersions) can pass that version and skip
+# even the MAX() lookup while it is unchanged.
+# ==============================================================================
+
+STATE_KEY = "_history_windows"
+DEFAULT_PAGE_SIZE = 30
+
+
+def chamber_head(conn, email, chamber_name):
+    """(chamber_id, max_message_id) or (None, None) if the chamber does not exist"""
+    row = conn.execute("""SELECT c.id, (SELECT MAX(m.id) FROM message_logs m WHERE m.chamber_id = c.id)
+                          FROM chambers c WHERE c.owner_email=? AND c.chamber_name=?""",
+                       (email, chamber_name)).fetchone()
+    return (row[0], row[1] or 0) if row else (None, None)
+
+
+def fetch_page(conn, chamber_id, limit, before_id=None):
+    """Up to `limit` messages older than before_id (newest page if None), oldest first, plus has_more"""
+    if before_id is None:
+        rows = conn.execute("""SELECT id, sender_role, message_body FROM message_logs
+                               WHERE chamber_id=? ORDER BY id DESC LIMIT ?""",
+                            (chamber_id, limit + 1)).fetchall()
+    else:
+        rows = conn.execute("""SELECT id, sender_role, message_body FROM message_logs
+                               WHERE chamber_id=? AND id<? ORDER BY id DESC LIMIT ?""",
+                            (chamber_id, before_id, limit + 1)).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return [{"id": i, "role": r, "content": b} for i, r, b in rows], has_more
+
+
+def fetch_since(conn, chamber_id, after_id):
+    rows = conn.execute("""SELECT id, sender_role, message_body FROM message_logs
+                           WHERE chamber_id=? AND id>? ORDER BY id ASC""",
+                        (chamber_id, after_id)).fetchall()
+    return [{"id": i, "role": r, "content": b} for i, r, b in rows]
+
+
+def load_history_window(state, connection, email, chamber_name, page_size=DEFAULT_PAGE_SIZE, load_earlier=False,
+                        version=None):
+    """Return {"messages": [...], "has_more": bool} for the chamber, reusing the session cache.
+
+    `state` is st.session_state (any MutableMapping); `connection` is the app's
+    get_db_connection context-manager factory. With a `version` that matches the
+    one the cached window was loaded at, no query is made.
+    """
+    windows = state.setdefault(STATE_KEY, {})
+    key = (email, chamber_name)
+    entry = windows.get(key)
+    if version is not None and not load_earlier and entry is not None and entry.get("version") == version:
+        return entry
+
+    with connection() as conn:
+        chamber_id, max_id = chamber_head(conn, email, chamber_name)
+        if chamber_id is None:
+            windows.pop(key, None)
+            return {"messages": [], "has_more": False}
+
+        if entry is None or entry["chamber_id"] != chamber_id or max_id < entry["max_id"]:
+            # first view, recreated chamber, or messages deleted: start from the newest page
+            messages, has_more = fetch_page(conn, chamber_id, page_size)
+            entry = {"chamber_id": chamber_id, "max_id": max_id, "messages": messages, "has_more": has_more,
+                     "pages": 1}
+        elif max_id > entry["max_id"]:
+            entry["messages"].extend(fetch_since(conn, chamber_id, entry["max_id"]))
+            entry["max_id"] = max_id
+
+        if load_earlier and entry["has_more"] and entry["messages"]:
+            older, has_more = fetch_page(conn, chamber_id, page_size, before_id=entry["messages"][0]["id"])
+            entry["messages"] = older + entry["messages"]
+            entry["has_more"] = has_more
+            entry["pages"] += 1
+
+    # the newest page plus the pages loaded explicitly; anything older drops out
+    limit = page_size * entry["pages"]
+    if len(entry["messages"]) > limit:
+        entry["messages"] = entry["messages"][-limit:]
+        entry["has_more"] = True
+
+    entry["version"] = version
+    windows[key] = entry
+    return entry
+
+
+def forget_chamber(state, email, chamber_name):
+    state.setdefault(STATE_KEY, {}).pop((email, chamber_name), None)
@@ -0,0 +1,226 @@
+# ==============================================================================
+# ALPHA APEX - TOKEN-BUDGETED CONVERSATION MEMORY
+# ==============================================================================
+# Gives the prompt builder a bounded view of the case so far:
+#   - a rolling window of the most recent turns, verbatim (long IRAC answers
+#     are clipped per message)
+#   - a running summary of everything older, stored per chamber in
+#     chamber_memory and extended incrementally: each message is folded into
+#     the summary exactly once, in small batches, so a turn never pays to
+#     re-summarise the whole case
+# The assembled block is trimmed to a token budget (oldest recent turns go
+# first), so prompt size stays flat however long the chamber runs.
+# build_context() never calls the summarizer: folding happens in catch_up(),
+# which the app runs on a background worker once the answer is logged, at
+# most max_batches_per_turn batches per run. Until it has caught up, messages
+# between the stored summary and the recent window go in as first-sentence
+# notes, newest kept, with a count of anything older.
+# ==============================================================================
+
+import datetime
+import re
+import threading
+
+CHARS_PER_TOKEN = 4  # Gemini/English heuristic; good enough for budgeting
+
+
+def estimate_tokens(text):
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clip_to_tokens(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    text = (text or "").strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+def _label(role):
+    return "COUNSEL" if role == "user" else "AI ADVISOR"
+
+
+def extractive_summary(previous, messages, max_tokens):
+    """LLM-free fallback: keep the first sentence of each turn, newest last"""
+    lines = [previous] if previous else []
+    for _id, role, body in messages:
+        first = re.split(r"(?<=[.!?])\s+", (body or "").strip(), maxsplit=1)[0]
+        lines.append(f"- {_label(role)}: {clip_to_tokens(first, 60)}")
+    summary = "\n".join(lines)
+    # Drop the oldest material first when over budget
+    while estimate_tokens(summary) > max_tokens and "\n" in summary:
+        summary = summary.split("\n", 1)[1]
+    return clip_to_tokens(summary, max_tokens)
+
+
+def llm_summarizer(gateway, max_tokens):
+    """Build a summarizer(previous, messages) that asks the model to extend the running summary"""
+    def summarize(previous, messages):
+        transcript = "\n".join(f"[{_label(r)}]: {clip_to_tokens(b, 300)}" for _i, r, b in messages)
+        prompt = f"""You maintain the running case summary for a legal consultation.
+Update the summary with the new exchange. Keep parties, facts, statutes cited, advice given and open questions.
+Write at most {max_tokens * 3 // 4} words, plain prose, no headings.
+
+CURRENT SUMMARY:
+{previous or "(none yet)"}
+
+NEW EXCHANGE:
+{transcript}
+
+UPDATED SUMMARY:"""
+        result = gateway.invoke(prompt)
+        content = getattr(result, "content", result)
+        if isinstance(content, list):
+            content = "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+        return clip_to_tokens(content, max_tokens)
+    return summarize
+
+
+class ConversationMemory:
+    def __init__(self, pool, summarizer=None, recent_turns=6, token_budget=2500, summary_tokens=600,
+                 message_tokens=500, summarize_batch=4, max_batches_per_turn=2):
+        self.pool = pool
+        self.summarizer = summarizer
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.message_tokens = message_tokens
+        self.summarize_batch = summarize_batch
+        self.max_batches_per_turn = max_batches_per_turn
+        self._lock = threading.Lock()
+        self._folding = {}  # chamber_id -> lock held while catch_up() runs for it
+
+    def _summarize(self, previous, messages):
+        if self.summarizer is not None:
+            try:
+                return self.summarizer(previous, messages)
+            except Exception:
+                pass
+        return extractive_summary(previous, messages, self.summary_tokens)
+
+    def _load(self, conn, email, chamber_name):
+        row = conn.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?",
+                           (email, chamber_name)).fetchone()
+        if not row:
+            return None, "", 0, []
+        chamber_id = row[0]
+        mem = conn.execute("SELECT summary, summarized_through_id FROM chamber_memory WHERE chamber_id=?",
+                           (chamber_id,)).fetchone()
+        summary, through = (mem[0] or "", mem[1] or 0) if mem else ("", 0)
+        recent = conn.execute("""SELECT id, sender_role, message_body FROM message_logs
+                                 WHERE chamber_id=? AND id>? ORDER BY id DESC LIMIT ?""",
+                              (chamber_id, through, self.recent_turns + 1)).fetchall()
+        recent.reverse()
+        return chamber_id, summary, through, recent
+
+    def catch_up(self, email, chamber_name):
+        """Fold messages between the summary and the recent window into the stored summary.
+
+        Makes up to max_batches_per_turn summarizer calls, so it belongs off the
+        chat path (after the answer is logged). Returns the number of messages folded.
+        """
+        with self.pool.connection() as conn:
+            chamber_id, summary, through, recent = self._load(conn, email, chamber_name)
+        recent = recent[-self.recent_turns:]
+        if chamber_id is None or not recent:
+            return 0
+        with self._lock:
+            busy = self._folding.setdefault(chamber_id, threading.Lock())
+        if not busy.acquire(blocking=False):
+            return 0  # another worker is already folding this chamber
+        try:
+            limit = self.summarize_batch * self.max_batches_per_turn
+            with self.pool.connection() as conn:
+                backlog = conn.execute("""SELECT id, sender_role, message_body FROM message_logs
+                                          WHERE chamber_id=? AND id>? AND id<? ORDER BY id ASC LIMIT ?""",
+                                       (chamber_id, through, recent[0][0], limit)).fetchall()
+            # only whole batches; a shorter tail stays verbatim in the prompt until it fills up
+            backlog = backlog[:len(backlog) - len(backlog) % self.summarize_batch]
+            if not backlog:
+                return 0
+            for start in range(0, len(backlog), self.summarize_batch):
+                batch = backlog[start:start + self.summarize_batch]
+                summary = self._summarize(summary, batch)
+                through = batch[-1][0]
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with self.pool.connection() as conn:
+                # never move the summary backwards if another process folded further meanwhile
+                conn.execute("""INSERT INTO chamber_memory (chamber_id, summary, summarized_through_id, updated_at)
+                                VALUES (?, ?, ?, ?)
+                                ON CONFLICT(chamber_id) DO UPDATE SET summary=excluded.summary,
+                                    summarized_through_id=excluded.summarized_through_id, updated_at=excluded.updated_at
+                                WHERE excluded.summarized_through_id > COALESCE(chamber_memory.summarized_through_id, 0)""",
+                             (chamber_id, summary, through, ts))
+            return len(backlog)
+        finally:
+            busy.release()
+
+    def _unsummarized(self, chamber_id, through, oldest_recent_id):
+        """(pending, notes) for messages still between the summary and the recent window
+
+        Fewer than a batch come back verbatim as pending turns; a longer backlog
+        (folding has not caught up yet) becomes LLM-free first-sentence notes of
+        the newest of them, with a count of the rest.
+        """
+        limit = self.summarize_batch * self.max_batches_per_turn
+        with self.pool.connection() as conn:
+            newest = conn.execute("""SELECT id, sender_role, message_body FROM message_logs
+                                     WHERE chamber_id=? AND id>? AND id<? ORDER BY id DESC LIMIT ?""",
+                                  (chamber_id, through, oldest_recent_id, limit)).fetchall()
+            total = len(newest)
+            if total == limit:
+                total = conn.execute("SELECT COUNT(*) FROM message_logs WHERE chamber_id=? AND id>? AND id<?",
+                                     (chamber_id, through, oldest_recent_id)).fetchone()[0]
+        newest.reverse()
+        if total < self.summarize_batch:
+            return newest, ""
+        notes = extractive_summary("", newest, self.summary_tokens // 2)
+        older = f" ({total - len(newest)} older not shown)" if total > len(newest) else ""
+        return [], f"NOT YET SUMMARISED, {total} messages{older}:\n{notes}"
+
+    def state(self, email, chamber_name):
+        """Short, stable id of the chamber's memory: chamber id + how far the summary reaches
+
+        Changes only when catch_up() advances the summary, so the answer cache can key
+        case answers on it instead of on the whole rendered conversation.
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute("""SELECT c.id, COALESCE(m.summarized_through_id, 0) FROM chambers c
+                                  LEFT JOIN chamber_memory m ON m.chamber_id = c.id
+                                  WHERE c.owner_email=? AND c.chamber_name=?""", (email, chamber_name)).fetchone()
+        return f"chamber {row[0]} summary {row[1]}" if row else None
+
+    def build_context(self, email, chamber_name, current_query=None):
+        """Return the conversation block for the prompt (may be empty); no summarizer calls"""
+        with self.pool.connection() as conn:
+            chamber_id, summary, through, recent = self._load(conn, email, chamber_name)
+        if chamber_id is None:
+            return ""
+
+        # The current question is logged before the answer is built; don't repeat it as history
+        if recent and current_query is not None and recent[-1][1] == "user" and recent[-1][2] == current_query:
+            recent = recent[:-1]
+        recent = recent[-self.recent_turns:]
+        if not recent and not summary:
+            return ""
+
+        pending, backlog = [], ""
+        if recent:
+            pending, backlog = self._unsummarized(chamber_id, through, recent[0][0])
+
+        turns = [f"[{_label(r)}]: {clip_to_tokens(b, self.message_tokens)}" for _i, r, b in pending + recent]
+        summary_block = f"CASE SUMMARY SO FAR:\n{summary}\n\n" if summary else ""
+        if backlog:
+            summary_block += backlog + "\n\n"
+        budget = self.token_budget - estimate_tokens(summary_block) - 10
+        kept = []
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn) + 1
+            if cost > budget:
+                break
+            kept.append(turn)
+            budget -= cost
+        kept.reverse()
+
+        recent_block = "RECENT EXCHANGE:\n" + "\n".join(kept) if kept else ""
+        return (summary_block + recent_block).strip()
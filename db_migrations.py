@@ -0,0 +1,323 @@
+# ==============================================================================
+# ALPHA APEX - VERSIONED SCHEMA MIGRATIONS
+# ==============================================================================
+# The schema version lives in PRAGMA user_version. Each migration runs in its
+# own IMMEDIATE transaction and bumps the version, so a half-applied upgrade is
+# never committed and two app processes starting together cannot both apply
+# the same step. Migrations must tolerate tables that a given app does not
+# create (siu.py has no system_telemetry, for example).
+#
+# Upgrade an existing database in place:
+#     python db_migrations.py advocate_ai_v2.db alpha_apex_leviathan_master_v32.db
+# ==============================================================================
+
+import os
+import sqlite3
+import sys
+
+
+def _has_table(cur, name):
+    return cur.execute("SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name=?", (name,)).fetchone() is not None
+
+
+def _m001_unique_chambers(cur):
+    if not _has_table(cur, "chambers"):
+        return
+    # Older builds could create the same chamber twice; fold duplicates into
+    # the oldest row before the unique index makes that impossible.
+    dupes = cur.execute("""SELECT owner_email, chamber_name, MIN(id)
+                           FROM chambers GROUP BY owner_email, chamber_name
+                           HAVING COUNT(*) > 1""").fetchall()
+    for owner, name, keep_id in dupes:
+        if _has_table(cur, "message_logs"):
+            cur.execute("""UPDATE message_logs SET chamber_id=? WHERE chamber_id IN
+                           (SELECT id FROM chambers WHERE owner_email=? AND chamber_name=? AND id<>?)""",
+                        (keep_id, owner, name, keep_id))
+        cur.execute("DELETE FROM chambers WHERE owner_email=? AND chamber_name=? AND id<>?", (owner, name, keep_id))
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_chambers_owner_name ON chambers(owner_email, chamber_name)")
+
+
+def _m002_message_logs_by_chamber(cur):
+    if _has_table(cur, "message_logs"):
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_message_logs_chamber_id ON message_logs(chamber_id, id)")
+
+
+def _m003_telemetry_recent(cur):
+    if _has_table(cur, "system_telemetry"):
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_system_telemetry_recent ON system_telemetry(id DESC, event_type)")
+
+
+def _add_missing_columns(cur, table, columns):
+    existing = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns:
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def _m004_law_asset_fingerprints(cur):
+    # siu.py and app (5).py already ship a law_assets table without fingerprints
+    cur.execute("""CREATE TABLE IF NOT EXISTS law_assets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT,
+        filesize_kb REAL,
+        page_count INTEGER,
+        sync_timestamp TEXT,
+        asset_status TEXT DEFAULT 'Verified'
+    )""")
+    _add_missing_columns(cur, "law_assets", [
+        ("asset_status", "TEXT DEFAULT 'Verified'"),
+        ("file_size", "INTEGER"),
+        ("file_mtime", "REAL"),
+        ("content_hash", "TEXT"),
+    ])
+    cur.execute("DELETE FROM law_assets WHERE id NOT IN (SELECT MAX(id) FROM law_assets GROUP BY filename)")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_law_assets_filename ON law_assets(filename)")
+    cur.execute("""CREATE TABLE IF NOT EXISTS law_asset_pages (
+        asset_id INTEGER NOT NULL,
+        page_no INTEGER NOT NULL,
+        page_text TEXT,
+        PRIMARY KEY (asset_id, page_no)
+    )""")
+
+
+def _m005_response_cache(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS response_cache (
+        cache_key TEXT PRIMARY KEY,
+        query_norm TEXT,
+        ai_mode TEXT,
+        persona TEXT,
+        lang TEXT,
+        response TEXT,
+        embedding BLOB,
+        created_at REAL,
+        last_hit REAL,
+        hits INTEGER DEFAULT 0
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_last_hit ON response_cache(last_hit)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_created ON response_cache(created_at)")
+
+
+def _m006_chamber_memory(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS chamber_memory (
+        chamber_id INTEGER PRIMARY KEY,
+        summary TEXT,
+        summarized_through_id INTEGER DEFAULT 0,
+        updated_at TEXT
+    )""")
+
+
+def _m007_email_outbox(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient TEXT NOT NULL,
+        subject TEXT,
+        body TEXT,
+        status TEXT DEFAULT 'queued',
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at REAL,
+        claimed_at REAL,
+        last_error TEXT,
+        created_at REAL,
+        sent_at REAL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at)")
+
+
+def _m008_message_search(cur):
+    if not _has_table(cur, "message_logs"):
+        return
+    # External-content FTS5 index over message_logs: the text is not stored twice.
+    # "chamber" holds one token per row ('c<chamber_id>') so a search can be
+    # scoped to a user's chambers inside the MATCH instead of filtering afterwards.
+    cur.execute("""CREATE VIEW IF NOT EXISTS message_search_src AS
+                   SELECT id, message_body, 'c' || chamber_id AS chamber FROM message_logs""")
+    try:
+        cur.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS message_search USING fts5(
+            message_body, chamber,
+            content='message_search_src', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""")
+    except Exception as e:
+        if "fts5" not in str(e).lower():
+            raise
+        return  # SQLite built without FTS5: message_search.py falls back to LIKE
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS message_logs_search_ai AFTER INSERT ON message_logs BEGIN
+        INSERT INTO message_search(rowid, message_body, chamber) VALUES (new.id, new.message_body, 'c' || new.chamber_id);
+    END""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS message_logs_search_ad AFTER DELETE ON message_logs BEGIN
+        INSERT INTO message_search(message_search, rowid, message_body, chamber)
+        VALUES ('delete', old.id, old.message_body, 'c' || old.chamber_id);
+    END""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS message_logs_search_au AFTER UPDATE OF message_body, chamber_id ON message_logs BEGIN
+        INSERT INTO message_search(message_search, rowid, message_body, chamber)
+        VALUES ('delete', old.id, old.message_body, 'c' || old.chamber_id);
+        INSERT INTO message_search(rowid, message_body, chamber) VALUES (new.id, new.message_body, 'c' || new.chamber_id);
+    END""")
+    cur.execute("INSERT INTO message_search(message_search) VALUES ('rebuild')")
+    cur.execute("INSERT INTO message_search(message_search) VALUES ('optimize')")
+
+
+def _m009_statute_sections(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS statute_sections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asset_id INTEGER,
+        content_hash TEXT,
+        act TEXT,
+        act_key TEXT,
+        part TEXT,
+        chapter TEXT,
+        section TEXT,
+        heading TEXT,
+        body TEXT,
+        page_no INTEGER,
+        ord INTEGER
+    )""")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_statute_sections_asset ON statute_sections(asset_id, section)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_statute_sections_cite ON statute_sections(act_key, section)")
+
+
+def _m010_library_uploads(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS library_uploads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT NOT NULL,
+        uploaded_by TEXT,
+        status TEXT DEFAULT 'queued',
+        pages_total INTEGER,
+        pages_done INTEGER DEFAULT 0,
+        error TEXT,
+        created_at REAL,
+        claimed_at REAL,
+        finished_at REAL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_library_uploads_status ON library_uploads(status, id)")
+
+
+def _m011_chamber_documents(cur):
+    # the acts/files a chamber is about; no rows = the whole library
+    cur.execute("""CREATE TABLE IF NOT EXISTS chamber_documents (
+        chamber_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        attached_at TEXT,
+        PRIMARY KEY (chamber_id, filename)
+    ) WITHOUT ROWID""")
+
+
+def _m012_statute_digests(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS statute_digests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asset_id INTEGER NOT NULL,
+        act TEXT,
+        act_key TEXT,
+        scope TEXT NOT NULL,
+        title TEXT,
+        digest TEXT,
+        source_hash TEXT,
+        model TEXT,
+        created_at TEXT
+    )""")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_statute_digests_scope ON statute_digests(asset_id, scope)")
+
+
+def _m013_turn_spans(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS turn_spans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        turn_id TEXT NOT NULL,
+        started_at REAL,
+        user_email TEXT,
+        chamber TEXT,
+        kind TEXT,
+        stage TEXT NOT NULL,
+        offset_ms REAL,
+        duration_ms REAL,
+        attrs TEXT
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_turn_spans_turn ON turn_spans(turn_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_turn_spans_stage ON turn_spans(stage, started_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_turn_spans_slowest ON turn_spans(stage, duration_ms)")
+
+
+def _m014_vector_index_sources(cur):
+    # one row per fully embedded file and vector collection, with the content
+    # hash it was embedded from (legal_retrieval.sync_corpus)
+    cur.execute("""CREATE TABLE IF NOT EXISTS vector_index_sources (
+        collection TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        content_hash TEXT,
+        chunks INTEGER,
+        indexed_at REAL,
+        PRIMARY KEY (collection, filename)
+    ) WITHOUT ROWID""")
+
+
+# (version, description, step) - append only, never renumber
+MIGRATIONS = [
+    (1, "unique chambers(owner_email, chamber_name)", _m001_unique_chambers),
+    (2, "message_logs(chamber_id, id) index", _m002_message_logs_by_chamber),
+    (3, "system_telemetry(id DESC, event_type) index", _m003_telemetry_recent),
+    (4, "law_assets fingerprints + law_asset_pages", _m004_law_asset_fingerprints),
+    (5, "response_cache table", _m005_response_cache),
+    (6, "chamber_memory running summaries", _m006_chamber_memory),
+    (7, "email_outbox queue", _m007_email_outbox),
+    (8, "message_search FTS5 index + sync triggers", _m008_message_search),
+    (9, "statute_sections parsed from law_asset_pages", _m009_statute_sections),
+    (10, "library_uploads ingestion queue", _m010_library_uploads),
+    (11, "chamber_documents retrieval scope", _m011_chamber_documents),
+    (12, "statute_digests per act/part", _m012_statute_digests),
+    (13, "turn_spans chat-turn tracing", _m013_turn_spans),
+    (14, "vector_index_sources embedding ledger", _m014_vector_index_sources),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn, migrations=None):
+    """Apply every pending migration to an open connection; returns the applied versions"""
+    migrations = MIGRATIONS if migrations is None else migrations
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    for version, _description, step in sorted(migrations, key=lambda m: m[0]):
+        if schema_version(conn) >= version:
+            continue
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock: another process may have won the race.
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(cur)
+            cur.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    return applied
+
+
+def migrate_file(db_path):
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(db_path)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        applied = run_migrations(conn)
+        conn.execute("ANALYZE")
+        return applied, schema_version(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python db_migrations.py DB_FILE [DB_FILE ...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        applied, version = migrate_file(path)
+        print(f"{path}: applied {applied or 'nothing'} -> schema v{version}")
@@ -0,0 +1,103 @@
+# ==============================================================================
+# ALPHA APEX - SHARED SQLITE CONNECTION POOL
+# ==============================================================================
+# One long-lived connection per thread and database file. Pragmas are applied
+# once when a connection is opened instead of on every db_* call. Connections
+# are per thread, not per session: Streamlit starts a new script thread for
+# each rerun, so a session opens a fresh connection per rerun, and the old
+# thread's connection is only closed when a later thread opens one and prunes
+# the connections of threads that have exited. Threads never share a
+# connection object, but they do share the pool (cached via st.cache_resource).
+# ==============================================================================
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 268435456),   # 256 MB
+    ("cache_size", -65536),     # 64 MB (negative = KiB)
+    ("temp_store", "MEMORY"),
+)
+
+
+class ConnectionPool:
+    """Thread-safe pool handing out one connection per thread (a Streamlit rerun runs on a new thread).
+
+    Connections of finished threads are reclaimed only by dead-thread pruning when a new
+    thread opens its connection, or by close_all().
+    """
+
+    def __init__(self, db_path, pragmas=DEFAULT_PRAGMAS, busy_timeout=30.0):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value};")
+        return conn
+
+    def _prune_dead_threads(self):
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._connections if i not in alive]:
+            try:
+                self._connections.pop(ident).close()
+            except sqlite3.Error:
+                pass
+
+    def _thread_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[threading.get_ident()] = conn
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Yield this thread's connection; commit on success, rollback on error.
+
+        Nested blocks share the outer transaction and only the outermost
+        block commits.
+        """
+        conn = self._thread_connection()
+        self._local.depth += 1
+        try:
+            yield conn
+            if self._local.depth == 1:
+                conn.commit()
+        except BaseException:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+
+    @contextmanager
+    def cursor(self):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,289 @@
+# ==============================================================================
+# ALPHA APEX - DURABLE EMAIL OUTBOX
+# ==============================================================================
+# "Email Brief" used to build the brief and run connect/STARTTLS/login/send/quit
+# inline on the Streamlit thread. Now the click only inserts a row into
+# email_outbox and returns; a daemon worker thread drains the table:
+#   - one authenticated SMTP session is kept open across messages and closed
+#     after idle_timeout seconds without work (reconnected transparently if the
+#     server drops it)
+#   - due rows are claimed in batches of batch_size
+#   - transient failures go back to 'queued' with jittered exponential backoff;
+#     permanent ones (5xx refusals) and rows past max_attempts end as 'failed'
+#   - failures to connect or log in (e.g. 535 bad credentials) back off the
+#     whole batch rather than reconnecting once per message
+# Rows live in SQLite, so queued briefs survive a restart; rows left in
+# 'sending' by a dead process are re-queued after stale_after seconds.
+# ==============================================================================
+
+import datetime
+import random
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+RULE = "=" * 70
+
+
+def format_brief(chamber_name, history, version_id, now=None):
+    """Plain-text brief for a chamber history ([{"role", "content"}, ...])"""
+    now = now or datetime.datetime.now()
+    parts = [RULE, "ALPHA APEX LEGAL INTELLIGENCE BRIEF", RULE, "",
+             f"CHAMBER: {chamber_name}",
+             f"DATE: {now.strftime('%Y-%m-%d %H:%M:%S')}",
+             "STATUS: CONFIDENTIAL", "", RULE, ""]
+    for idx, item in enumerate(history, 1):
+        role = "COUNSEL" if item["role"] == "user" else "AI ADVISOR"
+        parts += [f"[MESSAGE {idx} - {role}]", "-" * 70, f"{item['content']}", ""]
+    parts += [RULE, f"Generated by Alpha Apex v{version_id}", RULE, ""]
+    return "\n".join(parts)
+
+
+def is_permanent(exc):
+    """5xx refusals will not succeed on retry; everything else (4xx, drops, timeouts) might"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _msg in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return False  # credentials may be rotated; keep retrying with backoff
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return False
+
+
+class SMTPOutbox:
+    def __init__(self, pool, host, port, username=None, password=None, sender=None, use_tls=True,
+                 batch_size=20, idle_timeout=60.0, max_attempts=6, base_delay=5.0, max_delay=600.0,
+                 poll_interval=5.0, stale_after=600.0, timeout=30.0, smtp_factory=smtplib.SMTP):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.use_tls = use_tls
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.timeout = timeout
+        self.smtp_factory = smtp_factory
+        self.counters = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "connects": 0}
+        self._session = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # -- producer side ---------------------------------------------------------
+
+    def enqueue(self, recipient, subject, body):
+        """Persist a message and wake the worker; returns the outbox id"""
+        now = time.time()
+        with self.pool.connection() as conn:
+            job_id = conn.execute("""INSERT INTO email_outbox (recipient, subject, body, status, attempts,
+                                                               next_attempt_at, created_at)
+                                     VALUES (?, ?, ?, 'queued', 0, ?, ?)""",
+                                  (recipient, subject, body, now, now)).lastrowid
+        self._bump("queued")
+        self.start()
+        self._idle.clear()
+        self._wake.set()
+        return job_id
+
+    def status(self, job_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT status, attempts, last_error FROM email_outbox WHERE id=?", (job_id,)).fetchone()
+        return {"status": row[0], "attempts": row[1], "last_error": row[2]} if row else None
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            by_status = dict(conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall())
+        with self._lock:
+            counters = dict(self.counters)
+        counters["backlog"] = by_status.get("queued", 0) + by_status.get("sending", 0)
+        counters["by_status"] = by_status
+        return counters
+
+    # -- worker lifecycle ------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout=30.0):
+        """Block until nothing is due right now (used by scripts/benchmarks); True if drained"""
+        self.start()
+        self._idle.clear()
+        self._wake.set()
+        return self._idle.wait(timeout)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self._disconnect()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self._claim_batch()
+                if batch:
+                    self._send_batch(batch)
+                    continue
+                self._idle.set()
+                if self._session is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+                    self._disconnect()
+                self._requeue_stale()
+                wait = self._next_wait()
+            except Exception:
+                wait = self.poll_interval  # DB busy/locked: the rows are still there next round
+            self._wake.wait(wait)
+            self._wake.clear()
+        self._idle.set()
+
+    def _next_wait(self):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT MIN(next_attempt_at) FROM email_outbox WHERE status='queued'").fetchone()
+        wait = self.poll_interval if row[0] is None else max(0.0, row[0] - time.time())
+        if self._session is not None:
+            wait = min(wait, max(0.0, self.idle_timeout - (time.monotonic() - self._last_used)))
+        return min(wait, self.poll_interval)
+
+    # -- queue table -----------------------------------------------------------
+
+    def _requeue_stale(self):
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE email_outbox SET status='queued' WHERE status='sending' AND claimed_at<?",
+                         (time.time() - self.stale_after,))
+
+    def _claim_batch(self):
+        now = time.time()
+        with self.pool.connection() as conn:
+            rows = conn.execute("""SELECT id, recipient, subject, body, attempts FROM email_outbox
+                                   WHERE status='queued' AND next_attempt_at<=? ORDER BY id LIMIT ?""",
+                                (now, self.batch_size)).fetchall()
+            claimed = []
+            for row in rows:
+                # guarded update: another process's worker may have claimed it meanwhile
+                if conn.execute("UPDATE email_outbox SET status='sending', claimed_at=? WHERE id=? AND status='queued'",
+                                (now, row[0])).rowcount:
+                    claimed.append(row)
+        return claimed
+
+    def _backoff(self, attempts):
+        return random.uniform(self.base_delay, min(self.max_delay, self.base_delay * (2 ** attempts)))
+
+    def _finish(self, job_id, attempts, exc=None):
+        now = time.time()
+        with self.pool.connection() as conn:
+            if exc is None:
+                conn.execute("UPDATE email_outbox SET status='sent', attempts=?, sent_at=?, last_error=NULL WHERE id=?",
+                             (attempts, now, job_id))
+                self._bump("sent")
+            elif is_permanent(exc) or attempts >= self.max_attempts:
+                conn.execute("UPDATE email_outbox SET status='failed', attempts=?, last_error=? WHERE id=?",
+                             (attempts, f"{type(exc).__name__}: {exc}"[:500], job_id))
+                self._bump("failed")
+            else:
+                conn.execute("""UPDATE email_outbox SET status='queued', attempts=?, next_attempt_at=?, last_error=?
+                                WHERE id=?""",
+                             (attempts, now + self._backoff(attempts), f"{type(exc).__name__}: {exc}"[:500], job_id))
+                self._bump("retried")
+
+    def _bump(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # -- SMTP session ----------------------------------------------------------
+
+    def _connect(self):
+        session = self.smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            session.ehlo()
+            if self.use_tls:
+                session.starttls()
+                session.ehlo()
+            if self.username:
+                session.login(self.username, self.password)
+        except Exception:
+            try:
+                session.close()
+            except Exception:
+                pass
+            raise
+        self._bump("connects")
+        return session
+
+    def _disconnect(self):
+        session, self._session = self._session, None
+        if session is not None:
+            try:
+                session.quit()
+            except Exception:
+                try:
+                    session.close()
+                except Exception:
+                    pass
+
+    def _build_message(self, recipient, subject, body):
+        msg = MIMEMultipart()
+        msg["From"] = f"Alpha Apex <{self.sender}>"
+        msg["To"] = recipient
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain", "utf-8"))
+        return msg
+
+    def _deliver(self, msg):
+        # one silent reconnect when a kept-alive session has been dropped by the server
+        for attempt in (0, 1):
+            if self._session is None:
+                self._session = self._connect()
+            try:
+                self._session.send_message(msg)
+                self._last_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._session = None
+                if attempt:
+                    raise
+            except smtplib.SMTPException:
+                raise  # a reply from a live server (refusal, 4xx/5xx); the session is still usable
+            except OSError:
+                self._session = None
+                if attempt:
+                    raise
+
+    def _send_batch(self, batch):
+        for pos, (job_id, recipient, subject, body, attempts) in enumerate(batch):
+            try:
+                self._deliver(self._build_message(recipient, subject, body))
+                self._finish(job_id, attempts + 1)
+                continue
+            except smtplib.SMTPRecipientsRefused as e:
+                self._finish(job_id, attempts + 1, e)
+                continue
+            except (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError) as e:
+                error = e  # no session to send on: every message in the batch would fail the same way
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code != 421:
+                    self._finish(job_id, attempts + 1, e)
+                    continue
+                error = e  # 421: server is closing the session
+            except Exception as e:
+                error = e
+            # connection-level failure: back off the rest of the batch instead of reconnecting per message
+            self._disconnect()
+            for job_id, _r, _s, _b, attempts in batch[pos:]:
+                self._finish(job_id, attempts + 1, error)
+            return
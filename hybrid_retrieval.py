@@ -0,0 +1,218 @@
+# ==============================================================================
+# ALPHA APEX - HYBRID STATUTE RETRIEVAL (BM25 + VECTORS, RRF)
+# ==============================================================================
+# Embeddings miss exact statutory terms ("Rent Controller", "Article 199",
+# "defacement"); keyword search misses lay paraphrase ("my landlord kicked me
+# out"). HybridRetriever runs both and fuses the two rankings with reciprocal
+# rank fusion, score(d) = sum 1 / (rrf_k + rank), which needs no score
+# calibration between BM25 and cosine distances.
+#
+#   BM25Index  - in-process inverted index over statute_sections (one document
+#                per section/article, heading weighted), plus page chunks for
+#                assets that have no parsed sections; uploads are appended
+#                page by page while they ingest
+#   vector     - the existing Chroma collection (legal_retrieval)
+#   rerank     - optional cheap pass over the fused candidates: share of query
+#                terms present in the text, no model call
+# If the vector side fails (no API key, network), results are BM25 only.
+# ==============================================================================
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from langchain_core.documents import Document
+
+from legal_retrieval import chunk_pages
+from statute_sections import section_label
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""a an and are as at be by can do does for from has have he her his i if in into is it its
+me my of on or our shall she should so such than that the their them then there these they this to under was we
+were what when where which who will with would you your""".split())
+HEADING_WEIGHT = 2
+
+
+def stem(token):
+    """Light suffix stripping so 'tenants'/'tenant', 'evicted'/'eviction' meet"""
+    if token.isdigit() or len(token) <= 4:
+        return token
+    for suffix in ("ations", "ation", "ments", "ment", "ings", "ing", "ions", "ion", "ies", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    return [stem(t) for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+# ------------------------------------------------------------------------------
+# BM25
+# ------------------------------------------------------------------------------
+
+class BM25Index:
+    """Okapi BM25 over a list of Documents; add() appends without rebuilding (IDF is computed per query)
+
+    Postings are partitioned by the document's source file, so a search scoped to
+    a few sources (a chamber's attached acts) only walks those partitions. Term
+    statistics stay corpus-wide, so scoped and unscoped scores are comparable.
+    """
+
+    def __init__(self, docs=(), texts=None, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = []
+        self.postings = defaultdict(dict)  # term -> {source: [(doc_idx, tf), ...]}
+        self.df = Counter()
+        self.lengths = []
+        self._total_len = 0
+        self._lock = threading.Lock()
+        self.add(docs, texts)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, docs, texts=None):
+        docs = list(docs)
+        texts = texts if texts is not None else [d.page_content for d in docs]
+        with self._lock:
+            for doc, text in zip(docs, texts):
+                counts = Counter(tokenize(text))
+                idx = len(self.docs)
+                source = doc.metadata.get("source")
+                self.docs.append(doc)
+                self.lengths.append(sum(counts.values()))
+                self._total_len += self.lengths[-1]
+                for term, tf in counts.items():
+                    self.postings[term].setdefault(source, []).append((idx, tf))
+                    self.df[term] += 1
+
+    def search(self, query, k=20, sources=None):
+        """[(doc_idx, score), ...] best first; sources limits the search to those files"""
+        scores = defaultdict(float)
+        n = len(self.lengths)
+        k1, b, avg = self.k1, self.b, (self._total_len / n if n else 0.0) or 1.0
+        for term in set(tokenize(query)):
+            partitions = self.postings.get(term)
+            if not partitions:
+                continue
+            df = self.df[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            lists = list(partitions.values()) if sources is None else [partitions.get(s, ()) for s in sources]
+            for postings in lists:
+                for idx, tf in postings:
+                    norm = k1 * (1 - b + b * self.lengths[idx] / avg)
+                    scores[idx] += idf * tf * (k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def build_bm25_index(conn):
+    """BM25 over statute_sections, plus chunked pages of assets with no parsed sections
+
+    Uploads still 'Processing' are included with the pages extracted so far, so
+    a rebuild mid-upload keeps them searchable.
+    """
+    docs, texts = [], []
+    rows = conn.execute("""SELECT s.act, s.act_key, s.section, s.heading, s.body, s.page_no, a.filename
+                           FROM statute_sections s JOIN law_assets a ON a.id = s.asset_id
+                           ORDER BY s.asset_id, s.ord""").fetchall()
+    for act, key, number, heading, body, page_no, filename in rows:
+        label = section_label(key)
+        docs.append(Document(page_content=f"{label} {number}. {heading}\n{body}".strip(),
+                             metadata={"source": filename, "act": act, "page": page_no, "section": f"{label} {number}"}))
+        texts.append(" ".join([act, label, number] + [heading or ""] * HEADING_WEIGHT + [body or ""]))
+
+    bare = conn.execute("""SELECT id, filename FROM law_assets
+                           WHERE asset_status IN ('Verified', 'Processing')
+                             AND id NOT IN (SELECT DISTINCT asset_id FROM statute_sections)""").fetchall()
+    for asset_id, filename in bare:
+        pages = conn.execute("SELECT page_no, page_text FROM law_asset_pages WHERE asset_id=? ORDER BY page_no",
+                             (asset_id,)).fetchall()
+        chunks, _ids = chunk_pages(filename, pages)
+        for doc in chunks:
+            docs.append(doc)
+            texts.append(f"{doc.metadata['act']} {doc.page_content}")
+    return BM25Index(docs, texts)
+
+
+# ------------------------------------------------------------------------------
+# FUSION
+# ------------------------------------------------------------------------------
+
+def doc_key(doc):
+    meta = doc.metadata
+    return (meta.get("source"), meta.get("section") or f"p{meta.get('page')}:{hash(doc.page_content)}")
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """[[Document, ...], ...] -> [(Document, score), ...] best first; a document is keyed by source + section/text"""
+    scores, first = defaultdict(float), {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc_key(doc)
+            scores[key] += 1.0 / (rrf_k + rank)
+            first.setdefault(key, doc)
+    return [(first[key], score) for key, score in sorted(scores.items(), key=lambda item: -item[1])]
+
+
+def rerank_by_coverage(query, fused, weight=0.5, terms_of=None):
+    """Cheap re-rank: boost candidates containing more of the query's distinct terms
+
+    terms_of(doc) -> set of terms lets the caller reuse tokenisations across queries.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return fused
+    terms_of = terms_of or (lambda doc: set(tokenize(doc.page_content)))
+    top = fused[0][1] if fused else 0.0
+    rescored = []
+    for doc, score in fused:
+        present = terms & terms_of(doc)
+        rescored.append((doc, score + weight * top * len(present) / len(terms)))
+    return sorted(rescored, key=lambda item: -item[1])
+
+
+class HybridRetriever:
+    TERM_CACHE_SIZE = 4096
+
+    def __init__(self, bm25, vectorstore=None, rrf_k=60, candidates=20, rerank=False):
+        self.bm25 = bm25
+        self.vectorstore = vectorstore
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.rerank = rerank
+        self._terms = {}  # doc_key -> term set, so re-ranking does not re-tokenise the same sections every query
+
+    def _doc_terms(self, doc):
+        key = doc_key(doc)
+        terms = self._terms.get(key)
+        if terms is None:
+            if len(self._terms) >= self.TERM_CACHE_SIZE:
+                self._terms.clear()
+            terms = self._terms[key] = frozenset(tokenize(doc.page_content))
+        return terms
+
+    def keyword(self, query, k, sources=None):
+        return [self.bm25.docs[idx] for idx, _score in self.bm25.search(query, k, sources)]
+
+    def semantic(self, query, k, sources=None):
+        if self.vectorstore is None:
+            return []
+        try:
+            if sources is None:
+                return self.vectorstore.similarity_search(query, k=k)
+            return self.vectorstore.similarity_search(query, k=k, filter={"source": {"$in": list(sources)}})
+        except Exception:
+            return []  # embedding backend unavailable: keyword results still stand
+
+    def retrieve(self, query, k=4, sources=None):
+        """Top-k fused Documents; sources (filenames) restricts both sides before ranking"""
+        if sources is not None and not sources:
+            return []
+        fused = reciprocal_rank_fusion([self.keyword(query, self.candidates, sources),
+                                        self.semantic(query, self.candidates, sources)], self.rrf_k)
+        if self.rerank:
+            fused = rerank_by_coverage(query, fused, terms_of=self._doc_terms)
+        return [doc for doc, _score in fused[:k]]
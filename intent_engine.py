@@ -0,0 +1,134 @@
+# ==============================================================================
+# ALPHA APEX - SINGLE-PASS INTENT ENGINE
+# ==============================================================================
+# Replaces the per-intent `any(kw in text)` substring scans, which re-lowercased
+# the query four times and misfired inside words ("hi" in "prohibition", "act"
+# in "contact"). All phrase lists are compiled into ONE lookup table of word
+# n-grams -> intent; the query is tokenised once on word boundaries and walked
+# in a single pass (longest phrase first), and a scored intent is derived from
+# the hit counts.
+# ==============================================================================
+
+import json
+import os
+import re
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+GREETINGS = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening',
+             'greetings', 'salaam', 'salam', 'assalam o alaikum', 'assalamualaikum', 'aoa', 'kaise hain']
+FAREWELLS = ['bye', 'goodbye', 'see you', 'farewell', 'take care', 'allah hafiz',
+             'khuda hafiz', 'alvida']
+THANKS = ['thank', 'thanks', 'thank you', 'appreciate', 'grateful', 'shukriya', 'meherbani', 'jazakallah']
+PERSONAL_LEGAL = ['should i', 'what can i', 'my rights', 'kicked out', 'evict', 'evicted', 'evicting']
+# Terms from the statutes in DATA/ that LEGAL_KEYWORDS does not cover
+DOMAIN_TERMS = ['rent', 'rented', 'tenancy', 'lease', 'sublet', 'subletting', 'premises', 'srpo',
+                'rent controller', 'cantonment', 'demolish', 'demolition', 'defacement', 'notice to vacate']
+
+# Any legal hit sends the query to the lawyer ("hi, what is bail?", "no rent
+# paid"); greetings/thanks/small talk only win when nothing legal was found.
+LONG_QUERY_CHARS = 100
+
+SOCIAL_PRIORITY = ("greeting", "farewell", "thanks", "smalltalk")
+
+
+class Intent:
+    __slots__ = ("name", "score", "hits")
+
+    def __init__(self, name, score, hits):
+        self.name = name
+        self.score = score
+        self.hits = hits
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, score={self.score:.2f}, hits={self.hits})"
+
+
+def _variants(phrase):
+    # Plural tolerance on the last word: "law" also matches "laws", "case" -> "cases"
+    words = tuple(phrase.lower().split())
+    if not words:
+        return []
+    last = words[-1]
+    return [words, words[:-1] + (last + "s",), words[:-1] + (last + "es",)]
+
+
+def load_brain_phrases(path="brain.json"):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return list(json.load(fh).keys())
+
+
+def intent_vocabulary(legal_keywords, groups=(GREETINGS, FAREWELLS, THANKS, PERSONAL_LEGAL, DOMAIN_TERMS)):
+    """Every word of the legal keywords and built-in intent phrases, with plural forms"""
+    words = set()
+    for phrase in list(legal_keywords) + [p for group in groups for p in group]:
+        for variant in _variants(phrase):
+            words.update(variant)
+    return words
+
+
+class IntentEngine:
+    def __init__(self, legal_keywords, greetings=GREETINGS, farewells=FAREWELLS, thanks=THANKS,
+                 personal_legal=PERSONAL_LEGAL, domain_terms=DOMAIN_TERMS, smalltalk=()):
+        claimed = {p.lower() for p in list(greetings) + list(farewells) + list(thanks)}
+        # single words from brain.json ("yes", "no", "ok", "help") are too common
+        # inside real questions to count as small talk; the canned-response fast
+        # path still answers them when they are the whole message
+        smalltalk = [p for p in smalltalk if len(p.split()) > 1 and p.lower() not in claimed]
+        groups = [
+            ("smalltalk", smalltalk),
+            ("thanks", thanks),
+            ("farewell", farewells),
+            ("greeting", greetings),
+            ("legal", list(legal_keywords) + list(personal_legal) + list(domain_terms)),
+        ]
+        # One table for every phrase (tuple of words -> intent); later groups win
+        # on collisions, so legal terms are never shadowed by small talk.
+        self._table = {}
+        for name, phrases in groups:
+            for phrase in phrases:
+                for variant in _variants(phrase):
+                    self._table[variant] = name
+        # first word -> phrase lengths starting with it, longest first; most
+        # tokens start no phrase and cost a single dict miss
+        starts = {}
+        for key in self._table:
+            starts.setdefault(key[0], set()).add(len(key))
+        self._starts = {word: sorted(sizes, reverse=True) for word, sizes in starts.items()}
+
+    def scan(self, text):
+        """One pass over the tokens -> {intent: hits} (longest phrase wins)"""
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        hits = {}
+        table, starts, i, n = self._table, self._starts, 0, len(tokens)
+        while i < n:
+            step = 1
+            for size in starts.get(tokens[i], ()):
+                if size == 1:
+                    name = table.get((tokens[i],))
+                elif i + size <= n:
+                    name = table.get(tuple(tokens[i:i + size]))
+                else:
+                    continue
+                if name:
+                    hits[name] = hits.get(name, 0) + 1
+                    step = size
+                    break
+            i += step
+        return hits
+
+    def classify(self, text):
+        text = (text or "").strip()
+        hits = self.scan(text)
+        words = len(text.split())
+        social = next((name for name in SOCIAL_PRIORITY if name in hits), None)
+        legal = hits.get("legal", 0)
+
+        if social and not legal:
+            return Intent(social, min(1.0, hits[social] / max(1, words) * 2), hits)
+        if legal or len(text) > LONG_QUERY_CHARS:
+            score = min(1.0, 0.4 + 0.2 * legal) if legal else 0.4
+            return Intent("legal", score, hits)
+        return Intent("non_legal", 1.0 if words else 0.0, hits)
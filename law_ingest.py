@@ -0,0 +1,120 @@
+# ==============================================================================
+# ALPHA APEX - INCREMENTAL LAW LIBRARY INGESTION
+# ==============================================================================
+# Fingerprints every PDF in the data repository and only re-extracts files that
+# are new or changed. Detection is two-step: (size, mtime) is a free stat()
+# check; only when that differs do we hash the bytes, so a touched-but-identical
+# file costs one read and no parsing. Extracted text lands in law_asset_pages
+# and page counts in law_assets, which the Law Library page renders directly.
+# A file that fails to extract is stored as 'Error' with its fingerprint like
+# any other. It is retried when its bytes change, and once per process (the
+# first sync after a restart), so a transient failure does not stick; within a
+# process it is not re-parsed on every sync.
+# ==============================================================================
+
+import datetime
+import hashlib
+import os
+
+from pdf_extract import extract_many as extract_many_parallel
+
+_failed_this_process = set()  # (filename, content_hash) that already failed or were retried since startup
+
+
+def file_sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def list_pdfs(data_dir):
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(f for f in os.listdir(data_dir) if f.lower().endswith(".pdf"))
+
+
+def _store_pages(cur, asset_id, pages):
+    cur.execute("DELETE FROM law_asset_pages WHERE asset_id=?", (asset_id,))
+    cur.executemany("INSERT INTO law_asset_pages (asset_id, page_no, page_text) VALUES (?, ?, ?)",
+                    [(asset_id, page_no, text) for page_no, text in pages])
+
+
+def sync_law_library(conn, data_dir, extract_many=extract_many_parallel):
+    """Bring law_assets/law_asset_pages in line with data_dir.
+
+    All parsing happens before the first write so the SQLite write lock is
+    only held for the inserts. Changed files are extracted together through
+    pdf_extract's process pool; extract_many(paths) -> {path: pages | Exception}
+    can be swapped out. The caller commits.
+    Returns {"added": [...], "updated": [...], "removed": [...], "unchanged": n}.
+    """
+    cur = conn.cursor()
+    known = {row[0]: row[1:] for row in cur.execute(
+        "SELECT filename, id, file_size, file_mtime, content_hash, asset_status FROM law_assets")}
+    report = {"added": [], "updated": [], "removed": [], "unchanged": 0}
+    on_disk = list_pdfs(data_dir)
+
+    touched, changed = [], []
+    for filename in on_disk:
+        path = os.path.join(data_dir, filename)
+        st_info = os.stat(path)
+        row = known.get(filename)
+        retry = row is not None and row[4] == "Error" and (filename, row[3]) not in _failed_this_process
+        if row and row[1] == st_info.st_size and row[2] == st_info.st_mtime and not retry:
+            report["unchanged"] += 1
+            continue
+        digest = file_sha256(path)
+        if row and row[3] == digest and not retry:
+            # Same bytes, new mtime (copied/touched): refresh the stat fingerprint only
+            touched.append((st_info.st_size, st_info.st_mtime, row[0]))
+            report["unchanged"] += 1
+        else:
+            changed.append((filename, path, st_info, digest, row))
+
+    extracted = extract_many([c[1] for c in changed]) if changed else {}
+
+    cur.executemany("UPDATE law_assets SET file_size=?, file_mtime=? WHERE id=?", touched)
+    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for filename, path, st_info, digest, row in changed:
+        pages = extracted.get(path)
+        if isinstance(pages, Exception) or pages is None:
+            pages, status = [], "Error"
+            _failed_this_process.add((filename, digest))
+        else:
+            status = "Verified"
+        values = (round(st_info.st_size / 1024, 2), len(pages) if pages else None, ts, status,
+                  st_info.st_size, st_info.st_mtime, digest)
+        if row:
+            asset_id = row[0]
+            cur.execute("""UPDATE law_assets SET filesize_kb=?, page_count=?, sync_timestamp=?, asset_status=?,
+                           file_size=?, file_mtime=?, content_hash=? WHERE id=?""", values + (asset_id,))
+            report["updated"].append(filename)
+        else:
+            cur.execute("""INSERT INTO law_assets (filesize_kb, page_count, sync_timestamp, asset_status,
+                           file_size, file_mtime, content_hash, filename) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                        values + (filename,))
+            asset_id = cur.lastrowid
+            report["added"].append(filename)
+        _store_pages(cur, asset_id, pages)
+
+    for filename in set(known) - set(on_disk):
+        asset_id = known[filename][0]
+        cur.execute("DELETE FROM law_asset_pages WHERE asset_id=?", (asset_id,))
+        cur.execute("DELETE FROM law_assets WHERE id=?", (asset_id,))
+        report["removed"].append(filename)
+
+    return report
+
+
+def load_asset_pages(conn, filename):
+    """[(page_no, text), ...] for an ingested file, without touching the PDF"""
+    return conn.execute("""SELECT p.page_no, p.page_text FROM law_asset_pages p
+                           JOIN law_assets a ON a.id = p.asset_id
+                           WHERE a.filename=? ORDER BY p.page_no""", (filename,)).fetchall()
+
+
+def fetch_library_rows(conn):
+    return conn.execute("""SELECT filename, filesize_kb, page_count, asset_status, sync_timestamp
+                           FROM law_assets ORDER BY filename""").fetchall()
@@ -0,0 +1,226 @@
+# ==============================================================================
+# ALPHA APEX - STATUTE RETRIEVAL (RAG) OVER THE DATA/ CORPUS
+# ==============================================================================
+# Chunks the statute PDFs once, embeds them into the persistent Chroma store
+# under chroma_db/, and returns the top-k sections for a query so the IRAC
+# prompt carries the actual statutory text instead of the model's memory.
+#
+# Embedding providers are pluggable:
+#   "google"  - Gemini text-embedding-004 (needs GOOGLE_API_KEY)
+#   "hf"      - local sentence-transformers model (optional install)
+#   "local"   - dependency-free hashing embedder, fully offline
+# Each provider gets its own collection so vectors of different widths never
+# share an index. The vector backend is Chroma or, for small corpora, a
+# memory-mapped NumPy matrix (npy_vectorstore) shared across processes.
+# ==============================================================================
+
+import hashlib
+import math
+import os
+import re
+import time
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from pdf_extract import extract_pdf_pages
+
+COLLECTION_PREFIX = "statutes"
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 150
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# ------------------------------------------------------------------------------
+# EMBEDDING PROVIDERS
+# ------------------------------------------------------------------------------
+
+class HashingEmbeddings(Embeddings):
+    """Offline embedder: signed feature hashing of unigrams and bigrams.
+
+    Not as good as a trained model on paraphrase, but deterministic, free and
+    fast enough to index the whole corpus in seconds without a network.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _embed(self, text):
+        vec = [0.0] * self.dim
+        tokens = _TOKEN_RE.findall(text.lower())
+        grams = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        for gram in grams:
+            h = int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def get_embedding_provider(name="google", api_key=None):
+    """Return an Embeddings instance for the configured provider name"""
+    name = (name or "local").lower()
+    if name == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=api_key)
+    if name in ("hf", "huggingface"):
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    if name == "local":
+        return HashingEmbeddings()
+    raise ValueError(f"Unknown embedding provider: {name}")
+
+
+# ------------------------------------------------------------------------------
+# CORPUS PREPARATION
+# ------------------------------------------------------------------------------
+
+def act_title(filename):
+    """'Sindh Rented Premises Ordinance,1979.pdf' -> 'Sindh Rented Premises Ordinance, 1979'"""
+    title = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r",\s*", ", ", title).strip()
+
+
+def chunk_pages(filename, pages):
+    """Split extracted pages into Documents carrying act/page metadata and stable ids"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    act = act_title(filename)
+    docs, ids = [], []
+    for page_no, text in pages:
+        text = text.strip()
+        if not text:
+            continue
+        for idx, chunk in enumerate(splitter.split_text(text)):
+            docs.append(Document(page_content=chunk, metadata={"source": filename, "act": act, "page": page_no}))
+            ids.append(f"{filename}:{page_no}:{idx}")
+    return docs, ids
+
+
+# ------------------------------------------------------------------------------
+# VECTOR STORE
+# ------------------------------------------------------------------------------
+
+def collection_name(provider):
+    return f"{COLLECTION_PREFIX}_{provider}"
+
+
+def open_vectorstore(persist_dir, embeddings, provider="google", backend="chroma", dtype="float32"):
+    """Chroma collection, or with backend="numpy" the memory-mapped store in npy_vectorstore"""
+    if backend == "numpy":
+        from npy_vectorstore import NumpyVectorStore
+        return NumpyVectorStore(persist_dir, collection_name(provider), embeddings, dtype=dtype)
+    from langchain_chroma import Chroma
+    return Chroma(collection_name=collection_name(provider),
+                  embedding_function=embeddings,
+                  persist_directory=persist_dir)
+
+
+def source_ids(vectorstore, filename):
+    return set(vectorstore.get(where={"source": filename}).get("ids") or [])
+
+
+def delete_source(vectorstore, filename):
+    ids = source_ids(vectorstore, filename)
+    if ids:
+        vectorstore.delete(ids=sorted(ids))
+    return len(ids)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sync_corpus(vectorstore, data_dir, batch_size=64, page_loader=None, conn=None, collection=COLLECTION_PREFIX):
+    """Embed the PDFs in data_dir that are not completely indexed yet.
+
+    page_loader(filename) -> [(page_no, text), ...] lets callers feed already
+    extracted text (e.g. from law_asset_pages) instead of re-parsing the PDF.
+
+    Chunk ids are stable, so a file that failed part-way (quota, network) is
+    resumed with only its missing chunks. With conn, every finished file is
+    recorded in vector_index_sources with its content hash: an unchanged file
+    then costs one lookup, a changed one has its old chunks deleted and is
+    embedded again, and files gone from data_dir are dropped from the index.
+    Ledger rows are committed per file, so a long embedding run never holds
+    the database write lock. One file failing does not stop the others.
+    Returns {"added": chunks, "skipped": files, "removed": [...], "failed": {filename: error}}.
+    """
+    report = {"added": 0, "skipped": 0, "removed": [], "failed": {}}
+    if not os.path.isdir(data_dir):
+        return report
+    if page_loader is None:
+        page_loader = lambda filename: extract_pdf_pages(os.path.join(data_dir, filename))
+    on_disk = sorted(f for f in os.listdir(data_dir) if f.lower().endswith(".pdf"))
+
+    ledger = {}
+    if conn is not None:
+        ledger = dict(conn.execute("SELECT filename, content_hash FROM vector_index_sources WHERE collection=?",
+                                   (collection,)).fetchall())
+        for filename in sorted(set(ledger) - set(on_disk)):
+            delete_source(vectorstore, filename)
+            conn.execute("DELETE FROM vector_index_sources WHERE collection=? AND filename=?", (collection, filename))
+            conn.commit()
+            report["removed"].append(filename)
+
+    for filename in on_disk:
+        try:
+            content_hash = None
+            if conn is not None:
+                row = conn.execute("SELECT content_hash FROM law_assets WHERE filename=?", (filename,)).fetchone()
+                content_hash = (row and row[0]) or _file_hash(os.path.join(data_dir, filename))
+                if ledger.get(filename) == content_hash:
+                    report["skipped"] += 1
+                    continue
+                if filename in ledger:
+                    delete_source(vectorstore, filename)  # the PDF changed: its old chunks are stale
+            docs, ids = chunk_pages(filename, page_loader(filename))
+            present = source_ids(vectorstore, filename)
+            todo = [i for i, chunk_id in enumerate(ids) if chunk_id not in present]
+            for start in range(0, len(todo), batch_size):
+                batch = todo[start:start + batch_size]
+                vectorstore.add_documents([docs[i] for i in batch], ids=[ids[i] for i in batch])
+                report["added"] += len(batch)
+            if conn is not None:
+                conn.execute("""INSERT OR REPLACE INTO vector_index_sources (collection, filename, content_hash,
+                                                                             chunks, indexed_at)
+                                VALUES (?, ?, ?, ?, ?)""", (collection, filename, content_hash, len(ids), time.time()))
+                conn.commit()
+            elif not todo:
+                report["skipped"] += 1
+        except Exception as e:
+            report["failed"][filename] = f"{type(e).__name__}: {e}"
+    return report
+
+
+def retrieve_sections(vectorstore, query, k=4, sources=None):
+    """Top-k chunks; sources (filenames) restricts the search to those documents"""
+    if sources is None:
+        return vectorstore.similarity_search(query, k=k)
+    if not sources:
+        return []
+    return vectorstore.similarity_search(query, k=k, filter={"source": {"$in": list(sources)}})
+
+
+def format_context(docs, max_chars=6000):
+    """Render retrieved chunks as a citation-tagged block, capped at max_chars"""
+    parts, used = [], 0
+    for doc in docs:
+        where = f"{doc.metadata['section']}, " if doc.metadata.get("section") else ""
+        header = f"[{doc.metadata.get('act', 'Unknown Act')}, {where}p. {doc.metadata.get('page', '?')}]"
+        block = f"{header}\n{doc.page_content.strip()}"
+        if used + len(block) > max_chars:
+            break
+        parts.append(block)
+        used += len(block)
+    return "\n\n".join(parts)
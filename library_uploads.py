@@ -0,0 +1,224 @@
+# ==============================================================================
+# ALPHA APEX - LAW LIBRARY UPLOADS (STREAMED SAVE + BACKGROUND INGESTION)
+# ==============================================================================
+# save_upload() copies the uploaded file to DATA/ in fixed-size blocks, hashing
+# as it goes, through a ".part" file that is renamed into place only once the
+# law_assets row (status 'Processing', with its size/mtime/hash fingerprint)
+# exists. law_ingest.sync_law_library therefore sees the file as unchanged and
+# never extracts it inline on the Streamlit thread.
+#
+# LibraryIngestor is a daemon worker draining library_uploads. Each job is
+# extracted a few pages at a time; every batch is written to law_asset_pages
+# and handed to the indexers (vector store, BM25) before the next one, so the
+# document becomes searchable page by page and nothing already indexed is
+# touched. pages_done/pages_total drive the progress bar. Jobs survive a
+# restart: 'processing' rows older than stale_after resume from pages_done.
+#
+# An indexer raising (e.g. the embedder hitting its quota) does not fail the
+# upload: the pages are stored and the other indexers still run, but the job
+# ends 'done' with the error recorded, and retry() queues it again from page 0.
+# ==============================================================================
+
+import datetime
+import hashlib
+import os
+import re
+import threading
+import time
+
+import pdf_extract
+
+COPY_BLOCK = 1 << 20
+_UNSAFE_RE = re.compile(r"[^\w\s.,()&'-]+", re.UNICODE)
+
+
+def safe_filename(name):
+    """Basename with path/shell-hostile characters removed, always ending in .pdf"""
+    base = os.path.basename((name or "").replace("\\", "/"))
+    stem = _UNSAFE_RE.sub("", os.path.splitext(base)[0]).strip(" .") or "upload"
+    return f"{stem[:120]}.pdf"
+
+
+def _unique_name(cur, data_dir, filename):
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 2
+    while os.path.exists(os.path.join(data_dir, candidate)) or \
+            cur.execute("SELECT 1 FROM law_assets WHERE filename=?", (candidate,)).fetchone():
+        candidate, n = f"{stem} ({n}){ext}", n + 1
+    return candidate
+
+
+def save_upload(pool, data_dir, fileobj, original_name, uploaded_by=None, block_size=COPY_BLOCK):
+    """Stream fileobj into data_dir and queue it for ingestion.
+
+    Returns (job_id, filename), or (None, existing_filename) when the same bytes
+    are already in the library.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    tmp = os.path.join(data_dir, f".upload-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}.part")
+    digest, size = hashlib.sha256(), 0
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    try:
+        with open(tmp, "wb") as out:
+            for block in iter(lambda: fileobj.read(block_size), b""):
+                digest.update(block)
+                out.write(block)
+                size += len(block)
+        digest = digest.hexdigest()
+        st_info = os.stat(tmp)
+
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            if not conn.in_transaction:
+                cur.execute("BEGIN IMMEDIATE")
+            dup = cur.execute("SELECT filename FROM law_assets WHERE content_hash=?", (digest,)).fetchone()
+            if dup:
+                return None, dup[0]
+            filename = _unique_name(cur, data_dir, safe_filename(original_name))
+            cur.execute("""INSERT INTO law_assets (filename, filesize_kb, page_count, sync_timestamp, asset_status,
+                                                   file_size, file_mtime, content_hash)
+                           VALUES (?, ?, NULL, ?, 'Processing', ?, ?, ?)""",
+                        (filename, round(size / 1024, 2), datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                         st_info.st_size, st_info.st_mtime, digest))
+            job_id = cur.execute("""INSERT INTO library_uploads (filename, uploaded_by, status, pages_done, created_at)
+                                    VALUES (?, ?, 'queued', 0, ?)""", (filename, uploaded_by, time.time())).lastrowid
+            # rename (keeps the mtime) inside the transaction: a sync never sees the file without its row
+            os.replace(tmp, os.path.join(data_dir, filename))
+        return job_id, filename
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class LibraryIngestor:
+    """Background extract -> store pages -> index, a batch of pages at a time"""
+
+    def __init__(self, pool, data_dir, indexers=(), on_complete=None, pages_per_batch=4,
+                 poll_interval=5.0, stale_after=600.0):
+        self.pool = pool
+        self.data_dir = data_dir
+        self.indexers = list(indexers)  # callables (filename, [(page_no, text), ...])
+        self.on_complete = on_complete  # callable (filename), e.g. re-parse statute sections
+        self.pages_per_batch = pages_per_batch
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # -- producer side ---------------------------------------------------------
+
+    def submit(self, fileobj, original_name, uploaded_by=None):
+        job_id, filename = save_upload(self.pool, self.data_dir, fileobj, original_name, uploaded_by)
+        if job_id is not None:
+            self.start()
+            self._wake.set()
+        return job_id, filename
+
+    def jobs(self, limit=20):
+        with self.pool.connection() as conn:
+            rows = conn.execute("""SELECT id, filename, uploaded_by, status, pages_total, pages_done, error
+                                   FROM library_uploads ORDER BY id DESC LIMIT ?""", (limit,)).fetchall()
+        keys = ("id", "filename", "uploaded_by", "status", "pages_total", "pages_done", "error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def active(self):
+        return [job for job in self.jobs() if job["status"] in ("queued", "processing")]
+
+    def retry(self, job_id):
+        """Queue a failed or partly indexed job again from its first page; False if it is not retryable"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT filename FROM library_uploads WHERE id=? AND error IS NOT NULL "
+                               "AND status IN ('done', 'failed')", (job_id,)).fetchone()
+            if not row:
+                return False
+            conn.execute("UPDATE law_assets SET asset_status='Processing' WHERE filename=? AND asset_status='Error'",
+                         row)
+            conn.execute("""UPDATE library_uploads SET status='queued', pages_done=0, error=NULL, finished_at=NULL
+                            WHERE id=?""", (job_id,))
+        self.start()
+        self._wake.set()
+        return True
+
+    # -- worker lifecycle ------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="library-ingest", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+                if job:
+                    self._process(*job)
+                    continue
+            except Exception:
+                pass  # DB busy: the job row is still there next round
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim(self):
+        now = time.time()
+        with self.pool.connection() as conn:
+            rows = conn.execute("""SELECT id, filename, pages_done FROM library_uploads
+                                   WHERE status='queued' OR (status='processing' AND claimed_at<?)
+                                   ORDER BY id LIMIT 5""", (now - self.stale_after,)).fetchall()
+            for job_id, filename, pages_done in rows:
+                if conn.execute("""UPDATE library_uploads SET status='processing', claimed_at=?
+                                   WHERE id=? AND (status='queued' OR (status='processing' AND claimed_at<?))""",
+                                (now, job_id, now - self.stale_after)).rowcount:
+                    return job_id, filename, pages_done or 0
+        return None
+
+    # -- one upload ------------------------------------------------------------
+
+    def _process(self, job_id, filename, start):
+        path = os.path.join(self.data_dir, filename)
+        try:
+            total = pdf_extract.page_count(path)
+            with self.pool.connection() as conn:
+                conn.execute("UPDATE library_uploads SET pages_total=? WHERE id=?", (total, job_id))
+                asset_id = conn.execute("SELECT id FROM law_assets WHERE filename=?", (filename,)).fetchone()[0]
+
+            index_error = None
+            for lo in range(start, total, self.pages_per_batch):
+                if self._stop.is_set():
+                    return  # resumed from pages_done once stale
+                hi = min(total, lo + self.pages_per_batch)
+                pages = pdf_extract.extract_page_range(path, lo, hi)
+                with self.pool.connection() as conn:
+                    conn.executemany("INSERT OR REPLACE INTO law_asset_pages (asset_id, page_no, page_text) VALUES (?, ?, ?)",
+                                     [(asset_id, page_no, text) for page_no, text in pages])
+                for index in self.indexers:
+                    try:
+                        index(filename, pages)
+                    except Exception as e:
+                        index_error = index_error or f"{getattr(index, '__name__', 'indexer')}: {type(e).__name__}: {e}"
+                with self.pool.connection() as conn:
+                    # kept on the row so an error survives the job being resumed after a restart
+                    conn.execute("UPDATE library_uploads SET pages_done=?, claimed_at=?, error=COALESCE(error, ?) "
+                                 "WHERE id=?", (hi, time.time(), index_error and index_error[:500], job_id))
+
+            with self.pool.connection() as conn:
+                conn.execute("""UPDATE law_assets SET page_count=?, asset_status='Verified', sync_timestamp=?
+                                WHERE id=?""", (total, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), asset_id))
+                conn.execute("UPDATE library_uploads SET status='done', finished_at=? WHERE id=?", (time.time(), job_id))
+            if self.on_complete:
+                self.on_complete(filename)
+        except Exception as e:
+            with self.pool.connection() as conn:
+                conn.execute("UPDATE law_assets SET asset_status='Error' WHERE filename=?", (filename,))
+                conn.execute("UPDATE library_uploads SET status='failed', error=?, finished_at=? WHERE id=?",
+                             (f"{type(e).__name__}: {e}"[:500], time.time(), job_id))
@@ -0,0 +1,405 @@
+# ==============================================================================
+# ALPHA APEX - ASYNC LLM GATEWAY
+# ==============================================================================
+# Sits between the Streamlit sessions and the chat model client:
+#   - bounded concurrency (asyncio.Semaphore) so a burst of sessions cannot
+#     trip the provider's rate limit all at once
+#   - single-flight coalescing: identical prompts already in flight share one
+#     upstream call (e.g. several counsel hitting the same Quick Action); for
+#     streams, a caller that joins late is replayed the chunks so far and then
+#     follows the live stream
+#   - per-call deadline covering queueing, retries and the call itself
+#   - jittered exponential backoff on 429/503/timeouts
+#   - circuit breaker that fails fast after repeated upstream failures
+# The gateway owns one event loop on a daemon thread; sync callers (Streamlit
+# script threads) go through invoke()/stream(), which hop onto that loop.
+# FakeLLM is a local stand-in for offline benchmarking (benchmarks/bench_llm_gateway.py).
+# ==============================================================================
+
+import asyncio
+import hashlib
+import queue
+import random
+import threading
+import time
+
+RETRYABLE_MARKERS = ("429", "503", "resourceexhausted", "resource exhausted", "rate limit", "quota",
+                     "unavailable", "deadline", "timeout", "temporarily")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class GatewayTimeout(TimeoutError):
+    pass
+
+
+class RetryableLLMError(RuntimeError):
+    """Raised by FakeLLM to mimic a provider 429/503."""
+
+
+def is_retryable(exc):
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError, RetryableLLMError)):
+        return True
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(marker in text for marker in RETRYABLE_MARKERS)
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures; half-open after `reset_after` seconds."""
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class _StreamFanout:
+    """One upstream stream shared by every caller that asked for the same prompt"""
+
+    def __init__(self):
+        self.chunks = []
+        self.error = None
+        self.done = False
+        self.readers = 0
+        self.task = None
+        self.changed = asyncio.Condition()
+
+    async def publish(self, chunk):
+        async with self.changed:
+            self.chunks.append(chunk)
+            self.changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self.changed:
+            self.error, self.done = error, True
+            self.changed.notify_all()
+
+
+class LLMGateway:
+    def __init__(self, client, max_concurrency=8, timeout=60.0, max_retries=4,
+                 base_delay=0.5, max_delay=8.0, breaker_threshold=5, breaker_reset=30.0):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.stats = {"calls": 0, "upstream": 0, "coalesced": 0, "retries": 0,
+                      "timeouts": 0, "failures": 0, "rejected": 0}
+        self._inflight = {}
+        self._streams = {}
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._semaphore = None
+
+    # -- event loop ------------------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                ready = threading.Event()
+
+                def run():
+                    self._loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(self._loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    self._loop.run_forever()
+
+                self._loop_thread = threading.Thread(target=run, name="llm-gateway", daemon=True)
+                self._loop_thread.start()
+                ready.wait()
+        return self._loop
+
+    def _bind_to_running_loop(self):
+        # Allows direct `await gateway.ainvoke(...)` from an existing loop (benchmarks)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def close(self):
+        if self._loop is not None:
+            async def shutdown():
+                pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+                for t in pending:
+                    t.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                asyncio.get_running_loop().stop()
+
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop)
+            self._loop_thread.join(timeout=5)
+            self._loop = None
+            self._semaphore = None
+
+    # -- async core ------------------------------------------------------------
+
+    @staticmethod
+    def _key(prompt):
+        return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+
+    def _backoff(self, attempt):
+        # "full jitter": uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def ainvoke(self, prompt, timeout=None):
+        """Coalesced, rate-limited, retried call; returns the model's message object"""
+        self._bind_to_running_loop()
+        self.stats["calls"] += 1
+        key = self._key(prompt)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._call_with_retries(prompt, timeout or self.timeout))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _call_with_retries(self, prompt, timeout):
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats["rejected"] += 1
+                raise CircuitOpenError("LLM circuit open; upstream failing, try again shortly")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stats["timeouts"] += 1
+                raise GatewayTimeout(f"LLM call exceeded {timeout:.0f}s deadline")
+            try:
+                async with self._semaphore:
+                    self.stats["upstream"] += 1
+                    result = await asyncio.wait_for(self.client.ainvoke(prompt), remaining)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                self.breaker.record_failure()
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self.stats["failures"] += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.stats["timeouts"] += 1
+                        raise GatewayTimeout(f"LLM call exceeded {timeout:.0f}s deadline") from e
+                    raise
+                delay = min(self._backoff(attempt), max(0.0, deadline - time.monotonic()))
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+    async def astream(self, prompt, timeout=None):
+        """Coalesced stream of chunks; identical prompts in flight read one upstream stream"""
+        self._bind_to_running_loop()
+        self.stats["calls"] += 1
+        key = self._key(prompt)
+        fanout = self._streams.get(key)
+        if fanout is None:
+            fanout = self._streams[key] = _StreamFanout()
+            fanout.task = asyncio.ensure_future(self._pump_stream(key, fanout, prompt, timeout or self.timeout))
+        else:
+            self.stats["coalesced"] += 1
+        fanout.readers += 1
+        try:
+            seen = 0
+            while True:
+                async with fanout.changed:
+                    await fanout.changed.wait_for(lambda: seen < len(fanout.chunks) or fanout.done)
+                    chunks, done, error = fanout.chunks[seen:], fanout.done, fanout.error
+                for chunk in chunks:
+                    yield chunk
+                seen += len(chunks)
+                if done and seen == len(fanout.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            fanout.readers -= 1
+            if fanout.readers == 0 and not fanout.done:
+                # last reader gone (e.g. the session navigated away): stop the upstream call
+                if self._streams.get(key) is fanout:
+                    del self._streams[key]
+                fanout.task.cancel()
+
+    async def _pump_stream(self, key, fanout, prompt, timeout):
+        error = None
+        try:
+            async for chunk in self._stream_with_retries(prompt, timeout):
+                await fanout.publish(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            if self._streams.get(key) is fanout:
+                del self._streams[key]  # later callers start a fresh call
+            await fanout.finish(error)
+        if isinstance(error, asyncio.CancelledError):
+            raise error
+
+    async def _stream_with_retries(self, prompt, timeout):
+        """Stream chunks from the client. Retries only before the first chunk."""
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats["rejected"] += 1
+                raise CircuitOpenError("LLM circuit open; upstream failing, try again shortly")
+            started = False
+            try:
+                async with self._semaphore:
+                    self.stats["upstream"] += 1
+                    agen = self.client.astream(prompt).__aiter__()
+                    while True:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            chunk = await asyncio.wait_for(agen.__anext__(), remaining)
+                        except StopAsyncIteration:
+                            break
+                        started = True
+                        yield chunk
+                self.breaker.record_success()
+                return
+            except Exception as e:
+                self.breaker.record_failure()
+                if started or not is_retryable(e) or attempt >= self.max_retries or time.monotonic() >= deadline:
+                    self.stats["failures"] += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.stats["timeouts"] += 1
+                        raise GatewayTimeout(f"LLM stream exceeded {timeout:.0f}s deadline") from e
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(self._backoff(attempt - 1), max(0.0, deadline - time.monotonic())))
+
+    # -- sync bridge for Streamlit ---------------------------------------------
+
+    def invoke(self, prompt, timeout=None):
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.ainvoke(prompt, timeout), loop).result()
+
+    def stream(self, prompt, timeout=None):
+        """Sync generator over astream(); chunks are handed across threads via a queue"""
+        loop = self._ensure_loop()
+        q = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for chunk in self.astream(prompt, timeout):
+                    q.put(chunk)
+            except BaseException as e:
+                q.put(e)
+            finally:
+                q.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = q.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+
+# ------------------------------------------------------------------------------
+# OFFLINE STAND-IN
+# ------------------------------------------------------------------------------
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Latency/failure-injecting stand-in for ChatGoogleGenerativeAI.
+
+    Latency is lognormal around `median_latency` seconds; `error_rate` of calls
+    raise a retryable 429-style error. Deterministic for a given seed.
+    """
+
+    def __init__(self, median_latency=0.8, sigma=0.5, error_rate=0.0, tokens=60, seed=0):
+        self.median_latency = median_latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.tokens = tokens
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _latency(self):
+        return self.median_latency * self._rng.lognormvariate(0, self.sigma)
+
+    def _answer(self, prompt):
+        digest = hashlib.md5(str(prompt).encode("utf-8")).hexdigest()[:8]
+        return f"**ISSUE:** simulated ({digest})\n\n**RULE:** ...\n\n**APPLICATION:** ...\n\n**CONCLUSION:** ..."
+
+    def _maybe_fail(self):
+        if self._rng.random() < self.error_rate:
+            raise RetryableLLMError("429 Resource exhausted (simulated)")
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return FakeMessage(self._answer(prompt))
+
+    async def astream(self, prompt):
+        self.calls += 1
+        total = self._latency()
+        await asyncio.sleep(total * 0.3)  # time to first token
+        self._maybe_fail()
+        words = self._answer(prompt).split(" ")
+        for word in words:
+            await asyncio.sleep(total * 0.7 / len(words))
+            yield FakeMessage(word + " ")
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self._latency())
+        self._maybe_fail()
+        return FakeMessage(self._answer(prompt))
+
+    def stream(self, prompt):
+        self.calls += 1
+        total = self._latency()
+        time.sleep(total * 0.3)
+        self._maybe_fail()
+        words = self._answer(prompt).split(" ")
+        for word in words:
+            time.sleep(total * 0.7 / len(words))
+            yield FakeMessage(word + " ")
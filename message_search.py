@@ -0,0 +1,102 @@
+# ==============================================================================
+# ALPHA APEX - CONSULTATION HISTORY SEARCH
+# ==============================================================================
+# BM25-ranked full-text search over message_logs via the message_search FTS5
+# table (migration 8, kept in sync by triggers). A search is scoped to the
+# user's chambers inside the MATCH expression itself (chamber:(c1 OR c7 ...)),
+# so other users' messages are never ranked. Only the top-k rowids by bm25 are
+# joined back to message_logs, and highlighted snippets are cut from those k
+# bodies in Python.
+# Databases whose SQLite lacks FTS5 fall back to a scoped LIKE scan.
+# ==============================================================================
+
+import re
+import unicodedata
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+HIGHLIGHT = ("**", "**")
+SNIPPET_TOKENS = 16
+
+
+def has_fts(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name='message_search'").fetchone() is not None
+
+
+def build_match_query(text, chamber_ids, prefix=True):
+    """Safe FTS5 expression: every word must appear in message_body; the last word may be a prefix"""
+    terms = _TERM_RE.findall(text or "")
+    if not terms or not chamber_ids:
+        return None
+    phrases = [f'"{t}"' for t in terms]
+    if prefix:
+        phrases[-1] += "*"
+    scope = " OR ".join(f"c{int(cid)}" for cid in chamber_ids)
+    return f"chamber : ({scope}) AND message_body : ({' '.join(phrases)})"
+
+
+def _owned_chambers(conn, email):
+    return dict(conn.execute("SELECT id, chamber_name FROM chambers WHERE owner_email=?", (email,)).fetchall())
+
+
+def search_messages(conn, email, text, limit=20):
+    """Best matches across the user's chambers:
+    [{"id", "chamber", "role", "ts", "snippet", "score"}, ...], best first
+    """
+    chambers = _owned_chambers(conn, email)
+    terms = _TERM_RE.findall(text or "")
+    if not chambers or not terms:
+        return []
+    if not has_fts(conn):
+        return _search_like(conn, chambers, terms, limit)
+
+    rows = conn.execute("""SELECT m.id, s.score, m.chamber_id, m.sender_role, m.ts_created, m.message_body
+                           FROM (SELECT rowid, bm25(message_search, 1.0, 0.0) AS score FROM message_search
+                                 WHERE message_search MATCH ? ORDER BY score LIMIT ?) s
+                           JOIN message_logs m ON m.id = s.rowid
+                           ORDER BY s.score""",
+                        (build_match_query(text, list(chambers)), limit)).fetchall()
+    # snippets are cut in Python from the k bodies already fetched; FTS5's snippet()
+    # would re-run the MATCH over every candidate row
+    return [{"id": rid, "chamber": chambers.get(cid), "role": role, "ts": ts,
+             "snippet": make_snippet(body, terms), "score": -score}
+            for rid, score, cid, role, ts, body in rows]
+
+
+def _search_like(conn, chambers, terms, limit):
+    marks = ",".join("?" * len(chambers))
+    where = " AND ".join("message_body LIKE ?" for _ in terms)
+    rows = conn.execute(f"""SELECT id, chamber_id, sender_role, ts_created, message_body FROM message_logs
+                            WHERE chamber_id IN ({marks}) AND {where} ORDER BY id DESC LIMIT ?""",
+                        (*chambers, *[f"%{t}%" for t in terms], limit)).fetchall()
+    return [{"id": rid, "chamber": chambers.get(cid), "role": role, "ts": ts,
+             "snippet": make_snippet(body, terms), "score": 0.0}
+            for rid, cid, role, ts, body in rows]
+
+
+def _fold(word):
+    return "".join(ch for ch in unicodedata.normalize("NFKD", word.casefold()) if not unicodedata.combining(ch))
+
+
+def make_snippet(body, terms, tokens=SNIPPET_TOKENS):
+    """~tokens words around the first hit, query words highlighted (last term as a prefix)"""
+    body = body or ""
+    wanted = [_fold(t) for t in terms]
+    last = wanted[-1]
+    exact = set(wanted[:-1])
+    words = list(_TERM_RE.finditer(body))
+    hits = [i for i, w in enumerate(words)
+            if (f := _fold(w.group())) in exact or f.startswith(last)]
+    if not hits:
+        return body[:tokens * 8] + (" …" if len(body) > tokens * 8 else "")
+    first = max(0, hits[0] - tokens // 4)
+    lastw = min(len(words), first + tokens)
+    start = words[first].start()
+    end = words[lastw - 1].end()
+    out, pos = [], start
+    for i in hits:
+        if first <= i < lastw:
+            w = words[i]
+            out.append(body[pos:w.start()] + HIGHLIGHT[0] + w.group() + HIGHLIGHT[1])
+            pos = w.end()
+    out.append(body[pos:end])
+    return ("… " if start > 0 else "") + "".join(out) + (" …" if end < len(body) else "")
@@ -0,0 +1,261 @@
+# ==============================================================================
+# ALPHA APEX - MEMORY-MAPPED NUMPY VECTOR STORE
+# ==============================================================================
+# Alternative to Chroma for a corpus of this size (a few thousand chunks):
+#   <dir>/<collection>.npy     - one contiguous (N, dim) float16/float32 matrix
+#                                of L2-normalised chunk embeddings
+#   <dir>/<collection>.sqlite  - chunks(row, id, source, content, metadata):
+#                                row i describes matrix row i
+# The matrix is opened with mmap_mode="r", so every Streamlit worker process
+# shares the same page-cache copy instead of holding its own. Search is a
+# blocked dot product (cosine) followed by argpartition top-k.
+#
+# Appends write a new .npy next to the old one and os.replace() it, so readers
+# never see a half-written matrix; other processes pick up the new file on
+# their next search (mtime/size check). delete() drops the metadata rows and
+# zeroes those matrix rows in a rewritten copy rather than renumbering, so a
+# reader holding the old map never pairs a vector with another chunk's text.
+# Only the methods legal_retrieval and HybridRetriever use are implemented:
+# add_documents, delete(ids), get(where=source), similarity_search(_by_vector),
+# similarity_search_with_score. A source filter
+# ({"source": {"$in": [...]}}) is applied before scoring: only the matching
+# rows are gathered from the map.
+# ==============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+BLOCK_ROWS = 16384  # float16 rows are upcast per block, never the whole matrix at once; float32 is used in place
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores, best first (argpartition, then sort only those k)"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[-1] else np.arange(scores.shape[-1])
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class _Committing:
+    """with-block that commits (or rolls back) and closes a sqlite3 connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+
+
+class NumpyVectorStore:
+    def __init__(self, persist_dir, collection_name, embedding_function, dtype="float32"):
+        self.persist_dir = persist_dir
+        self.embeddings = embedding_function
+        self.dtype = np.dtype(dtype)
+        self.matrix_path = os.path.join(persist_dir, f"{collection_name}.npy")
+        self.meta_path = os.path.join(persist_dir, f"{collection_name}.sqlite")
+        os.makedirs(persist_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._matrix = None
+        self._stamp = None
+        with self._meta() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE,
+                source TEXT,
+                content TEXT,
+                metadata TEXT
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source)")
+
+    def _meta(self):
+        """Short-lived connection for writes"""
+        return _Committing(sqlite3.connect(self.meta_path, timeout=30))
+
+    def _reader(self):
+        """Per-thread connection kept open for the lookups on every search"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.meta_path, timeout=30)
+        return conn
+
+    # -- matrix ----------------------------------------------------------------
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.matrix_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def matrix(self):
+        """The current read-only memory map (None when empty); remapped if another process appended"""
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._matrix = np.load(self.matrix_path, mmap_mode="r") if stamp else None
+                    self._stamp = stamp
+        return self._matrix
+
+    def __len__(self):
+        matrix = self.matrix()
+        return 0 if matrix is None else matrix.shape[0]
+
+    def _normalise(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    # -- writes ----------------------------------------------------------------
+
+    def add_embeddings(self, texts, vectors, metadatas, ids):
+        """Append pre-computed vectors (ids already present are skipped); returns rows added"""
+        with self._lock, self._meta() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # serialises appends from other processes too
+            known = {row[0] for row in conn.execute(
+                f"SELECT id FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids)} if ids else set()
+            keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in known]
+            if not keep:
+                return 0
+            new = self._normalise([vectors[i] for i in keep]).astype(self.dtype)
+            old = np.load(self.matrix_path, mmap_mode="r") if os.path.exists(self.matrix_path) else None
+            if old is not None and old.shape[1] != new.shape[1]:
+                raise ValueError(f"embedding width {new.shape[1]} does not match the store ({old.shape[1]})")
+            start = 0 if old is None else old.shape[0]
+
+            tmp = f"{self.matrix_path}.{os.getpid()}.tmp.npy"
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype, shape=(start + len(new), new.shape[1]))
+            for lo in range(0, start, BLOCK_ROWS):
+                out[lo:min(start, lo + BLOCK_ROWS)] = old[lo:min(start, lo + BLOCK_ROWS)]
+            out[start:] = new
+            out.flush()
+            del out, old
+            conn.executemany("INSERT INTO chunks (row, id, source, content, metadata) VALUES (?, ?, ?, ?, ?)",
+                             [(start + n, ids[i], (metadatas[i] or {}).get("source"), texts[i],
+                               json.dumps(metadatas[i] or {})) for n, i in enumerate(keep)])
+            # rows commit right after the swap; until then readers skip matrix rows without metadata
+            os.replace(tmp, self.matrix_path)
+        return len(keep)
+
+    def delete(self, ids=None):
+        """Remove chunks by id; returns rows removed"""
+        if not ids:
+            return 0
+        with self._lock, self._meta() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [row[0] for row in conn.execute(
+                f"SELECT row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", list(ids))]
+            if not rows:
+                return 0
+            old = np.load(self.matrix_path, mmap_mode="r")
+            tmp = f"{self.matrix_path}.{os.getpid()}.tmp.npy"
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=old.dtype, shape=old.shape)
+            for lo in range(0, old.shape[0], BLOCK_ROWS):
+                out[lo:lo + BLOCK_ROWS] = old[lo:lo + BLOCK_ROWS]
+            out[np.asarray(rows, dtype=np.int64)] = 0  # scores 0 and has no metadata: never returned
+            out.flush()
+            del out, old
+            conn.execute(f"DELETE FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows)
+            os.replace(tmp, self.matrix_path)
+        return len(rows)
+
+    def add_documents(self, documents, ids=None):
+        ids = ids or [f"{d.metadata.get('source')}:{i}" for i, d in enumerate(documents)]
+        texts = [d.page_content for d in documents]
+        self.add_embeddings(texts, self.embeddings.embed_documents(texts), [d.metadata for d in documents], ids)
+        return ids
+
+    # -- reads -----------------------------------------------------------------
+
+    def get(self, where=None, limit=None):
+        """Chroma-style get(where={"source": ...}) -> {"ids": [...]}"""
+        sql, params = "SELECT id FROM chunks", []
+        if where and "source" in where:
+            sql, params = sql + " WHERE source=?", [where["source"]]
+        if limit:
+            sql, params = sql + " LIMIT ?", params + [limit]
+        return {"ids": [row[0] for row in self._reader().execute(sql, params)]}
+
+    def rows_for_sources(self, sources):
+        """Sorted matrix rows belonging to the given source files (cached per file version)"""
+        stamp = self._file_stamp()
+        cache = getattr(self._local, "rows", None)
+        if cache is None or cache[0] != stamp:
+            cache = self._local.rows = (stamp, {})
+        missing = [s for s in sources if s not in cache[1]]
+        if missing:
+            found = {s: [] for s in missing}
+            for row, source in self._reader().execute(
+                    f"SELECT row, source FROM chunks WHERE source IN ({','.join('?' * len(missing))})", missing):
+                found[source].append(row)
+            cache[1].update({s: np.asarray(rows, dtype=np.int64) for s, rows in found.items()})
+        parts = [cache[1][s] for s in sources]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def search_vectors(self, queries, k=4, rows=None):
+        """Batched top-k: (m, dim) query vectors -> [[(row, score), ...], ...] best first
+
+        rows (matrix row indices) restricts the scan to that subset; only those
+        rows are read from the map.
+        """
+        matrix = self.matrix()
+        queries = self._normalise(np.atleast_2d(queries))
+        if matrix is None:
+            return [[] for _ in queries]
+        if rows is not None:
+            rows = rows[rows < matrix.shape[0]]
+            scores = queries @ np.asarray(matrix[rows], dtype=np.float32).T
+            return [[(int(rows[i]), float(row[i])) for i in top_k(row, k)] for row in scores]
+        scores = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+        for lo in range(0, matrix.shape[0], BLOCK_ROWS):
+            block = np.asarray(matrix[lo:lo + BLOCK_ROWS], dtype=np.float32)
+            scores[:, lo:lo + block.shape[0]] = queries @ block.T
+        return [[(int(i), float(row[i])) for i in top_k(row, k)] for row in scores]
+
+    def _filter_rows(self, filter):
+        """Chroma-style {"source": name} / {"source": {"$in": [...]}} -> row subset (None = everything)"""
+        if not filter:
+            return None
+        wanted = filter.get("source")
+        if isinstance(wanted, dict):
+            wanted = wanted.get("$in", [])
+        elif wanted is not None:
+            wanted = [wanted]
+        if wanted is None:
+            raise ValueError(f"unsupported filter: {filter}")
+        return self.rows_for_sources(list(wanted))
+
+    def _documents(self, hits):
+        if not hits:
+            return []
+        rows = [row for row, _score in hits]
+        found = {row: (content, metadata) for row, content, metadata in self._reader().execute(
+            f"SELECT row, content, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows)}
+        return [(Document(page_content=found[row][0], metadata=json.loads(found[row][1])), score)
+                for row, score in hits if row in found]
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return self._documents(self.search_vectors(self.embeddings.embed_query(query), k, self._filter_rows(filter))[0])
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        return [doc for doc, _score in self._documents(self.search_vectors(embedding, k, self._filter_rows(filter))[0])]
+
+    def similarity_search(self, query, k=4, filter=None):
+        return [doc for doc, _score in self.similarity_search_with_score(query, k, filter)]
@@ -0,0 +1,187 @@
+# ==============================================================================
+# ALPHA APEX - PDF TEXT EXTRACTION
+# ==============================================================================
+# PyMuPDF (fitz) is the fast path; PyPDF2 is the fallback for files fitz
+# cannot open or is not installed for. Pages with no text layer (the gazette
+# scans in DATA/) are OCR'd through PyMuPDF when Tesseract is installed, and
+# come back empty otherwise.
+#
+# Bulk extraction splits every PDF into page ranges and spreads the ranges
+# over a process pool, so the Constitution and the Cantonments Act no longer
+# serialise a cold index build on one core. Results stream back as per-page
+# records as soon as each range finishes.
+#
+#     python pdf_extract.py DATA --workers 8
+# ==============================================================================
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+PAGES_PER_TASK = 16
+INLINE_PAGE_THRESHOLD = 32  # below this a pool costs more to start than it saves
+OCR_DPI = 300
+
+
+def _open_pymupdf(path):
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf  # PyMuPDF < 1.24 only ships the legacy name
+    return pymupdf.open(path)
+
+
+def ocr_available():
+    return shutil.which("tesseract") is not None
+
+
+def _page_text(page):
+    """PyMuPDF page text; an image-only page is OCR'd if Tesseract is on PATH"""
+    text = page.get_text("text") or ""
+    if text.strip() or not page.get_images() or not ocr_available():
+        return text
+    try:
+        return page.get_text("text", textpage=page.get_textpage_ocr(dpi=OCR_DPI, full=True)) or ""
+    except Exception:
+        return text  # missing language data etc.: same as no OCR
+
+
+def extract_pdf_pages(path):
+    """[(page_no, text), ...] using PyMuPDF, falling back to PyPDF2"""
+    try:
+        with _open_pymupdf(path) as doc:
+            return [(i + 1, _page_text(page)) for i, page in enumerate(doc)]
+    except Exception:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path)
+        return [(i + 1, page.extract_text() or "") for i, page in enumerate(reader.pages)]
+
+
+def page_count(path):
+    try:
+        with _open_pymupdf(path) as doc:
+            return doc.page_count
+    except Exception:
+        from PyPDF2 import PdfReader
+        return len(PdfReader(path).pages)
+
+
+def _extract_range(path, start, stop):
+    """Worker: pages [start, stop) of one PDF -> (path, engine, [(page_no, text), ...])"""
+    try:
+        with _open_pymupdf(path) as doc:
+            return path, "pymupdf", [(i + 1, _page_text(doc.load_page(i))) for i in range(start, stop)]
+    except Exception:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path)
+        return path, "pypdf2", [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+def extract_page_range(path, start, stop):
+    """[(page_no, text), ...] for pages [start, stop) of one PDF (0-based bounds, 1-based page_no)"""
+    return _extract_range(path, start, stop)[2]
+
+
+def _plan_tasks(paths, pages_per_task):
+    tasks, failed = [], {}
+    for path in paths:
+        try:
+            n = page_count(path)
+        except Exception as e:
+            failed[path] = e
+            continue
+        tasks.extend((path, s, min(s + pages_per_task, n)) for s in range(0, n, pages_per_task))
+    return tasks, failed
+
+
+def iter_page_records(paths, workers=None, pages_per_task=PAGES_PER_TASK):
+    """Yield {"path", "page", "text", "engine"} records as page ranges complete.
+
+    Order is completion order, not page order. Files that cannot be opened at
+    all yield a single record with "error" set instead of "text".
+    """
+    tasks, failed = _plan_tasks(paths, pages_per_task)
+    for path, err in failed.items():
+        yield {"path": path, "page": None, "text": None, "engine": None, "error": err}
+
+    total_pages = sum(stop - start for _, start, stop in tasks)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or total_pages < INLINE_PAGE_THRESHOLD:
+        for task in tasks:
+            yield from _records(*_run_task(task))
+        return
+
+    # spawn, not fork: the Streamlit server is multi-threaded
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(_extract_range, *task): task for task in tasks}
+        for fut in as_completed(futures):
+            try:
+                result = fut.result()
+            except Exception as e:
+                result = (futures[fut][0], None, e)
+            yield from _records(*result)
+
+
+def _run_task(task):
+    try:
+        return _extract_range(*task)
+    except Exception as e:
+        return task[0], None, e
+
+
+def _records(path, engine, pages):
+    if isinstance(pages, Exception):
+        yield {"path": path, "page": None, "text": None, "engine": engine, "error": pages}
+        return
+    for page_no, text in pages:
+        yield {"path": path, "page": page_no, "text": text, "engine": engine}
+
+
+def extract_many(paths, workers=None):
+    """{path: [(page_no, text), ...] | Exception} - drop-in for law_ingest.sync_law_library"""
+    results = {path: [] for path in paths}
+    for rec in iter_page_records(paths, workers=workers):
+        if rec.get("error") is not None:
+            results[rec["path"]] = rec["error"]
+        elif not isinstance(results[rec["path"]], Exception):
+            results[rec["path"]].append((rec["page"], rec["text"]))
+    for path, pages in results.items():
+        if not isinstance(pages, Exception):
+            pages.sort()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk PDF text extraction with a throughput report")
+    parser.add_argument("data_dir", nargs="?", default="DATA")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+    args = parser.parse_args(argv)
+
+    paths = sorted(os.path.join(args.data_dir, f) for f in os.listdir(args.data_dir) if f.lower().endswith(".pdf"))
+    per_file, engines, errors = {}, {}, 0
+    t0 = time.perf_counter()
+    for rec in iter_page_records(paths, workers=args.workers, pages_per_task=args.pages_per_task):
+        if rec.get("error") is not None:
+            errors += 1
+            print(f"  ! {os.path.basename(rec['path'])}: {rec['error']}", file=sys.stderr)
+            continue
+        per_file[rec["path"]] = per_file.get(rec["path"], 0) + 1
+        engines[rec["engine"]] = engines.get(rec["engine"], 0) + 1
+    elapsed = time.perf_counter() - t0
+
+    pages = sum(per_file.values())
+    for path in paths:
+        print(f"{per_file.get(path, 0):>6} pages  {os.path.basename(path)}")
+    print("-" * 60)
+    print(f"{pages} pages from {len(paths)} files in {elapsed:.2f}s "
+          f"({pages / elapsed if elapsed else 0:.1f} pages/sec, workers={args.workers}, engines={engines}, errors={errors})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# ==============================================================================
+# ALPHA APEX - TWO-TIER LEGAL ANSWER CACHE
+# ==============================================================================
+# Tier 1: exact match on the normalised query + ai_mode + persona + language.
+#         An in-process LRU sits in front of the SQLite table so a hot question
+#         never leaves memory.
+# Tier 2: optional semantic match. Each cached answer keeps the query
+#         embedding; a new query is compared (cosine) against answers in the
+#         same mode/persona/language partition and served if it clears the
+#         threshold. Each partition is held as one L2-normalised float32
+#         matrix, so the comparison is a single numpy dot product.
+# Answers that depend on a case pass a bounded context string (the chamber's
+# memory state and document scope, not the rendered conversation); a hash of
+# it joins the key, so they are only served back to the same case state, by
+# exact match only (a paraphrase in the same state is rare and not worth an
+# embedding call per chamber turn).
+# Entries expire after ttl_seconds and the table is trimmed to max_entries by
+# least-recent use.
+# ==============================================================================
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_PUNCT_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def cache_key(query, mode, persona, lang, context=None):
+    parts = [normalize_query(query), mode or "", (persona or "").strip().lower(), lang or ""]
+    if context:
+        parts.append(hashlib.sha256(context.encode("utf-8")).hexdigest())  # general answers keep their keys
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _pack(vec):
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def _unpack(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def _normalize(vec):
+    vec = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class _Partition:
+    """Normalised query embeddings of one mode/persona/language, stacked lazily into a matrix"""
+
+    def __init__(self):
+        self.rows = {}
+        self._stacked = None
+
+    def add(self, key, vec):
+        self.rows[key] = _normalize(vec)
+        self._stacked = None
+
+    def stacked(self):
+        if self._stacked is None:
+            keys = list(self.rows)
+            if keys:  # rows left by a previous embedder with another dimension are skipped
+                dim = self.rows[keys[-1]].shape[0]
+                keys = [k for k in keys if self.rows[k].shape[0] == dim]
+            self._stacked = (keys, np.vstack([self.rows[k] for k in keys]) if keys else None)
+        return self._stacked
+
+
+class ResponseCache:
+    """Exact + (optional) semantic answer cache persisted in SQLite."""
+
+    def __init__(self, pool, max_entries=5000, ttl_seconds=7 * 24 * 3600, memory_entries=256,
+                 embedder=None, semantic_threshold=0.92, evict_every=50):
+        self.pool = pool
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.embedder = embedder
+        self.semantic_threshold = semantic_threshold
+        self.evict_every = evict_every
+        self._lru = OrderedDict()
+        self._vectors = None  # partition -> _Partition, loaded lazily
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counters = {"exact_memory": 0, "exact_db": 0, "semantic": 0, "miss": 0, "stored": 0, "evicted": 0,
+                         "case_lookups": 0, "case_hits": 0}
+
+    # -- memory tier -----------------------------------------------------------
+
+    def _remember(self, key, response, created_at):
+        with self._lock:
+            self._lru[key] = (response, created_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.memory_entries:
+                self._lru.popitem(last=False)
+
+    def _bump(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # -- public API ------------------------------------------------------------
+
+    def get(self, query, mode, persona, lang, context=None):
+        """Return (response, tier) or None. tier is 'exact' or 'semantic'."""
+        found = self._get(query, mode, persona, lang, context)
+        if context:
+            with self._lock:
+                self.counters["case_lookups"] += 1
+                self.counters["case_hits"] += found is not None
+        return found
+
+    def _get(self, query, mode, persona, lang, context):
+        key = cache_key(query, mode, persona, lang, context)
+        now = time.time()
+
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit and now - hit[1] < self.ttl_seconds:
+                self._lru.move_to_end(key)
+                self.counters["exact_memory"] += 1
+            else:
+                hit = None
+        if hit:
+            self._touch(key, now)
+            return hit[0], "exact"
+
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT response, created_at FROM response_cache WHERE cache_key=? AND created_at>?",
+                               (key, now - self.ttl_seconds)).fetchone()
+        if row:
+            self._bump("exact_db")
+            self._remember(key, row[0], row[1])
+            self._touch(key, now)
+            return row[0], "exact"
+
+        if self.embedder is not None and not context:
+            match = self._semantic_lookup(query, mode, persona, lang, now)
+            if match:
+                self._bump("semantic")
+                return match, "semantic"
+
+        self._bump("miss")
+        return None
+
+    def put(self, query, mode, persona, lang, response, context=None):
+        key = cache_key(query, mode, persona, lang, context)
+        now = time.time()
+        vector = None
+        if self.embedder is not None and not context:
+            try:
+                vector = self.embedder.embed_query(normalize_query(query))
+            except Exception:
+                vector = None
+
+        with self.pool.connection() as conn:
+            conn.execute("""INSERT OR REPLACE INTO response_cache
+                            (cache_key, query_norm, ai_mode, persona, lang, response, embedding, created_at, last_hit, hits)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                         (key, normalize_query(query), mode, (persona or "").strip().lower(), lang, response,
+                          _pack(vector) if vector is not None else None, now, now))
+        self._remember(key, response, now)
+        if vector is not None and self._vectors is not None:
+            with self._lock:
+                self._vectors.setdefault(self._partition(mode, persona, lang), _Partition()).add(key, vector)
+
+        with self._lock:
+            self.counters["stored"] += 1
+            self._puts += 1
+            due = self._puts % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then trim to max_entries by least-recent hit"""
+        cutoff = time.time() - self.ttl_seconds
+        with self.pool.connection() as conn:
+            removed = conn.execute("DELETE FROM response_cache WHERE created_at<=?", (cutoff,)).rowcount
+            removed += conn.execute("""DELETE FROM response_cache WHERE cache_key IN (
+                                           SELECT cache_key FROM response_cache ORDER BY last_hit DESC LIMIT -1 OFFSET ?)""",
+                                    (self.max_entries,)).rowcount
+        if removed:
+            with self._lock:
+                self.counters["evicted"] += removed
+                self._vectors = None  # rebuilt lazily on next semantic lookup
+                self._lru.clear()
+        return removed
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            entries, total_hits = conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM response_cache").fetchone()
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["exact_memory"] + counters["exact_db"] + counters["semantic"] + counters["miss"]
+        hits = lookups - counters["miss"]
+        counters.update({"entries": entries, "lifetime_hits": total_hits,
+                         "hit_rate": round(hits / lookups, 3) if lookups else 0.0})
+        return counters
+
+    def clear(self):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM response_cache")
+        with self._lock:
+            self._lru.clear()
+            self._vectors = None
+
+    # -- internals -------------------------------------------------------------
+
+    @staticmethod
+    def _partition(mode, persona, lang):
+        return (mode or "", (persona or "").strip().lower(), lang or "")
+
+    def _touch(self, key, now):
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE response_cache SET hits=hits+1, last_hit=? WHERE cache_key=?", (now, key))
+
+    def _load_vectors(self):
+        vectors = {}
+        with self.pool.connection() as conn:
+            for key, mode, persona, lang, blob in conn.execute(
+                    "SELECT cache_key, ai_mode, persona, lang, embedding FROM response_cache WHERE embedding IS NOT NULL"):
+                vectors.setdefault((mode or "", persona or "", lang or ""), _Partition()).add(key, _unpack(blob))
+        return vectors
+
+    def _semantic_lookup(self, query, mode, persona, lang, now):
+        with self._lock:
+            vectors = self._vectors
+        if vectors is None:
+            vectors = self._load_vectors()
+            with self._lock:
+                self._vectors = vectors
+        partition = vectors.get(self._partition(mode, persona, lang))
+        if partition is None:
+            return None
+        with self._lock:
+            keys, matrix = partition.stacked()
+        if matrix is None:
+            return None
+        try:
+            qvec = _normalize(self.embedder.embed_query(normalize_query(query)))
+        except Exception:
+            return None
+        if qvec.shape[0] != matrix.shape[1]:
+            return None
+
+        scores = matrix @ qvec
+        best = int(np.argmax(scores))
+        if scores[best] < self.semantic_threshold:
+            return None
+        best_key = keys[best]
+
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT response FROM response_cache WHERE cache_key=? AND created_at>?",
+                               (best_key, now - self.ttl_seconds)).fetchone()
+        if not row:
+            return None
+        self._touch(best_key, now)
+        return row[0]
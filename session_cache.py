@@ -0,0 +1,67 @@
+# ==============================================================================
+# ALPHA APEX - PER-USER SESSION CACHE WITH VERSIONED INVALIDATION
+# ==============================================================================
+# Streamlit reruns the whole script on every widget interaction (theme toggle,
+# radio change, each committed keystroke), and the sidebar used to re-query the
+# chamber list, the case's attached documents and the library on every one.
+# Those lists now live in session state next to the version they were read at.
+#
+# DataVersions is one process-wide set of counters, keyed (scope, topic), e.g.
+# (email, "chambers") or (None, "library"). Every db_* write bumps the topics
+# it touched after its commit; a read compares the counter with the one its
+# session-state entry was loaded at and only goes to SQLite when they differ.
+# Because the counters are shared by every session in the process, a chamber
+# created in one browser tab invalidates the list cached by the user's other
+# tabs on their next rerun, and a rerun where nothing was written costs no DB
+# round trip at all.
+#
+# The counters are in memory: writers in another process (siu.py, a second
+# server) are not seen until the topic is bumped here or the session restarts.
+# ==============================================================================
+
+import threading
+import uuid
+
+STATE_KEY = "_session_cache"
+
+
+class DataVersions:
+    def __init__(self):
+        # a rebuilt DataVersions (cache cleared, server restart) must not match
+        # versions remembered by sessions under the old instance
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope, topic):
+        with self._lock:
+            return self.epoch, self._versions.get((scope, topic), 0)
+
+    def bump(self, scope, *topics):
+        with self._lock:
+            for topic in topics:
+                self._versions[(scope, topic)] = self._versions.get((scope, topic), 0) + 1
+
+
+def cached(state, versions, scope, topic, loader, key=None):
+    """loader() memoised in session state until (scope, topic) is bumped.
+
+    `state` is st.session_state (any MutableMapping); `key` separates several
+    entries under one topic (e.g. one per chamber). The version is read before
+    loading, so a write that lands during the load triggers one more reload
+    rather than leaving stale data marked current.
+    """
+    entries = state.setdefault(STATE_KEY, {})
+    current = versions.get(scope, topic)
+    entry = entries.get((scope, topic, key))
+    if entry is None or entry[0] != current:
+        entry = (current, loader())
+        entries[(scope, topic, key)] = entry
+    return entry[1]
+
+
+def forget(state, scope=None):
+    """Drop this session's entries for one scope (all of them when scope is None)"""
+    entries = state.setdefault(STATE_KEY, {})
+    for k in [k for k in entries if scope is None or k[0] == scope]:
+        del entries[k]
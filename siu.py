@@ -20,6 +20,11 @@ import re
 import pandas as pd
 from langchain_google_genai import ChatGoogleGenerativeAI
 from streamlit_mic_recorder import speech_to_text
+from db_pool import ConnectionPool
+from db_migrations import run_migrations
+import law_ingest
+import chat_history
+from canned_responses import CannedResponses
 
 # ==============================================================================
 # 1. PREMIUM HACKATHON SHADER ARCHITECTURE
@@ -71,46 +76,55 @@ def apply_leviathan_shaders():
 # ==============================================================================
 
 SQL_DB_FILE = "alpha_apex_leviathan_master_v32.db"
+DATA_REPOSITORY = "DATA"
+
+@st.cache_resource
+def get_db_pool():
+    return ConnectionPool(SQL_DB_FILE)
+
+def get_db_connection():
+    return get_db_pool().connection()
 
 def init_leviathan_db():
-    conn = sqlite3.connect(SQL_DB_FILE); cursor = conn.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, full_name TEXT, vault_key TEXT, registration_date TEXT, membership_tier TEXT DEFAULT "Senior Counsel", account_status TEXT DEFAULT "Active", total_queries INTEGER DEFAULT 0)')
-    cursor.execute('CREATE TABLE IF NOT EXISTS chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT, chamber_type TEXT DEFAULT "General Litigation", case_status TEXT DEFAULT "Active", is_archived INTEGER DEFAULT 0)')
-    cursor.execute('CREATE TABLE IF NOT EXISTS message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT, token_count INTEGER DEFAULT 0)')
-    cursor.execute('CREATE TABLE IF NOT EXISTS law_assets (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT, filesize_kb REAL, page_count INTEGER, sync_timestamp TEXT, asset_status TEXT DEFAULT "Verified")')
-    conn.commit(); conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, full_name TEXT, vault_key TEXT, registration_date TEXT, membership_tier TEXT DEFAULT "Senior Counsel", account_status TEXT DEFAULT "Active", total_queries INTEGER DEFAULT 0)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT, init_date TEXT, chamber_type TEXT DEFAULT "General Litigation", case_status TEXT DEFAULT "Active", is_archived INTEGER DEFAULT 0)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, sender_role TEXT, message_body TEXT, ts_created TEXT, token_count INTEGER DEFAULT 0)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS law_assets (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT, filesize_kb REAL, page_count INTEGER, sync_timestamp TEXT, asset_status TEXT DEFAULT "Verified")')
+        run_migrations(conn)
 
 def db_create_vault_user(email, name, password):
     if not email or not password: return False
-    conn = sqlite3.connect(SQL_DB_FILE); cursor = conn.cursor()
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        cursor.execute('INSERT INTO users (email, full_name, vault_key, registration_date) VALUES (?, ?, ?, ?)', (email, name, password, ts))
-        cursor.execute('INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)', (email, "General Litigation Chamber", ts))
-        conn.commit(); conn.close(); return True
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO users (email, full_name, vault_key, registration_date) VALUES (?, ?, ?, ?)', (email, name, password, ts))
+            cursor.execute('INSERT INTO chambers (owner_email, chamber_name, init_date) VALUES (?, ?, ?)', (email, "General Litigation Chamber", ts))
+        return True
     except sqlite3.IntegrityError:
-        conn.close(); return False
+        return False
 
 def db_verify_vault_access(email, password):
-    conn = sqlite3.connect(SQL_DB_FILE); cursor = conn.cursor()
-    cursor.execute("SELECT full_name FROM users WHERE email=? AND vault_key=?", (email, password))
-    res = cursor.fetchone(); conn.close(); return res[0] if res else None
+    with get_db_connection() as conn:
+        res = conn.execute("SELECT full_name FROM users WHERE email=? AND vault_key=?", (email, password)).fetchone()
+    return res[0] if res else None
 
 def db_log_consultation(email, chamber_name, role, content):
-    conn = sqlite3.connect(SQL_DB_FILE); cursor = conn.cursor()
-    cursor.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
-    c_row = cursor.fetchone()
-    if c_row:
-        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute('INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)', (c_row[0], role, content, ts))
-        if role == "user": cursor.execute("UPDATE users SET total_queries = total_queries + 1 WHERE email = ?", (email,))
-        conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM chambers WHERE owner_email=? AND chamber_name=?", (email, chamber_name))
+        c_row = cursor.fetchone()
+        if c_row:
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cursor.execute('INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) VALUES (?, ?, ?, ?)', (c_row[0], role, content, ts))
+            if role == "user": cursor.execute("UPDATE users SET total_queries = total_queries + 1 WHERE email = ?", (email,))
 
 def db_fetch_chamber_history(email, chamber_name):
-    conn = sqlite3.connect(SQL_DB_FILE); cursor = conn.cursor()
-    cursor.execute("SELECT m.sender_role, m.message_body FROM message_logs m JOIN chambers c ON m.chamber_id = c.id WHERE c.owner_email=? AND c.chamber_name=? ORDER BY m.id ASC", (email, chamber_name))
-    rows = cursor.fetchall(); conn.close(); return [{"role": r, "content": b} for r, b in rows]
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT m.sender_role, m.message_body FROM message_logs m JOIN chambers c ON m.chamber_id = c.id WHERE c.owner_email=? AND c.chamber_name=? ORDER BY m.id ASC", (email, chamber_name)).fetchall()
+    return [{"role": r, "content": b} for r, b in rows]
 
 init_leviathan_db()
 
@@ -118,6 +132,10 @@ init_leviathan_db()
 # 3. ANALYTICAL SERVICES
 # ==============================================================================
 
+@st.cache_resource
+def get_canned_responses():
+    return CannedResponses("brain.json")
+
 @st.cache_resource
 def get_analytical_engine():
     return ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=st.secrets["GOOGLE_API_KEY"], temperature=0.2)
@@ -137,9 +155,8 @@ def render_main_interface():
         st.write("---") 
         if nav_mode == "Chambers":
             u_mail = st.session_state.user_email
-            conn = sqlite3.connect(SQL_DB_FILE); cursor = conn.cursor()
-            cursor.execute("SELECT chamber_name FROM chambers WHERE owner_email=? AND is_archived=0", (u_mail,))
-            chambers_raw = [r[0] for r in cursor.fetchall()]; conn.close()
+            with get_db_connection() as conn:
+                chambers_raw = [r[0] for r in conn.execute("SELECT chamber_name FROM chambers WHERE owner_email=? AND is_archived=0", (u_mail,)).fetchall()]
             chambers_raw = chambers_raw if chambers_raw else ["General Litigation Chamber"]
             st.session_state.current_chamber = st.selectbox("Current File", chambers_raw)
             if st.button("➕ New Case"): st.session_state.add_case = True
@@ -167,8 +184,10 @@ def render_main_interface():
 
         chat_container = st.container()
         with chat_container:
-            history = db_fetch_chamber_history(st.session_state.user_email, st.session_state.current_chamber)
-            for msg in history:
+            window = chat_history.load_history_window(st.session_state, get_db_connection, st.session_state.user_email, st.session_state.current_chamber)
+            if window["has_more"] and st.button("⬆️ Load earlier", key="load_earlier"):
+                window = chat_history.load_history_window(st.session_state, get_db_connection, st.session_state.user_email, st.session_state.current_chamber, load_earlier=True)
+            for msg in window["messages"]:
                 with st.chat_message(msg["role"]): st.write(msg["content"])
 
         prompt_col, mic_col = st.columns([0.9, 0.1])
@@ -183,16 +202,8 @@ def render_main_interface():
             with chat_container:
                 with st.chat_message("user"): st.write(final_query)
             
-            # GREETING/FAREWELL CHECKER (QUICK RESPONSE)
-            clean_q = final_query.lower().strip()
-            greetings = ["hi", "hello", "hey", "salaam", "greetings", "good morning", "good evening"]
-            farewells = ["bye", "goodbye", "exit", "thanks", "thank you", "jazakallah"]
-            
-            quick_resp = None
-            if any(word == clean_q for word in greetings):
-                quick_resp = "Greetings, Counsel. How may I assist with your legal proceedings today?"
-            elif any(word in clean_q for word in farewells):
-                quick_resp = "Understood. I remain at your disposal for future legal analysis. Case adjourned."
+            # QUICK RESPONSE (brain.json, answered before the engine is touched)
+            quick_resp = get_canned_responses().match(final_query)
 
             with st.chat_message("assistant"):
                 if quick_resp:
@@ -220,25 +231,23 @@ def render_main_interface():
 
     elif nav_mode == "Law Library":
         st.header("📚 Law Library Vault")
-        conn = sqlite3.connect(SQL_DB_FILE)
-        df_assets = pd.read_sql_query("SELECT filename, filesize_kb, sync_timestamp, asset_status FROM law_assets", conn)
-        conn.close()
+        with get_db_connection() as conn:
+            law_ingest.sync_law_library(conn, DATA_REPOSITORY)
+            df_assets = pd.read_sql_query("SELECT filename, filesize_kb, sync_timestamp, asset_status FROM law_assets", conn)
         st.dataframe(df_assets, use_container_width=True)
 
     elif nav_mode == "System Admin":
         st.header("🛡️ System Administration Console")
         admin_tab1, admin_tab2, admin_tab3 = st.tabs(["👥 Registered Counsels", "⚖️ Interaction Logs", "🏗️ Project Credits"])
         with admin_tab1:
-            conn = sqlite3.connect(SQL_DB_FILE)
-            df_users = pd.read_sql_query("SELECT full_name, email, membership_tier, total_queries, registration_date FROM users", conn)
+            with get_db_connection() as conn:
+                df_users = pd.read_sql_query("SELECT full_name, email, membership_tier, total_queries, registration_date FROM users", conn)
             st.dataframe(df_users, use_container_width=True)
-            conn.close()
         with admin_tab2:
-            conn = sqlite3.connect(SQL_DB_FILE)
             query = "SELECT u.full_name, c.chamber_name, m.sender_role, m.message_body, m.ts_created FROM message_logs m JOIN chambers c ON m.chamber_id = c.id JOIN users u ON c.owner_email = u.email ORDER BY m.id DESC LIMIT 100"
-            df_logs = pd.read_sql_query(query, conn)
+            with get_db_connection() as conn:
+                df_logs = pd.read_sql_query(query, conn)
             st.dataframe(df_logs, use_container_width=True)
-            conn.close()
         with admin_tab3:
             st.table([
                 {"Architect": "Saim Ahmed", "Focus": "System Architecture"},
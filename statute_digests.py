@@ -0,0 +1,314 @@
+# ==============================================================================
+# ALPHA APEX - PRECOMPUTED STATUTE DIGESTS (OFFLINE BATCH + PROMPT LOOKUP)
+# ==============================================================================
+# Overview questions ("what does the Karachi Rent Restriction Act cover?") do
+# not need four raw excerpts of an act; a compact digest written once does the
+# job with a fraction of the input tokens. The batch job writes one digest per
+# act, plus one per Part/Chapter for acts that have them, into statute_digests:
+#
+#     python statute_digests.py alpha_apex_leviathan_master_v32.db
+#     python statute_digests.py DB_FILE --dry-run     # list what would be generated
+#
+# Each row carries source_hash = "<law_assets.content_hash>/d<DIGEST_VERSION>",
+# so a digest is regenerated only when its PDF changes (or the prompt is
+# revised); digests of removed assets are deleted. The model is called outside
+# any transaction and each digest commits on its own, so the job can run next
+# to the app and resume after an interruption.
+#
+# StatuteDigests is the read side used by the prompt builder: for a query that
+# names an act and asks for an overview (no specific section cited), it returns
+# that act's digest and the best-matching part digests.
+# ==============================================================================
+
+import argparse
+import datetime
+import os
+import re
+import threading
+import time
+
+from conversation_memory import clip_to_tokens, estimate_tokens
+from hybrid_retrieval import tokenize
+from legal_retrieval import act_title
+from statute_sections import act_key, alias_map, find_act, has_citation, section_label
+
+# bumped when the digest prompt changes, so every digest is regenerated on the next run
+DIGEST_VERSION = 1
+DIGEST_WORDS = 350
+PART_DIGEST_WORDS = 200
+MAX_INPUT_CHARS = 120000   # ~30k tokens of statute per model call
+OUTLINE_BODY_CHARS = 400   # per section in an act outline
+# parsed section bodies must cover this share of the asset's page text, or the act is
+# digested from its pages (a mis-parsed act can yield a handful of near-empty sections)
+MIN_SECTION_COVERAGE = 0.25
+# asks for an overview of an act rather than the text of a provision. Kept to
+# explicit overview phrasing: "what is the notice period under ..." or "explain
+# the penalty for ..." are specific questions that need the raw excerpts.
+OVERVIEW_RE = re.compile(r"\b(?:overview|summary|summari[sz]e|outline|gist|key provisions|main provisions)\b"
+                         r"|\bwhat does\b.{1,120}?\bcover\b"
+                         r"|\bwhat(?:'s| is)\b.{1,120}?\babout\s*\??\s*$", re.I)
+
+
+# ------------------------------------------------------------------------------
+# BATCH SIDE
+# ------------------------------------------------------------------------------
+
+def _group(record):
+    return record["part"] or record["chapter"]
+
+
+def _section_lines(records, body_chars=None):
+    lines, group = [], object()
+    for r in records:
+        if _group(r) != group:
+            group = _group(r)
+            if group:
+                lines.append(f"\n{group}")
+        body = (r["body"] or "").strip()
+        if body_chars and len(body) > body_chars:
+            body = body[:body_chars].rsplit(" ", 1)[0] + " …"
+        lines.append(f"{section_label(r['act_key'])} {r['section']}. {r['heading'] or ''}\n{body}".rstrip())
+    return "\n".join(lines)
+
+
+def plan_digests(conn, force=False):
+    """Digest units that are missing or stale: [{asset_id, act, act_key, scope, title, source_hash, material}, ...]
+
+    scope is 'act' or 'part:<Part/Chapter heading>'. Acts whose parsed sections cover
+    less than MIN_SECTION_COVERAGE of their page text are digested from the pages.
+    """
+    stored = {(a, s): h for a, s, h in conn.execute("SELECT asset_id, scope, source_hash FROM statute_digests")}
+    assets = conn.execute("""SELECT id, filename, content_hash FROM law_assets
+                             WHERE asset_status='Verified' ORDER BY filename""").fetchall()
+    keys = ("act", "act_key", "part", "chapter", "section", "heading", "body")
+    units = []
+    for asset_id, filename, content_hash in assets:
+        source_hash = f"{content_hash}/d{DIGEST_VERSION}"
+        records = [dict(zip(keys, row)) for row in conn.execute(
+            """SELECT act, act_key, part, chapter, section, heading, body FROM statute_sections
+               WHERE asset_id=? ORDER BY ord""", (asset_id,))]
+        body_chars = sum(len(r["body"] or "") for r in records)
+        page_chars = conn.execute("SELECT COALESCE(SUM(LENGTH(page_text)), 0) FROM law_asset_pages WHERE asset_id=?",
+                                  (asset_id,)).fetchone()[0]
+        if records and body_chars and body_chars >= MIN_SECTION_COVERAGE * page_chars:
+            act, key = records[0]["act"], records[0]["act_key"]
+            material = _section_lines(records, OUTLINE_BODY_CHARS)
+        else:
+            pages = conn.execute("SELECT page_text FROM law_asset_pages WHERE asset_id=? ORDER BY page_no",
+                                 (asset_id,)).fetchall()
+            material = "\n".join(p[0] or "" for p in pages).strip()
+            if not material:
+                continue  # scanned PDF with no text layer: nothing to digest
+            act = act_title(filename)
+            key, records = act_key(act), []
+
+        wanted = [("act", act, material)]
+        groups = []
+        for r in records:
+            if _group(r) and _group(r) not in groups:
+                groups.append(_group(r))
+        if len(groups) > 1:
+            for group in groups:
+                wanted.append((f"part:{group}", f"{act}, {group}",
+                               _section_lines([r for r in records if _group(r) == group])))
+        for scope, title, text in wanted:
+            if force or stored.get((asset_id, scope)) != source_hash:
+                units.append({"asset_id": asset_id, "act": act, "act_key": key, "scope": scope, "title": title,
+                              "source_hash": source_hash, "material": text[:MAX_INPUT_CHARS]})
+    return units
+
+
+def prune_digests(conn):
+    """Delete digests of removed/unverified assets, and stale ones (PDF changed) that were not regenerated"""
+    return conn.execute("""DELETE FROM statute_digests WHERE NOT EXISTS (
+                               SELECT 1 FROM law_assets a
+                               WHERE a.id = statute_digests.asset_id AND a.asset_status='Verified'
+                                 AND statute_digests.source_hash = a.content_hash || '/d' || ?)""",
+                        (DIGEST_VERSION,)).rowcount
+
+
+def llm_digester(gateway):
+    """Build a digester(unit) -> text that asks the model for a compact digest"""
+    def digest(unit):
+        whole = unit["scope"] == "act"
+        words = DIGEST_WORDS if whole else PART_DIGEST_WORDS
+        prompt = f"""You write reference digests of Pakistani/Sindh statutes for practising lawyers.
+Digest {"the whole of" if whole else "this part of"} {unit["title"]} in at most {words} words.
+Cover, where present: purpose and application, key definitions, main rights and duties, procedure and forum,
+time limits, penalties. Cite provision numbers in brackets, e.g. [s. 15] or [Art. 199]. Use only the text below;
+no preamble, no advice.
+
+STATUTE TEXT:
+{unit["material"]}
+
+DIGEST:"""
+        result = gateway.invoke(prompt)
+        content = getattr(result, "content", result)
+        if isinstance(content, list):
+            content = "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+        return clip_to_tokens(content, words * 2)
+    return digest
+
+
+def sync_statute_digests(pool, digester, model=None, force=False, progress=None):
+    """Generate missing/stale digests one at a time; returns {"generated", "failed", "removed", "input_tokens"}"""
+    with pool.connection() as conn:
+        units = plan_digests(conn, force)
+    report = {"generated": [], "failed": {}, "removed": 0, "input_tokens": 0}
+    for n, unit in enumerate(units, 1):
+        if progress:
+            progress(n, len(units), unit)
+        try:
+            text = digester(unit)
+        except Exception as e:
+            report["failed"][unit["title"]] = f"{type(e).__name__}: {e}"[:300]
+            continue
+        report["input_tokens"] += estimate_tokens(unit["material"])
+        with pool.connection() as conn:
+            conn.execute("""INSERT OR REPLACE INTO statute_digests
+                            (asset_id, act, act_key, scope, title, digest, source_hash, model, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                         (unit["asset_id"], unit["act"], unit["act_key"], unit["scope"], unit["title"], text,
+                          unit["source_hash"], model, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        report["generated"].append(unit["title"])
+    with pool.connection() as conn:
+        # after generation: a part that vanished from a re-parsed act keeps its old hash and goes here
+        report["removed"] = prune_digests(conn)
+    return report
+
+
+# ------------------------------------------------------------------------------
+# PROMPT SIDE
+# ------------------------------------------------------------------------------
+
+class StatuteDigests:
+    """In-memory copy of statute_digests (a few KB per act) with act-name matching"""
+
+    def __init__(self, pool, refresh_interval=60.0):
+        self.pool = pool
+        self.refresh_interval = refresh_interval  # the batch job runs in another process
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._acts = {}      # act_key -> {"filename", "act", "digest", "parts": [(title, digest, terms), ...]}
+        self._aliases = {}
+        self._max_alias_words = 1
+        self._signature = None
+        self.refresh()
+
+    def refresh(self):
+        """Reload if statute_digests changed; digests whose PDF has since changed are left out"""
+        self._checked = time.monotonic()
+        with self.pool.connection() as conn:
+            signature = conn.execute("""SELECT COUNT(*), MAX(d.id), MAX(a.sync_timestamp) FROM statute_digests d
+                                        JOIN law_assets a ON a.id = d.asset_id""").fetchone()
+            if signature == self._signature:
+                return False
+            rows = conn.execute("""SELECT d.act, d.act_key, d.scope, d.title, d.digest, a.filename
+                                   FROM statute_digests d JOIN law_assets a ON a.id = d.asset_id
+                                   WHERE a.asset_status='Verified' AND d.source_hash = a.content_hash || '/d' || ?
+                                   ORDER BY d.id""", (DIGEST_VERSION,)).fetchall()
+        acts = {}
+        for act, key, scope, title, digest, filename in rows:
+            entry = acts.setdefault(key, {"filename": filename, "act": act, "digest": None, "parts": []})
+            if scope == "act":
+                entry["digest"] = digest
+            else:
+                entry["parts"].append((title, digest, frozenset(tokenize(f"{title} {digest}"))))
+        aliases = alias_map(acts)
+        with self._lock:
+            self._acts, self._aliases = acts, aliases
+            self._max_alias_words = max((len(a.split()) for a in aliases), default=1)
+            self._signature = signature
+        return True
+
+    def __len__(self):
+        return len(self._acts)
+
+    def for_query(self, query, sources=None, max_parts=2):
+        """[{"title", "digest"}, ...] when query asks for an overview of a known act, else []
+
+        A query citing a specific provision needs its text, not a digest. sources
+        (a chamber's attached filenames) limits which acts can match.
+        """
+        if not is_overview_question(query):
+            return []
+        if time.monotonic() - self._checked > self.refresh_interval:
+            self.refresh()
+        key = find_act(query, self._aliases, self._max_alias_words)
+        entry = self._acts.get(key) if key else None
+        if entry is None or (sources is not None and entry["filename"] not in sources):
+            return []
+        out = [{"title": entry["act"], "digest": entry["digest"]}] if entry["digest"] else []
+        terms = set(tokenize(query)) - set(tokenize(key))
+        ranked = sorted(((len(terms & part_terms), title, digest) for title, digest, part_terms in entry["parts"]),
+                        key=lambda item: -item[0])
+        out += [{"title": title, "digest": digest} for overlap, title, digest in ranked[:max_parts] if overlap]
+        return out
+
+
+def is_overview_question(query):
+    """An overview of an act is asked for and no specific provision is cited"""
+    return bool(OVERVIEW_RE.search(query or "")) and not has_citation(query)
+
+
+def format_digests(digests, max_chars=6000):
+    """Prompt block of digests, tagged like retrieval excerpts and capped at max_chars"""
+    parts, used = [], 0
+    for d in digests:
+        block = f"[{d['title']}, digest]\n{d['digest'].strip()}"
+        if used + len(block) > max_chars:
+            break
+        parts.append(block)
+        used += len(block)
+    return "\n\n".join(parts)
+
+
+# ------------------------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate per-act / per-part statute digests")
+    parser.add_argument("db", help="SQLite database (schema migrated, law library synced)")
+    parser.add_argument("--data", default="DATA", help="law library directory, synced before planning")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--force", action="store_true", help="regenerate every digest")
+    parser.add_argument("--dry-run", action="store_true", help="list the digests that would be generated")
+    args = parser.parse_args()
+
+    import law_ingest
+    import statute_sections
+    from db_migrations import run_migrations
+    from db_pool import ConnectionPool
+
+    pool = ConnectionPool(args.db)
+    with pool.connection() as conn:
+        run_migrations(conn)
+        law_ingest.sync_law_library(conn, args.data)
+        statute_sections.sync_statute_sections(conn)
+
+    if args.dry_run:
+        with pool.connection() as conn:
+            units = plan_digests(conn, args.force)
+        for unit in units:
+            print(f"{unit['title']:<80} {estimate_tokens(unit['material']):>7,} input tokens")
+        print(f"{len(units)} digests to generate")
+        pool.close_all()
+        return
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from llm_gateway import LLMGateway
+
+    engine = ChatGoogleGenerativeAI(model=args.model, google_api_key=os.environ["GOOGLE_API_KEY"], temperature=0.1)
+    gateway = LLMGateway(engine, max_concurrency=1, timeout=180.0)
+    report = sync_statute_digests(pool, llm_digester(gateway), model=args.model, force=args.force,
+                                  progress=lambda n, total, unit: print(f"[{n}/{total}] {unit['title']}"))
+    print(f"generated {len(report['generated'])}, failed {len(report['failed'])}, removed {report['removed']}, "
+          f"~{report['input_tokens']:,} input tokens")
+    for title, error in report["failed"].items():
+        print(f"  failed: {title}: {error}")
+    pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+# ==============================================================================
+# ALPHA APEX - STATUTE SECTION INDEX & CITATION LOOKUP
+# ==============================================================================
+# Splits each ingested statute (law_asset_pages) into one record per section
+# or article: (act, part, chapter, number, heading, text), stored in
+# statute_sections. Parsing is line based and tuned to the DATA/ PDFs:
+#   "15.  Application Controller. (1) Where a landlord ..."
+#   "199. Jurisdiction of High Court.__ (1) Subject to ..."
+#   "2[15A. Heading.— ..."             (inserted by amendment)
+# Sindh Gazette ordinances (OCR'd scans) carry the heading as a margin note and
+# the section opens on its text; the note is kept when OCR puts it on the line:
+#   "Definitions. 2. In this Ordinance, unless ..."
+#   "2. In the Sindh Urban Immovable Property Tax Act, 1958, ..."
+# Table-of-contents entries parse too, but own almost no text, so for each
+# number the occurrence with the longest body wins. Parsing stops at the first
+# schedule, whose numbered paragraphs are not sections.
+#
+# StatuteSections keeps {(act_key, number): row id} and {alias: act_key} in
+# memory, so "s.15 SRPO", "Section 15 of the Sindh Rented Premises Ordinance,
+# 1979" and "Article 199" resolve with dict lookups plus one primary-key read.
+# ==============================================================================
+
+import re
+import threading
+
+from legal_retrieval import act_title
+
+# bumped when parsing changes, so existing rows are re-parsed on the next sync
+PARSER_VERSION = 3
+
+_NOISE_RE = re.compile(r"^\s*(?:Page \d+ of \d+|\d{1,3})\s*$", re.I)
+_LEADER_RE = re.compile(r"\.{5,}")
+_FOOTNOTE_RE = re.compile(r"^\s*\d{1,2}(?:Subs|Ins|Added|Omitted|Rep|Renumbered|Inserted|Substituted)\b")
+_PART_RE = re.compile(r"^\s*PART\s+([IVXLC]+[A-Z]?)\b[\s.:_–—-]*(.*)$")
+_CHAPTER_RE = re.compile(r"^\s*CHAPTER\s+([IVXLC]+[A-Z]?|\d+[A-Z]?)\b[\s.:_–—-]*(.*)$")
+_SECTION_RE = re.compile(r"^\s*(?:\d{0,2}\[)?(\d{1,3}[A-Z]{0,2})\.\s+(\S.*)$")
+_NUMBER_ONLY_RE = re.compile(r"^\s*(?:\d{0,2}\[)?(\d{1,3}[A-Z]{0,2})\.\s*$")  # "13.  " with the heading on the next line
+# heading ends at the first "___", dash, ".-", ":-", ". (1)", ".  " or a closing "."
+_HEADING_RE = re.compile(r"^(?P<heading>.{1,200}?)(?:\.?\s*_{2,}|\.?\s*[—–]|[.:]-|\.\s{2,}|\.\s*(?=\(\d)|\.\s*$|\.\s+(?=[A-Z]))\s*(?P<rest>.*)$")
+# a schedule heading standing alone ends the sections; TOC entries carry a title ("FIRST SCHEDULE.__ Laws ...")
+_SCHEDULE_RE = re.compile(r"^\s*(?:\d{0,2}\[)?(?:THE\s+)?(?:[A-Z]+\s+)?SCHEDULE(?:[\s-]*[IVX]+)?\.?\s*$")
+_UNNAMED_RE = re.compile(r"^\(\d")
+# gazette sections without a heading open on enacting prose
+_PROSE_RE = re.compile(r"^(?:In|For|After|This|The said)\s")
+_MARGIN_RE = re.compile(r"^\s*(?P<note>[A-Z][a-z]+(?:[ ,-]+[a-z]+){0,5})[.,]?\s+(?P<num>\d{1,3}[A-Z]?)\.\s+"
+                        r"(?P<rest>\(\d.*|(?:In|For|After|This|The said)\s.*)$")
+_GAZETTE_RE = re.compile(r"\bSINDH\s+GOV(?:ERNMEN)?T\.?\s+GAZETTE\b", re.I)  # running page header
+_BRACKET_RE = re.compile(r"^\d{0,2}\[|\]")
+
+_STOPWORDS = {"of", "the", "and", "for", "in", "no", "on", "to"}
+_YEAR_RE = re.compile(r"\b(?:1[89]\d\d|20\d\d)\b")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Citation: "s.15", "ss. 15", "sec 15", "section 15(2)", "art. 199", "Article 199(1)(a)"
+_CITE_RE = re.compile(r"\b(?P<kind>ss?\.|sec\.?|sections?|arts?\.?|articles?)\s*(?P<num>\d{1,3}[A-Za-z]{0,2})\b(?:\s*\(\s*\w{1,4}\s*\))*",
+                      re.I)
+ACT_WINDOW_CHARS = 120
+# words a bare citation request may carry besides the citation and the act name
+INSTANT_FILLER = {"of", "the", "show", "text", "full", "read", "quote", "what", "is", "does", "say", "says", "me",
+                  "please", "under", "in"}
+INSTANT_MAX_EXTRA = 1
+EXTRA_ALIASES = {
+    "constitution": "constitution islamic republic pakistan",
+    "constitution of pakistan": "constitution islamic republic pakistan",
+    "pakistan constitution": "constitution islamic republic pakistan",
+    "rent ordinance": "sindh rented premises ordinance",
+}
+
+
+def act_key(title):
+    """'THE SIND RENTED PREMISES ORDINANCE, 1979' -> 'sindh rented premises ordinance'"""
+    text = _YEAR_RE.sub(" ", (title or "").lower())
+    words = ["sindh" if w == "sind" else w for w in _WORD_RE.findall(text)]
+    return " ".join(w for w in words if w != "the")
+
+
+def act_aliases(key):
+    words = key.split()
+    aliases = {key}
+    significant = [w for w in words if w not in _STOPWORDS and not w.isdigit()]
+    acronym = "".join(w[0] for w in significant)
+    if len(acronym) >= 3:
+        aliases.add(acronym)
+    if significant and significant[0] == "sindh" and len(significant) > 2:
+        aliases.add(" ".join(significant[1:]))  # "rented premises ordinance"
+    aliases.add(" ".join(significant))
+    return aliases
+
+
+def alias_map(keys):
+    """{alias: act_key} for the given act keys; an alias shared by two acts would be a guess and is dropped"""
+    aliases = {}
+    for key in keys:
+        for alias in act_aliases(key):
+            aliases[alias] = key if aliases.get(alias, key) == key else None
+    for alias, target in EXTRA_ALIASES.items():
+        match = next((k for k in keys if target in act_aliases(k)), None)
+        if match:
+            aliases[alias] = match
+    return {a: k for a, k in aliases.items() if k}
+
+
+def find_act(text, aliases, max_words, last=False):
+    """Longest alias in text (first occurrence, or the last one if last=True) -> act_key, else None"""
+    words = act_key(text).split()
+    found = None
+    for i in range(len(words)):
+        for n in range(min(max_words, len(words) - i), 0, -1):
+            key = aliases.get(" ".join(words[i:i + n]))
+            if key:
+                if not last:
+                    return key
+                found = key
+                break
+    return found
+
+
+def has_citation(text):
+    return _CITE_RE.search(text or "") is not None
+
+
+def is_constitution(key):
+    return key.startswith("constitution")
+
+
+def section_label(key):
+    return "Article" if is_constitution(key) else "Section"
+
+
+# ------------------------------------------------------------------------------
+# PARSER
+# ------------------------------------------------------------------------------
+
+def parse_statute(filename, pages):
+    """[(page_no, text), ...] -> [{"act", "act_key", "part", "chapter", "section", "heading", "body", "page_no"}, ...]"""
+    act = act_title(filename)
+    key = act_key(act)
+    part = chapter = None
+    pending = None  # "part"/"chapter" whose title is on the next line
+    number = None   # section number whose heading is on the next line
+    current = None
+    found = []
+
+    for page_no, text in pages:
+        for line in (text or "").splitlines():
+            if _LEADER_RE.search(line):
+                number = None  # table of contents entry
+                continue
+            if _NOISE_RE.match(line) or _FOOTNOTE_RE.match(line) or _GAZETTE_RE.search(line):
+                continue
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if _SCHEDULE_RE.match(line):
+                return _best_occurrences(found)
+
+            m = _PART_RE.match(line)
+            if m:
+                part = f"PART {m.group(1)}" + (f" - {m.group(2).strip()}" if m.group(2).strip() else "")
+                chapter, current = None, None
+                pending = None if m.group(2).strip() else "part"
+                continue
+            m = _CHAPTER_RE.match(line)
+            if m:
+                chapter = f"CHAPTER {m.group(1)}" + (f" - {m.group(2).strip()}" if m.group(2).strip() else "")
+                current = None
+                pending = None if m.group(2).strip() else "chapter"
+                continue
+            if pending and stripped.isupper():
+                if pending == "part":
+                    part = f"{part} - {stripped}"
+                else:
+                    chapter = f"{chapter} - {stripped}"
+                pending = None
+                continue
+            pending = None
+
+            m = _NUMBER_ONLY_RE.match(line)
+            if m:
+                number = m.group(1).upper()
+                continue
+            note = None
+            m = _MARGIN_RE.match(line)
+            if m:
+                note, number, rest = m.group("note"), m.group("num").upper(), m.group("rest").strip()
+            else:
+                m = _SECTION_RE.match(line)
+                if m:
+                    number, rest = m.group(1).upper(), m.group(2).strip()
+                elif number is not None:
+                    rest = stripped
+            if m or number is not None:
+                heading, body = None, ""
+                if _UNNAMED_RE.match(rest) or _PROSE_RE.match(rest):
+                    heading, body = note or "", rest
+                else:
+                    h = _HEADING_RE.match(rest)
+                    if h:
+                        heading, body = _BRACKET_RE.sub("", h.group("heading")).strip(" .,"), h.group("rest")
+                if heading is not None:
+                    current = {"act": act, "act_key": key, "part": part, "chapter": chapter, "section": number,
+                               "heading": heading, "lines": [body] if body else [], "page_no": page_no}
+                    found.append(current)
+                    number = None
+                    continue
+                number = None
+            if current is not None:
+                current["lines"].append(stripped)
+    return _best_occurrences(found)
+
+
+def _best_occurrences(found):
+    best = {}
+    for pos, rec in enumerate(found):
+        rec["body"] = re.sub(r"[ \t]+", " ", "\n".join(rec.pop("lines"))).strip()
+        rec["ord"] = pos
+        if rec["section"] not in best or len(rec["body"]) > len(best[rec["section"]]["body"]):
+            best[rec["section"]] = rec
+    return sorted(best.values(), key=lambda r: r["ord"])
+
+
+def sync_statute_sections(conn):
+    """Re-parse assets whose content hash changed since their sections were stored.
+
+    Reads law_assets/law_asset_pages (see law_ingest); the caller commits.
+    Returns {"parsed": {filename: n_sections}, "removed": n_assets}.
+    """
+    cur = conn.cursor()
+    assets = cur.execute("SELECT id, filename, content_hash FROM law_assets WHERE asset_status='Verified'").fetchall()
+    stored = dict(cur.execute("SELECT asset_id, MAX(content_hash) FROM statute_sections GROUP BY asset_id").fetchall())
+    report = {"parsed": {}, "removed": 0}
+
+    for asset_id, filename, digest in assets:
+        digest = f"{digest}/v{PARSER_VERSION}"
+        if stored.get(asset_id) == digest:
+            continue
+        pages = cur.execute("SELECT page_no, page_text FROM law_asset_pages WHERE asset_id=? ORDER BY page_no",
+                            (asset_id,)).fetchall()
+        records = parse_statute(filename, pages)
+        cur.execute("DELETE FROM statute_sections WHERE asset_id=?", (asset_id,))
+        cur.executemany("""INSERT INTO statute_sections (asset_id, content_hash, act, act_key, part, chapter, section,
+                                                         heading, body, page_no, ord)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        [(asset_id, digest, r["act"], r["act_key"], r["part"], r["chapter"], r["section"],
+                          r["heading"], r["body"], r["page_no"], r["ord"]) for r in records])
+        report["parsed"][filename] = len(records)
+
+    live = {a[0] for a in assets}
+    for asset_id in set(stored) - live:
+        cur.execute("DELETE FROM statute_sections WHERE asset_id=?", (asset_id,))
+        report["removed"] += 1
+    return report
+
+
+# ------------------------------------------------------------------------------
+# LOOKUP
+# ------------------------------------------------------------------------------
+
+class StatuteSections:
+    """In-memory citation index over statute_sections"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._by_cite = {}
+        self._aliases = {}
+        self._acts = {}
+        self._max_alias_words = 1
+        self._signature = None
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the in-memory maps if statute_sections changed"""
+        with self.pool.connection() as conn:
+            signature = conn.execute("SELECT COUNT(*), MAX(id) FROM statute_sections").fetchone()
+            if signature == self._signature:
+                return False
+            rows = conn.execute("SELECT id, act, act_key, section FROM statute_sections").fetchall()
+        by_cite, acts = {}, {}
+        for row_id, act, key, section in rows:
+            by_cite[(key, section)] = row_id
+            acts[key] = act
+        aliases = alias_map(acts)
+        with self._lock:
+            self._by_cite, self._acts, self._aliases = by_cite, acts, aliases
+            self._max_alias_words = max((len(a.split()) for a in aliases), default=1)
+            self._signature = signature
+        return True
+
+    def acts(self):
+        return dict(self._acts)
+
+    def resolve_act(self, name):
+        """Act title, key or alias -> act_key (None if unknown or ambiguous)"""
+        key = act_key(name)
+        if key in self._acts:
+            return key
+        return self._aliases.get(key)
+
+    def _get(self, row_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("""SELECT act, act_key, part, chapter, section, heading, body, page_no
+                                  FROM statute_sections WHERE id=?""", (row_id,)).fetchone()
+        if not row:
+            return None
+        keys = ("act", "act_key", "part", "chapter", "section", "heading", "body", "page_no")
+        record = dict(zip(keys, row))
+        record["label"] = section_label(record["act_key"])
+        return record
+
+    def lookup(self, act, section):
+        """Exact text of `section` of `act` (title, key or alias), or None"""
+        key = self.resolve_act(act)
+        row_id = self._by_cite.get((key, str(section).upper())) if key else None
+        return self._get(row_id) if row_id else None
+
+    # -- citations in free text ------------------------------------------------
+
+    def _act_in(self, text, last=False):
+        """Longest known alias in text (first occurrence, or the last one if last=True)"""
+        return find_act(text, self._aliases, self._max_alias_words, last)
+
+    def find_citations(self, text):
+        """[(act_key, number, (start, end)), ...] for every resolvable citation in text"""
+        out = []
+        for m in _CITE_RE.finditer(text or ""):
+            number = m.group("num").upper()
+            key = self._act_in(text[m.end():m.end() + ACT_WINDOW_CHARS])
+            if key is None or (key, number) not in self._by_cite:
+                key = self._act_in(text[max(0, m.start() - 40):m.start()], last=True)
+            if (key is None or (key, number) not in self._by_cite) and m.group("kind").lower().startswith("art"):
+                key = next((k for k in self._acts if is_constitution(k)), None)
+            if key and (key, number) in self._by_cite:
+                out.append((key, number, m.span()))
+        return out
+
+    def cited_sections(self, text, limit=5):
+        """Records for the distinct provisions cited in text, in order of first mention"""
+        seen, records = set(), []
+        for key, number, _span in self.find_citations(text):
+            if (key, number) in seen:
+                continue
+            seen.add((key, number))
+            record = self._get(self._by_cite[(key, number)])
+            if record:
+                records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+
+    def instant_lookup(self, query):
+        """The cited provision when the query is essentially just a citation ("s.15 SRPO"), else None"""
+        found = self.find_citations(query)
+        if len({(k, n) for k, n, _s in found}) != 1:
+            return None
+        key, number, (start, end) = found[0]
+        act_words = {w for alias, k in self._aliases.items() if k == key for w in alias.split()}
+        rest = act_key(query[:start] + " " + query[end:]).split()
+        if sum(1 for w in rest if w not in act_words and w not in INSTANT_FILLER) > INSTANT_MAX_EXTRA:
+            return None  # a real question about the provision: leave it to the model
+        return self._get(self._by_cite[(key, number)])
+
+
+def format_section(record, max_chars=None):
+    """Markdown block: '**Section 15, Sindh Rented Premises Ordinance, 1979** - Heading' + text"""
+    title = f"**{record['label']} {record['section']}, {record['act']}**"
+    if record.get("heading"):
+        title += f" - {record['heading']}"
+    where = " · ".join(x for x in (record.get("part"), record.get("chapter")) if x)
+    body = record.get("body") or ""
+    if max_chars and len(body) > max_chars:
+        body = body[:max_chars].rsplit(" ", 1)[0] + " …"
+    return "\n\n".join(x for x in (title, f"_{where}_" if where else "", body) if x)
@@ -0,0 +1,127 @@
+# ==============================================================================
+# ALPHA APEX - BATCHED, ASYNCHRONOUS TELEMETRY WRITER
+# ==============================================================================
+# Login, registration and chamber create/delete used to INSERT into
+# system_telemetry inside the request's own transaction, so every one of
+# those actions paid for an extra row and a WAL commit. record() now only
+# appends the event (stamped with the time it happened) to an in-memory
+# queue and returns; a daemon thread writes the queue to system_telemetry
+# with one executemany per batch, every flush_interval seconds or as soon as
+# batch_size events are waiting.
+#
+# The queue is bounded by max_queued: when the database cannot keep up (or
+# is locked for a long time) new events are dropped and counted rather than
+# growing memory or blocking the caller. A failed batch goes back to the
+# front of the queue for the next round. close() stops the worker and writes
+# whatever is left; it is registered with atexit so a clean shutdown never
+# loses queued events.
+# ==============================================================================
+
+import atexit
+import datetime
+import threading
+import time
+from collections import deque
+
+
+class TelemetrySink:
+    def __init__(self, pool, batch_size=200, flush_interval=0.25, max_queued=10000):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self.counters = {"recorded": 0, "written": 0, "dropped": 0, "batches": 0, "failed_batches": 0}
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # worker and flush() callers never interleave batches
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    # -- producer side ---------------------------------------------------------
+
+    def record(self, email, event_type, description, ts=None):
+        """Queue one system_telemetry event; never touches the database. False if dropped"""
+        ts = ts or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                self.counters["dropped"] += 1
+                return False
+            self._queue.append((email, event_type, description, ts))
+            self.counters["recorded"] += 1
+            full = len(self._queue) >= self.batch_size
+        self.start()
+        if full:
+            self._wake.set()
+        return True
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            counters["queued"] = len(self._queue)
+        return counters
+
+    # -- worker lifecycle ------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="telemetry-sink", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Write everything queued so far on the calling thread; returns events written"""
+        written = 0
+        while True:
+            n = self._write_batch()
+            if not n:
+                return written
+            written += n
+
+    def close(self):
+        """Stop the worker and write what is left (idempotent; also runs at interpreter exit)"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._stop.set()
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception:
+            pass  # database gone at shutdown: the remaining events are counted as queued
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.flush_interval)  # DB busy/locked: the batch is back in the queue
+
+    def _write_batch(self):
+        with self._write_lock:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return 0
+            try:
+                with self.pool.connection() as conn:
+                    conn.executemany("""INSERT INTO system_telemetry (user_email, event_type, description, event_timestamp)
+                                        VALUES (?, ?, ?, ?)""", batch)
+            except Exception:
+                with self._lock:
+                    self._queue.extendleft(reversed(batch))
+                    self.counters["failed_batches"] += 1
+                raise
+            with self._lock:
+                self.counters["written"] += len(batch)
+                self.counters["batches"] += 1
+            return len(batch)
@@ -0,0 +1,91 @@
+import gzip
+import io
+import json
+import random
+
+import pytest
+
+import chamber_archive
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+
+ACT = "Sindh Rented Premises Ordinance,1979.pdf"
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "archive.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE users (email TEXT PRIMARY KEY, full_name TEXT)")
+        conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, "
+                     "chamber_name TEXT, init_date TEXT)")
+        conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, "
+                     "sender_role TEXT, message_body TEXT, ts_created TEXT)")
+        run_migrations(conn)
+        conn.executemany("INSERT INTO users VALUES (?, ?)", [("a@x.pk", "A"), ("b@x.pk", "B")])
+        chamber_id = conn.execute("INSERT INTO chambers (owner_email, chamber_name, init_date) "
+                                  "VALUES ('a@x.pk', 'Tenancy', '2025-01-01')").lastrowid
+        conn.execute("INSERT INTO law_assets (filename, asset_status) VALUES (?, 'Verified')", (ACT,))
+        conn.execute("INSERT INTO chamber_documents VALUES (?, ?, '2025-01-01')", (chamber_id, ACT))
+        conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body, ts_created) "
+                         "VALUES (?, ?, ?, '2025-01-01')",
+                         [(chamber_id, "user" if i % 2 == 0 else "assistant", f"message {i}") for i in range(50)])
+    yield pool
+    pool.close_all()
+
+
+def _export(pool):
+    out = io.BytesIO()
+    with pool.connection() as conn:
+        chamber_archive.export_chambers(conn, "a@x.pk", None, out, batch_size=7)
+    return out.getvalue()
+
+
+def _chamber_count(pool):
+    with pool.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM chambers").fetchone()[0]
+
+
+def test_round_trip(pool):
+    with pool.connection() as conn:
+        report = chamber_archive.import_chambers(conn, "b@x.pk", io.BytesIO(_export(pool)), batch_size=7)
+    assert report["chambers"] == [("Tenancy", "Tenancy")]
+    assert report["messages"] == 50 and report["documents"] == 1
+    with pool.connection() as conn:
+        rows = conn.execute("""SELECT m.message_body FROM message_logs m JOIN chambers c ON c.id = m.chamber_id
+                               WHERE c.owner_email='b@x.pk' ORDER BY m.id""").fetchall()
+    assert [r[0] for r in rows] == [f"message {i}" for i in range(50)]
+
+
+def test_duplicate_documents_in_archive(pool):
+    lines = [json.loads(l) for l in gzip.decompress(_export(pool)).splitlines()]
+    lines[1]["documents"] = [ACT, ACT]
+    data = gzip.compress(b"".join(json.dumps(l).encode() + b"\n" for l in lines))
+    with pool.connection() as conn:
+        report = chamber_archive.import_chambers(conn, "b@x.pk", io.BytesIO(data))
+    assert report["documents"] == 1
+
+
+def test_corrupted_archives_raise_value_error_and_commit_nothing(pool):
+    data = _export(pool)
+    before = _chamber_count(pool)
+    rng = random.Random(3)
+    for _ in range(200):
+        damaged = bytearray(data)
+        for _ in range(rng.randint(1, 4)):
+            damaged[rng.randrange(len(damaged))] = rng.randrange(256)
+        try:
+            with pool.connection() as conn:
+                chamber_archive.import_chambers(conn, "b@x.pk", io.BytesIO(bytes(damaged)))
+        except ValueError:
+            assert _chamber_count(pool) == before
+        else:
+            before = _chamber_count(pool)  # damage the checksum happened not to catch: a valid import
+
+
+def test_truncated_archive(pool):
+    data = gzip.compress(b"\n".join(gzip.decompress(_export(pool)).splitlines()[:-1]))
+    with pytest.raises(ValueError, match="truncated"):
+        with pool.connection() as conn:
+            chamber_archive.import_chambers(conn, "b@x.pk", io.BytesIO(data))
+    assert _chamber_count(pool) == 1
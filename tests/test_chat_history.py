@@ -0,0 +1,67 @@
+import contextlib
+
+import pytest
+
+import chat_history
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def db(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "history.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT)")
+        conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, "
+                     "sender_role TEXT, message_body TEXT)")
+        conn.execute("INSERT INTO chambers (owner_email, chamber_name) VALUES ('a@x.pk', 'Tenancy')")
+    yield pool
+    pool.close_all()
+
+
+def _post(db, n, start):
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body) VALUES (1, 'user', ?)",
+                         [(f"m{i}",) for i in range(start, start + n)])
+
+
+def _window(db, state, load_earlier=False):
+    with db.connection() as conn:
+        window = chat_history.load_history_window(state, lambda: contextlib.nullcontext(conn), "a@x.pk", "Tenancy",
+                                                  page_size=5, load_earlier=load_earlier)
+    return [m["content"] for m in window["messages"]], window["has_more"]
+
+
+def test_new_messages_push_the_oldest_out(db):
+    state = {}
+    _post(db, 3, 0)
+    assert _window(db, state) == (["m0", "m1", "m2"], False)
+    _post(db, 4, 3)
+    assert _window(db, state) == (["m2", "m3", "m4", "m5", "m6"], True)
+
+
+def test_loaded_pages_are_kept(db):
+    state = {}
+    _post(db, 12, 0)
+    _window(db, state)
+    messages, has_more = _window(db, state, load_earlier=True)
+    assert messages == [f"m{i}" for i in range(2, 12)] and has_more
+    _post(db, 3, 12)
+    messages, has_more = _window(db, state)
+    assert messages == [f"m{i}" for i in range(5, 15)] and has_more
+    messages, has_more = _window(db, state, load_earlier=True)
+    assert messages == [f"m{i}" for i in range(0, 15)] and not has_more
+
+
+def test_load_earlier_keeps_the_version_so_the_next_rerun_is_served_from_cache(db):
+    state = {}
+    _post(db, 12, 0)
+    calls = []
+
+    def connection():
+        calls.append(1)
+        return db.connection()
+
+    for load_earlier in (False, True, False):
+        window = chat_history.load_history_window(state, connection, "a@x.pk", "Tenancy", page_size=5,
+                                                  load_earlier=load_earlier, version=7)
+    assert len(calls) == 2 and len(window["messages"]) == 10
@@ -0,0 +1,69 @@
+import pytest
+
+from conversation_memory import ConversationMemory
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "memory.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE chambers (id INTEGER PRIMARY KEY AUTOINCREMENT, owner_email TEXT, chamber_name TEXT)")
+        conn.execute("CREATE TABLE message_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chamber_id INTEGER, "
+                     "sender_role TEXT, message_body TEXT, ts_created TEXT)")
+        run_migrations(conn)
+        conn.execute("INSERT INTO chambers (owner_email, chamber_name) VALUES ('a@x.pk', 'Tenancy')")
+        conn.executemany("INSERT INTO message_logs (chamber_id, sender_role, message_body) VALUES (1, ?, ?)",
+                         [("user" if i % 2 == 0 else "assistant", f"Fact {i} of the matter.") for i in range(40)])
+    yield pool
+    pool.close_all()
+
+
+def test_build_context_never_calls_the_summarizer(pool):
+    calls = []
+    memory = ConversationMemory(pool, summarizer=lambda *a: calls.append(a) or "summary",
+                                recent_turns=6, summarize_batch=4, max_batches_per_turn=2, token_budget=4000)
+    context = memory.build_context("a@x.pk", "Tenancy")
+    assert calls == []
+    # 34 messages precede the recent window and nothing is folded yet: the newest 8 are noted
+    assert "NOT YET SUMMARISED, 34 messages (26 older not shown)" in context
+    assert all(f"Fact {i} of" in context for i in range(26, 40))
+
+
+def test_catch_up_folds_the_backlog_in_bounded_runs(pool):
+    calls = []
+    memory = ConversationMemory(pool, summarizer=lambda previous, messages: calls.append(messages) or "summary",
+                                recent_turns=6, summarize_batch=4, max_batches_per_turn=2, token_budget=4000)
+    assert memory.catch_up("a@x.pk", "Tenancy") == 8
+    assert len(calls) == 2
+    assert "NOT YET SUMMARISED, 26 messages (18 older not shown)" in memory.build_context("a@x.pk", "Tenancy")
+
+    while memory.catch_up("a@x.pk", "Tenancy"):
+        pass
+    with pool.connection() as conn:
+        through = conn.execute("SELECT summarized_through_id FROM chamber_memory").fetchone()[0]
+    assert through == 32
+    context = memory.build_context("a@x.pk", "Tenancy")
+    # the two messages short of a batch go in verbatim
+    assert "NOT YET SUMMARISED" not in context
+    assert "Fact 32 of" in context and "Fact 33 of" in context
+
+
+def test_no_backlog_note_for_a_short_chamber(pool):
+    with pool.connection() as conn:
+        conn.execute("DELETE FROM message_logs WHERE id > 10")
+    memory = ConversationMemory(pool, recent_turns=6, summarize_batch=4, max_batches_per_turn=2)
+    memory.catch_up("a@x.pk", "Tenancy")
+    assert "NOT YET SUMMARISED" not in memory.build_context("a@x.pk", "Tenancy")
+
+
+def test_state_moves_only_when_the_summary_advances(pool):
+    memory = ConversationMemory(pool, recent_turns=6, summarize_batch=4, max_batches_per_turn=2)
+    before = memory.state("a@x.pk", "Tenancy")
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO message_logs (chamber_id, sender_role, message_body) VALUES (1, 'user', 'And now?')")
+    assert memory.state("a@x.pk", "Tenancy") == before
+    memory.catch_up("a@x.pk", "Tenancy")
+    assert memory.state("a@x.pk", "Tenancy") != before
+    assert memory.state("a@x.pk", "Nowhere") is None
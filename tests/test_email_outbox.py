@@ -0,0 +1,76 @@
+import smtplib
+import time
+
+import pytest
+
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+from email_outbox import SMTPOutbox
+
+
+class FakeSMTP:
+    connects = 0
+    login_error = None
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        FakeSMTP.connects += 1
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        if FakeSMTP.login_error:
+            raise FakeSMTP.login_error
+
+    def send_message(self, msg):
+        FakeSMTP.sent.append(msg["To"])
+
+    def quit(self):
+        pass
+
+    close = quit
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    FakeSMTP.connects, FakeSMTP.login_error, FakeSMTP.sent = 0, None, []
+    pool = ConnectionPool(str(tmp_path / "outbox.db"))
+    with pool.connection() as conn:
+        run_migrations(conn)
+    outbox = SMTPOutbox(pool, "smtp.test", 587, username="u", password="p", smtp_factory=FakeSMTP,
+                        base_delay=60.0, poll_interval=0.05)
+    yield outbox
+    outbox.close()
+    pool.close_all()
+
+
+def _queue(outbox, n):
+    now = 0.0
+    with outbox.pool.connection() as conn:
+        return [conn.execute("""INSERT INTO email_outbox (recipient, subject, body, status, attempts,
+                                                          next_attempt_at, created_at)
+                                VALUES (?, 's', 'b', 'queued', 0, ?, ?)""", (f"c{i}@x.pk", now, now)).lastrowid
+                for i in range(n)]
+
+
+def test_auth_failure_backs_off_the_whole_batch(outbox):
+    FakeSMTP.login_error = smtplib.SMTPAuthenticationError(535, b"5.7.8 Username and Password not accepted")
+    ids = _queue(outbox, 5)
+    outbox._send_batch(outbox._claim_batch())
+    assert FakeSMTP.connects == 1
+    for job_id in ids:
+        status = outbox.status(job_id)
+        assert status["status"] == "queued" and status["attempts"] == 1 and "535" in status["last_error"]
+
+
+def test_rows_queued_before_start_are_delivered(outbox):
+    ids = _queue(outbox, 3)  # e.g. left by a previous process; nothing calls enqueue() or flush()
+    outbox.start()
+    deadline = time.monotonic() + 5
+    while any(outbox.status(i)["status"] != "sent" for i in ids) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert sorted(FakeSMTP.sent) == ["c0@x.pk", "c1@x.pk", "c2@x.pk"]
@@ -0,0 +1,69 @@
+import ast
+import os
+
+import pytest
+
+from canned_responses import CannedResponses
+from intent_engine import IntentEngine, intent_vocabulary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _legal_keywords():
+    """LEGAL_KEYWORDS as Finalcode.py defines it (the app module itself needs a Streamlit runtime)"""
+    with open(os.path.join(ROOT, "Finalcode.py"), encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "LEGAL_KEYWORDS" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise LookupError("LEGAL_KEYWORDS not found in Finalcode.py")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    brain = CannedResponses(os.path.join(ROOT, "brain.json"))
+    return IntentEngine(_legal_keywords(), smalltalk=brain.phrases())
+
+
+@pytest.mark.parametrize("query", [
+    "landlord gave no notice",
+    "help with bail",
+    "is my lease ok",
+    "no rent paid",
+    "hi, what is bail?",
+    "hey i got evicted",
+    "salam, my tenant wont pay",
+    "thanks, and what about the appeal?",
+])
+def test_legal_hit_goes_to_the_lawyer(engine, query):
+    assert engine.classify(query).name == "legal"
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("hi", "greeting"),
+    ("assalam o alaikum", "greeting"),
+    ("thank you so much", "thanks"),
+    ("allah hafiz", "farewell"),
+    ("ok", "non_legal"),
+    ("what is the weather today", "non_legal"),
+])
+def test_social_only_without_legal_terms(engine, query, intent):
+    assert engine.classify(query).name == intent
+
+
+def test_single_word_brain_phrases_are_not_smalltalk(engine):
+    for word in ("yes", "no", "ok", "sure", "help"):
+        assert "smalltalk" not in engine.scan(f"{word} my landlord")
+
+
+@pytest.mark.parametrize("query", ["sue", "held", "cases", "my lease"])
+def test_legal_words_are_not_fuzzy_matched_to_small_talk(query):
+    brain = CannedResponses(os.path.join(ROOT, "brain.json"),
+                            protected_words=intent_vocabulary(_legal_keywords() + ["sue", "held"]))
+    assert brain.lookup(query) is None
+
+
+def test_typos_of_longer_phrases_still_match():
+    brain = CannedResponses(os.path.join(ROOT, "brain.json"), protected_words=intent_vocabulary(_legal_keywords()))
+    assert brain.lookup("goodbey")[1:] == ("goodbye", "fuzzy")
+    assert brain.lookup("thnaks")[1:] == ("thanks", "fuzzy")
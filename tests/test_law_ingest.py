@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import law_ingest
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def library(tmp_path):
+    data = tmp_path / "DATA"
+    data.mkdir()
+    pool = ConnectionPool(str(tmp_path / "library.db"))
+    with pool.connection() as conn:
+        run_migrations(conn)
+    yield data, pool
+    pool.close_all()
+
+
+def _sync(pool, data, calls):
+    def extract_many(paths):
+        calls.extend(os.path.basename(p) for p in paths)
+        return {p: (ValueError("broken xref") if b"broken" in open(p, "rb").read() else [(1, "Section 1.")])
+                for p in paths}
+
+    with pool.connection() as conn:
+        report = law_ingest.sync_law_library(conn, str(data), extract_many=extract_many)
+        statuses = dict(conn.execute("SELECT filename, asset_status FROM law_assets"))
+    return report, statuses
+
+
+def test_failed_file_is_retried_once_per_process_or_when_it_changes(library, monkeypatch):
+    data, pool = library
+    monkeypatch.setattr(law_ingest, "_failed_this_process", set())
+    (data / "bad.pdf").write_bytes(b"%PDF broken")
+    (data / "good.pdf").write_bytes(b"%PDF fine")
+    calls = []
+    _report, statuses = _sync(pool, data, calls)
+    assert statuses == {"bad.pdf": "Error", "good.pdf": "Verified"}
+
+    report, _ = _sync(pool, data, calls)
+    assert report["unchanged"] == 2 and sorted(calls) == ["bad.pdf", "good.pdf"]
+
+    os.utime(data / "bad.pdf", (1, 1))  # touched, same bytes: still not re-parsed
+    _sync(pool, data, calls)
+    assert sorted(calls) == ["bad.pdf", "good.pdf"]
+
+    monkeypatch.setattr(law_ingest, "_failed_this_process", set())  # a restart retries it once
+    _sync(pool, data, calls)
+    _sync(pool, data, calls)
+    assert sorted(calls) == ["bad.pdf", "bad.pdf", "good.pdf"]
+
+    (data / "bad.pdf").write_bytes(b"%PDF repaired")
+    report, statuses = _sync(pool, data, calls)
+    assert report["updated"] == ["bad.pdf"] and statuses["bad.pdf"] == "Verified"
@@ -0,0 +1,68 @@
+import io
+import time
+
+import pytest
+
+import hybrid_retrieval
+import library_uploads
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+
+PAGES = {n: f"Section {n}. The Controller may order the tenant to pay rent. Page {n}." for n in range(1, 7)}
+
+
+@pytest.fixture
+def ingestor(tmp_path, monkeypatch):
+    monkeypatch.setattr(library_uploads.pdf_extract, "page_count", lambda path: len(PAGES))
+    monkeypatch.setattr(library_uploads.pdf_extract, "extract_page_range",
+                        lambda path, lo, hi: [(n, PAGES[n]) for n in range(lo + 1, hi + 1)])
+    pool = ConnectionPool(str(tmp_path / "library.db"))
+    with pool.connection() as conn:
+        run_migrations(conn)
+    ingestor = library_uploads.LibraryIngestor(pool, str(tmp_path / "DATA"), pages_per_batch=2)
+    yield ingestor
+    ingestor.close()
+    pool.close_all()
+
+
+def _run_next(ingestor):
+    ingestor._process(*ingestor._claim())
+    return ingestor.jobs()[0]
+
+
+def test_indexer_failure_is_recorded_and_retryable(ingestor):
+    calls = []
+
+    def flaky_vectors(filename, pages):
+        calls.append([n for n, _ in pages])
+        if len(calls) == 2:
+            raise RuntimeError("429 quota exceeded")
+
+    ingestor.indexers = [flaky_vectors]
+    job_id, _filename = library_uploads.save_upload(ingestor.pool, ingestor.data_dir, io.BytesIO(b"%PDF a"), "a.pdf")
+    job = _run_next(ingestor)
+    assert job["status"] == "done" and job["pages_done"] == 6
+    assert "flaky_vectors: RuntimeError: 429" in job["error"]
+    assert calls == [[1, 2], [3, 4], [5, 6]]
+
+    assert ingestor.retry(job_id)  # requeues from page 0 and wakes the worker thread
+    deadline = time.monotonic() + 5
+    while ingestor.jobs()[0]["status"] != "done" and time.monotonic() < deadline:
+        time.sleep(0.02)
+    job = ingestor.jobs()[0]
+    assert job["status"] == "done" and job["error"] is None
+    assert calls[3:] == [[1, 2], [3, 4], [5, 6]]
+    assert not ingestor.retry(job_id)
+
+
+def test_bm25_rebuild_keeps_uploads_still_processing(ingestor):
+    seen = []
+
+    def rebuild_mid_upload(filename, pages):
+        with ingestor.pool.connection() as conn:
+            seen.append(len(hybrid_retrieval.build_bm25_index(conn)))
+
+    ingestor.indexers = [rebuild_mid_upload]
+    library_uploads.save_upload(ingestor.pool, ingestor.data_dir, io.BytesIO(b"%PDF b"), "b.pdf")
+    _run_next(ingestor)
+    assert seen[0] > 0 and seen == sorted(seen)
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from llm_gateway import FakeLLM, LLMGateway
+
+
+def _text(chunks):
+    return "".join(c.content for c in chunks).strip()
+
+
+async def _collect(gateway, prompt, delay=0.0):
+    await asyncio.sleep(delay)
+    return [chunk async for chunk in gateway.astream(prompt)]
+
+
+def test_identical_streams_share_one_upstream_call():
+    llm = FakeLLM(median_latency=0.2, sigma=0.0)
+    gateway = LLMGateway(llm)
+
+    async def main():
+        # the third caller joins after chunks have started arriving and is replayed from the start
+        return await asyncio.gather(_collect(gateway, "bail?"), _collect(gateway, "bail?"),
+                                    _collect(gateway, "bail?", delay=0.12), _collect(gateway, "rent?"))
+
+    same, also, late, other = asyncio.run(main())
+    assert llm.calls == 2
+    assert _text(same) == _text(also) == _text(late) == llm._answer("bail?")
+    assert _text(other) == llm._answer("rent?")
+    assert gateway.stats["coalesced"] == 2 and gateway.stats["upstream"] == 2
+
+
+def test_stream_error_reaches_every_reader():
+    llm = FakeLLM(median_latency=0.05, sigma=0.0, error_rate=1.0)
+    gateway = LLMGateway(llm, max_retries=0)
+
+    async def main():
+        return await asyncio.gather(_collect(gateway, "bail?"), _collect(gateway, "bail?"), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert llm.calls == 1
+    assert all("429" in str(r) for r in results)
+
+
+def test_upstream_is_cancelled_when_the_last_reader_leaves():
+    llm = FakeLLM(median_latency=0.5, sigma=0.0)
+    gateway = LLMGateway(llm)
+
+    async def main():
+        stream = gateway.astream("bail?")
+        await stream.__anext__()
+        fanout = gateway._streams[gateway._key("bail?")]
+        await stream.aclose()
+        await asyncio.gather(fanout.task, return_exceptions=True)
+        assert fanout.task.cancelled()
+        assert gateway._key("bail?") not in gateway._streams
+        # a new caller starts a fresh upstream call instead of reading the abandoned one
+        return await _collect(gateway, "bail?")
+
+    assert _text(asyncio.run(main())) == llm._answer("bail?")
+    assert llm.calls == 2
+
+
+def test_sync_stream_bridge():
+    llm = FakeLLM(median_latency=0.05, sigma=0.0)
+    gateway = LLMGateway(llm)
+    try:
+        assert _text(gateway.stream("bail?")) == llm._answer("bail?")
+    finally:
+        gateway.close()
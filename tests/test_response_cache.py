@@ -0,0 +1,39 @@
+import hashlib
+
+import pytest
+
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+from legal_retrieval import HashingEmbeddings
+from response_cache import ResponseCache, cache_key
+
+CASE = "CASE SUMMARY SO FAR:\nTenant in Karachi, rent unpaid for two months.\x1eSindh Rented Premises Ordinance,1979.pdf"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "cache.db"))
+    with pool.connection() as conn:
+        run_migrations(conn)
+    yield ResponseCache(pool, embedder=HashingEmbeddings(), semantic_threshold=0.5)
+    pool.close_all()
+
+
+def test_general_keys_are_unchanged():
+    raw = "\x1f".join(("what is bail", "advocate", "senior counsel", "English"))
+    assert cache_key("What is bail?", "advocate", "Senior Counsel", "English") == hashlib.sha256(raw.encode()).hexdigest()
+
+
+def test_case_answers_are_served_only_to_the_same_case_state(cache):
+    cache.put("can I be evicted?", "advocate", "counsel", "English", "case answer", context=CASE)
+    assert cache.get("can I be evicted?", "advocate", "counsel", "English", context=CASE) == ("case answer", "exact")
+    assert cache.get("can I be evicted?", "advocate", "counsel", "English", context=CASE + " more") is None
+    assert cache.get("can I be evicted?", "advocate", "counsel", "English") is None
+    stats = cache.stats()
+    assert (stats["case_lookups"], stats["case_hits"]) == (2, 1)
+
+
+def test_case_answers_skip_the_semantic_tier(cache):
+    cache.put("can my landlord evict me", "advocate", "counsel", "English", "general answer")
+    assert cache.get("can my landlord evict me now", "advocate", "counsel", "English")[1] == "semantic"
+    assert cache.get("can my landlord evict me now", "advocate", "counsel", "English", context=CASE) is None
@@ -0,0 +1,43 @@
+import pytest
+
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+from statute_digests import is_overview_question, plan_digests
+
+
+@pytest.mark.parametrize("query", [
+    "What is the notice period for eviction under the Karachi Rent Restriction Act?",
+    "Explain the penalty for subletting under the KRRA",
+    "What does section 15 of the SRPO cover?",
+    "What is the scope of the rent controller's powers?",
+    "Does the Sindh Rented Premises Ordinance apply to shops?",
+])
+def test_specific_questions_keep_raw_excerpts(query):
+    assert not is_overview_question(query)
+
+
+@pytest.mark.parametrize("query", [
+    "Give me an overview of the Karachi Rent Restriction Act",
+    "Summarize the Sindh Rented Premises Ordinance",
+    "What does the Karachi Rent Restriction Act cover?",
+    "Outline the key provisions of the SRPO",
+    "What is the Cantonments Rent Restriction Act about?",
+])
+def test_overview_questions_use_digests(query):
+    assert is_overview_question(query)
+
+
+def test_thinly_parsed_act_is_digested_from_its_pages(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "digests.db"))
+    with pool.connection() as conn:
+        run_migrations(conn)
+        conn.execute("""INSERT INTO law_assets (id, filename, asset_status, content_hash)
+                        VALUES (1, 'Cantonments Act, 1924.pdf', 'Verified', 'abc')""")
+        conn.execute("INSERT INTO law_asset_pages (asset_id, page_no, page_text) VALUES (1, 1, ?)",
+                     ("2. Definitions. In this Act, unless there is anything repugnant ... " * 50,))
+        conn.execute("""INSERT INTO statute_sections (asset_id, act, act_key, section, heading, body, ord)
+                        VALUES (1, 'Cantonments Act, 1924', 'cantonments act 1924', '2', 'Definitions', 'In this', 1)""")
+        units = plan_digests(conn)
+    pool.close_all()
+    assert [u["scope"] for u in units] == ["act"]
+    assert "unless there is anything repugnant" in units[0]["material"]
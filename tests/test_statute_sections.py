@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+import pdf_extract
+from statute_sections import parse_statute
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DATA")
+
+GAZETTE_PAGE = """326-B THE SINDH GOVERNMENT GAZETTE, EXT. MAY, 24, 1999 PART-I
+Preamble. WHEREAS it is expedient to regulate the disposal of urban land;
+Short title 1. (1) This Ordinance may be called the Sindh Disposal of Urban Land Ordinance, 1999.
+(2) It shall come into force at once.
+Definitions. 2. In this Ordinance, unless there is any thing repugnant in the subject or context -
+(a) "amenity plot" means a plot reserved for parks;
+3. In the Sindh Urban Immovable Property Tax Act, 1958, in section 2, in clause (e), after the figure
+"1958" the words "and any person" shall be inserted.
+"""
+
+
+def test_gazette_ordinance_sections():
+    records = parse_statute("The Sindh Disposal of Urban Land Ordinance, 1999.pdf", [(2, GAZETTE_PAGE)])
+    assert [(r["section"], r["heading"]) for r in records] == [("1", "Short title"), ("2", "Definitions"), ("3", "")]
+    assert "amenity plot" in records[1]["body"]
+    assert all("GAZETTE" not in r["body"] for r in records)
+
+
+@pytest.mark.parametrize("filename", sorted(f for f in os.listdir(DATA) if f.lower().endswith(".pdf")))
+def test_every_act_in_data_yields_sections(filename):
+    pages = pdf_extract.extract_pdf_pages(os.path.join(DATA, filename))
+    if not any(text.strip() for _page, text in pages) and not pdf_extract.ocr_available():
+        pytest.skip("image-only scan and Tesseract is not installed")
+    assert parse_statute(filename, pages)
@@ -0,0 +1,85 @@
+import pytest
+
+import legal_retrieval
+from db_migrations import run_migrations
+from db_pool import ConnectionPool
+
+TEXT = {"Rent Act.pdf": "Section 15. The landlord shall apply to the Controller for ejectment. " * 40,
+        "Bail Act.pdf": "Section 497. Bail may be granted in non-bailable offences. " * 40}
+
+
+class FlakyEmbeddings(legal_retrieval.HashingEmbeddings):
+    """Raises once `fail_after` batches have been embedded, like a quota error mid-file"""
+
+    fail_after = None
+
+    def embed_documents(self, texts):
+        if self.fail_after is not None:
+            if self.fail_after == 0:
+                raise RuntimeError("429 quota exceeded")
+            self.fail_after -= 1
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    data = tmp_path / "DATA"
+    data.mkdir()
+    for name in TEXT:
+        (data / name).write_bytes(b"%PDF v1 " + name.encode())
+    pool = ConnectionPool(str(tmp_path / "index.db"))
+    with pool.connection() as conn:
+        run_migrations(conn)
+    embeddings = FlakyEmbeddings()
+    store = legal_retrieval.open_vectorstore(str(tmp_path / "vectors"), embeddings, "local", backend="numpy")
+    yield data, pool, store, embeddings
+    pool.close_all()
+
+
+def _sync(pool, store, data):
+    pages = lambda filename: [(1, TEXT[filename]), (2, TEXT[filename])]
+    with pool.connection() as conn:
+        return legal_retrieval.sync_corpus(store, str(data), batch_size=2, page_loader=pages, conn=conn)
+
+
+def _chunks(store, filename):
+    return len(legal_retrieval.source_ids(store, filename))
+
+
+def test_unchanged_files_are_skipped(corpus):
+    data, pool, store, _ = corpus
+    first = _sync(pool, store, data)
+    assert first["added"] == _chunks(store, "Rent Act.pdf") + _chunks(store, "Bail Act.pdf") > 0
+    assert _sync(pool, store, data) == {"added": 0, "skipped": 2, "removed": [], "failed": {}}
+
+
+def test_partly_embedded_file_is_resumed(corpus):
+    data, pool, store, embeddings = corpus
+    embeddings.fail_after = 1
+    report = _sync(pool, store, data)
+    assert "429" in report["failed"]["Bail Act.pdf"] and "429" in report["failed"]["Rent Act.pdf"]
+    partial = _chunks(store, "Bail Act.pdf")
+    assert partial == 2
+
+    embeddings.fail_after = None
+    report = _sync(pool, store, data)
+    assert report["failed"] == {}
+    total = _chunks(store, "Bail Act.pdf")
+    assert total > partial and report["added"] == total - partial + _chunks(store, "Rent Act.pdf")
+
+
+def test_changed_file_is_reembedded_and_removed_file_dropped(corpus):
+    data, pool, store, _ = corpus
+    _sync(pool, store, data)
+    TEXT["Rent Act.pdf"], before = "Section 15A. Short amended text.", TEXT["Rent Act.pdf"]
+    try:
+        (data / "Rent Act.pdf").write_bytes(b"%PDF v2")
+        (data / "Bail Act.pdf").unlink()
+        report = _sync(pool, store, data)
+    finally:
+        TEXT["Rent Act.pdf"] = before
+    assert report["removed"] == ["Bail Act.pdf"]
+    assert _chunks(store, "Bail Act.pdf") == 0
+    assert _chunks(store, "Rent Act.pdf") == report["added"] == 2
+    docs = store.similarity_search("amended", k=3)
+    assert {d.page_content for d in docs} == {"Section 15A. Short amended text."}
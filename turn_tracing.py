@@ -0,0 +1,241 @@
+# ==============================================================================
+# ALPHA APEX - CHAT TURN TRACING (SPANS, RING BUFFER, BATCHED SQLITE)
+# ==============================================================================
+# A chat turn is traced as one "turn" plus a span per stage:
+#
+#   history_fetch  the rendered chat history window (a "page" turn per rerun)
+#   intent     canned answers, instant citation lookup, intent classification
+#   history    chamber memory / scope lookups for the prompt
+#   cache      shared answer cache lookup
+#   retrieval  digests, statute excerpts, cited provisions
+#   prompt     prompt assembly
+#   llm        model call (ttft_ms, tokens_in, tokens_out)
+#   render     non-streamed output (ready answers, cited provisions)
+#   db_write   message_logs inserts
+#
+#     with tracer.turn(email, chamber, "chat"):
+#         with span("db_write"):
+#             ...
+#
+# The active turn lives in a thread-local (one Streamlit session = one script
+# thread), so span() can be called anywhere below the turn without threading
+# the tracer through every signature; outside a turn it is a no-op. Finished
+# turns go to an in-memory ring buffer and to a pending batch that a daemon
+# flusher thread writes to turn_spans with one executemany every flush_turns
+# turns or flush_interval seconds, so tracing costs one small transaction per
+# batch, not per span, and none of it on the script thread.
+# ==============================================================================
+
+import atexit
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ("history_fetch", "intent", "history", "cache", "retrieval", "prompt", "llm", "render", "db_write")
+# histogram bucket upper bounds, milliseconds
+LATENCY_BINS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+_active = threading.local()
+
+
+class Turn:
+    def __init__(self, email, chamber, kind):
+        self.id = uuid.uuid4().hex[:16]
+        self.email = email
+        self.chamber = chamber
+        self.kind = kind
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []  # [{"stage", "offset_ms", "duration_ms", "attrs"}, ...]
+        self.duration_ms = None
+
+    def as_dict(self):
+        return {"id": self.id, "email": self.email, "chamber": self.chamber, "kind": self.kind,
+                "started_at": self.started_at, "duration_ms": self.duration_ms, "spans": list(self.spans)}
+
+
+class Span:
+    def __init__(self, turn, stage):
+        self.turn = turn
+        self.stage = stage
+        self.attrs = {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(stage, **attrs):
+    """Time a stage of the current thread's turn (no-op outside a turn); yields a Span for attrs"""
+    turn = getattr(_active, "turn", None)
+    current = Span(turn, stage)
+    current.attrs.update(attrs)
+    if turn is None:
+        yield current
+        return
+    t0 = time.perf_counter()
+    try:
+        yield current
+    finally:
+        t1 = time.perf_counter()
+        turn.spans.append({"stage": stage, "offset_ms": (t0 - turn._t0) * 1000,
+                           "duration_ms": (t1 - t0) * 1000, "attrs": current.attrs})
+
+
+def current_turn():
+    return getattr(_active, "turn", None)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def histogram(values, bins=LATENCY_BINS_MS):
+    """[(label, count), ...] over the bucket upper bounds"""
+    counts = [0] * len(bins)
+    for v in values:
+        counts[next(i for i, upper in enumerate(bins) if v <= upper)] += 1
+    labels, lower = [], 0
+    for upper in bins:
+        labels.append(f">{lower:g} ms" if upper == float("inf") else f"≤{upper:g} ms")
+        lower = upper
+    return list(zip(labels, counts))
+
+
+class TurnTracer:
+    def __init__(self, pool, ring_size=500, flush_turns=20, flush_interval=10.0, retention_days=14):
+        self.pool = pool
+        self.ring = deque(maxlen=ring_size)
+        self.flush_turns = flush_turns
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._last_prune = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    @contextmanager
+    def turn(self, email, chamber, kind="chat"):
+        """Trace one chat turn on this thread; nested turn() calls join the outer one"""
+        if current_turn() is not None:
+            yield current_turn()
+            return
+        turn = _active.turn = Turn(email, chamber, kind)
+        try:
+            yield turn
+        finally:
+            _active.turn = None
+            turn.duration_ms = (time.perf_counter() - turn._t0) * 1000
+            self._finish(turn)
+
+    def _finish(self, turn):
+        with self._lock:
+            self.ring.append(turn.as_dict())
+            self._pending.append(turn)
+            full = len(self._pending) >= self.flush_turns
+        self.start()
+        if full:
+            self._wake.set()
+
+    # -- flusher lifecycle -----------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="turn-tracer", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stop the flusher and write what is pending (idempotent; also runs at interpreter exit)"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._stop.set()
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception:
+            pass  # database gone at shutdown
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.flush_interval)  # DB busy: the batch is back in pending
+
+    # -- persistence -----------------------------------------------------------
+
+    def flush(self):
+        """Write pending turns to turn_spans in one executemany; returns turns written"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        rows = []
+        for t in batch:
+            rows.append((t.id, t.started_at, t.email, t.chamber, t.kind, "turn", 0.0, t.duration_ms, None))
+            rows.extend((t.id, t.started_at, t.email, t.chamber, t.kind, s["stage"], s["offset_ms"], s["duration_ms"],
+                         json.dumps(s["attrs"]) if s["attrs"] else None) for s in t.spans)
+        try:
+            with self.pool.connection() as conn:
+                conn.executemany("""INSERT INTO turn_spans (turn_id, started_at, user_email, chamber, kind, stage,
+                                                            offset_ms, duration_ms, attrs)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+                if time.monotonic() - self._last_prune > 3600:
+                    conn.execute("DELETE FROM turn_spans WHERE started_at < ?",
+                                 (time.time() - self.retention_days * 86400,))
+                    self._last_prune = time.monotonic()
+        except Exception:
+            with self._lock:
+                self._pending[:0] = batch
+            raise
+        return len(batch)
+
+    # -- queries (System Admin) ------------------------------------------------
+
+    def stage_samples(self, limit_turns=500):
+        """{stage: [duration_ms, ...]} over the most recent turns, "turn" = whole turn"""
+        self.flush()
+        with self.pool.connection() as conn:
+            rows = conn.execute("""SELECT stage, duration_ms FROM turn_spans WHERE turn_id IN (
+                                       SELECT turn_id FROM turn_spans WHERE stage='turn'
+                                       ORDER BY started_at DESC LIMIT ?)""", (limit_turns,)).fetchall()
+        samples = {}
+        for stage, ms in rows:
+            samples.setdefault(stage, []).append(ms)
+        return samples
+
+    def slowest_turns(self, n=10, since=None):
+        """The n slowest turns (since a unix time), each with its spans in start order"""
+        self.flush()
+        with self.pool.connection() as conn:
+            turns = conn.execute("""SELECT turn_id, started_at, user_email, chamber, kind, duration_ms
+                                    FROM turn_spans WHERE stage='turn' AND started_at >= ?
+                                    ORDER BY duration_ms DESC LIMIT ?""", (since or 0, n)).fetchall()
+            out = []
+            for turn_id, started_at, email, chamber, kind, ms in turns:
+                spans = conn.execute("""SELECT stage, offset_ms, duration_ms, attrs FROM turn_spans
+                                        WHERE turn_id=? AND stage!='turn' ORDER BY offset_ms""", (turn_id,)).fetchall()
+                out.append({"id": turn_id, "started_at": started_at, "email": email, "chamber": chamber, "kind": kind,
+                            "duration_ms": ms,
+                            "spans": [{"stage": s, "offset_ms": o, "duration_ms": d, "attrs": json.loads(a) if a else {}}
+                                      for s, o, d, a in spans]})
+        return out